@@ -1,7 +1,10 @@
+from typing import Optional
 from fastapi import Depends
 from app.services.ml_service_with_metrics import get_ml_service, MLService
 from app.services.vector_service import get_vector_service, VectorService
 from app.services.cache_service import get_cache_service, CacheService
+from app.services.cache_strategy import get_advanced_cache_service, AdvancedCacheService
+from app.services.index_write_buffer import get_index_write_buffer, IndexWriteBuffer
 from app.config import get_settings, Settings
 
 
@@ -23,5 +26,19 @@ async def get_cache_service_dep() -> CacheService:
     return service
 
 
+async def get_tiered_cache_dep() -> AdvancedCacheService:
+    service = get_advanced_cache_service()
+    await service.connect()
+    return service
+
+
+async def get_index_write_buffer_dep() -> Optional[IndexWriteBuffer]:
+    if not get_settings().index_buffer_enabled:
+        return None
+    buffer = get_index_write_buffer()
+    await buffer.start()
+    return buffer
+
+
 def get_settings_dep() -> Settings:
     return get_settings()
@@ -7,7 +7,8 @@ from app.tasks.image_tasks import process_batch_images, process_single_image
 from app.core.celery_app import celery_app
 from app.services.ml_service import MLService
 from app.services.vector_service import VectorService
-from app.api.dependencies import get_ml_service_dep, get_vector_service_dep
+from app.services.cache_strategy import AdvancedCacheService
+from app.api.dependencies import get_ml_service_dep, get_vector_service_dep, get_tiered_cache_dep
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -44,7 +45,8 @@ class JobStatusResponse(BaseModel):
 async def batch_upload_images(
     request: BatchUploadRequest,
     ml_service: MLService = Depends(get_ml_service_dep),
-    vector_service: VectorService = Depends(get_vector_service_dep)
+    vector_service: VectorService = Depends(get_vector_service_dep),
+    search_cache: AdvancedCacheService = Depends(get_tiered_cache_dep)
 ):
     try:
         batch_data = []
@@ -89,13 +91,16 @@ async def batch_upload_images(
                         "error": str(e)
                     })
             
+            if successful:
+                await search_cache.invalidate_results()
+            
             return BatchJobResponse(
                 job_id="sync_" + str(uuid.uuid4()),
                 status="completed",
                 message=f"Processed {successful}/{len(batch_data)} images successfully",
                 total_images=len(batch_data)
             )
-            
+    
     except Exception as e:
         logger.error(f"Batch upload failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -146,7 +151,7 @@ async def get_job_status(job_id: str):
                 current=task.info.get("current", 0) if isinstance(task.info, dict) else None,
                 total=task.info.get("total", 0) if isinstance(task.info, dict) else None
             )
-            
+    
     except Exception as e:
         logger.error(f"Failed to get job status: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -172,7 +177,7 @@ async def list_active_jobs():
                 })
         
         return {"active_jobs": jobs}
-        
+    
     except Exception as e:
         logger.error(f"Failed to list jobs: {str(e)}")
         return {"active_jobs": [], "error": str(e)}
@@ -1,19 +1,31 @@
+import asyncio
 import time
 import uuid
 import logging
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+import numpy as np
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request
 from fastapi.responses import JSONResponse
 
 from app.models.schemas import (
     SearchRequest, SearchResponse, SimilarImage,
     ImageUpload, IndexResponse, ErrorResponse
 )
+from app.config_scale import get_scale_settings
 from app.services.ml_service import MLService
 from app.services.vector_service import VectorService
 from app.services.cache_service import CacheService
+from app.services.cache_strategy import AdvancedCacheService
+from app.services.search_cache_entry import (
+    SearchCacheLookup, filter_results, make_entry, partial_coverage, serve_from_entry
+)
+from app.utils.fingerprint import ImageFingerprint, fingerprint_image
+from app.services.search_budget import SearchBudget, is_degraded
+from app.services.index_write_buffer import IndexWriteBuffer, IndexBufferFullError
+from app.services.shard_write_pipeline import ShardQueueFullError
 from app.api.dependencies import (
-    get_ml_service_dep, get_vector_service_dep, get_cache_service_dep
+    get_ml_service_dep, get_vector_service_dep, get_cache_service_dep,
+    get_index_write_buffer_dep, get_tiered_cache_dep
 )
 from app.core.metrics import (
     http_requests_total,
@@ -22,14 +34,184 @@ from app.core.metrics import (
     indexed_images_total,
     cache_hits_total,
     cache_misses_total,
+    search_effort_total,
+    vector_searches_avoided_total,
+    search_budget_remaining_seconds,
     errors_total,
     active_requests,
-    track_vector_search,
-    track_cache_operation
+    track_vector_search
 )
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
+scale_settings = get_scale_settings()
+
+
+class ImageNotFoundError(LookupError):
+    pass
+
+
+async def _extract_features_cached(
+    fingerprint: ImageFingerprint,
+    ml_service: MLService,
+    search_cache: AdvancedCacheService
+) -> np.ndarray:
+    features = await search_cache.get_feature_cache(fingerprint.digest)
+    if features is not None:
+        cache_hits_total.labels(cache_type="features").inc()
+        return features
+    
+    cache_misses_total.labels(cache_type="features").inc()
+    features = await ml_service.extract_features(fingerprint.image_bytes)
+    
+    async def cache_features():
+        try:
+            await search_cache.set_feature_cache(fingerprint.digest, features)
+        except Exception as e:
+            logger.error(f"Failed to cache features: {str(e)}")
+    
+    asyncio.create_task(cache_features())
+    return features
+
+
+def _cached_search_response(
+    query_id: str,
+    results: List[dict],
+    include_metadata: bool,
+    start_time: float,
+    method: str = "POST",
+    endpoint: str = "/api/v1/search",
+    effort: Optional[str] = None,
+    partial: Optional[Dict[str, int]] = None
+) -> SearchResponse:
+    http_requests_total.labels(
+        method=method,
+        endpoint=endpoint,
+        status="200"
+    ).inc()
+    
+    return SearchResponse(
+        query_id=query_id,
+        results=[
+            SimilarImage(**{**result, 'metadata': result['metadata'] if include_metadata else None})
+            for result in results
+        ],
+        total_found=len(results),
+        search_time_ms=(time.time() - start_time) * 1000,
+        cached=True,
+        effort=effort,
+        partial=partial
+    )
+
+
+def _search_compute(
+    fingerprint: ImageFingerprint,
+    generation: int,
+    budget: SearchBudget,
+    ml_service: MLService,
+    vector_service: VectorService,
+    search_cache: AdvancedCacheService,
+    state: dict,
+    allow_semantic: bool = True
+) -> Callable[[int, float], Awaitable[Dict[str, Any]]]:
+    async def compute(fetch_top_k: int, fetch_threshold: float) -> Dict[str, Any]:
+        state['computed'] = True
+        features = await _extract_features_cached(fingerprint, ml_service, search_cache)
+        search_cache.record_query(fingerprint.digest, features, fetch_top_k, fetch_threshold)
+        
+        if allow_semantic:
+            entry = search_cache.semantic_lookup(features, fetch_top_k, fetch_threshold)
+            if entry is not None:
+                cache_hits_total.labels(cache_type="semantic").inc()
+                vector_searches_avoided_total.labels(cache="semantic").inc()
+                return entry
+        
+        effort = budget.select_effort()
+        search_budget_remaining_seconds.observe(budget.remaining_ms() / 1000)
+        search_effort_total.labels(level=effort.level).inc()
+        
+        # Widened to cover the stale entry too when this miss is an upgrade;
+        # metadata is always fetched so the entry can serve either kind of
+        # request.
+        @track_vector_search()
+        async def search_with_metrics():
+            return await vector_service.search_similar(
+                query_vector=features,
+                top_k=fetch_top_k,
+                threshold=fetch_threshold,
+                include_metadata=True,
+                effort=effort,
+                timeout=budget.backend_timeout()
+            )
+        
+        results = await search_with_metrics()
+        partial = partial_coverage(results)
+        fetched = [result.dict() for result in results]
+        if not is_degraded(effort.level) and not partial:
+            search_cache.semantic_store(features, fetched, fetch_top_k, fetch_threshold, generation)
+        return {**make_entry(fetched, fetch_top_k, fetch_threshold, partial), 'effort': effort.level}
+    
+    return compute
+
+
+def _similar_key(image_id: str) -> str:
+    # "More like this" results share the search cache, keyed by image id
+    # instead of an image fingerprint.
+    return f"image:{image_id}"
+
+
+def _similar_compute(
+    image_id: str,
+    vector_service: VectorService,
+    state: dict
+) -> Callable[[int, float], Awaitable[Dict[str, Any]]]:
+    async def compute(fetch_top_k: int, fetch_threshold: float) -> Dict[str, Any]:
+        state['computed'] = True
+        image = await vector_service.get_image(image_id)
+        if image is None:
+            raise ImageNotFoundError(image_id)
+        
+        # One extra result stands in for the image itself, which is dropped.
+        results = await vector_service.search_similar(
+            query_vector=image['vector'],
+            top_k=fetch_top_k + 1,
+            threshold=fetch_threshold,
+            include_metadata=True
+        )
+        fetched = [result.dict() for result in results if result.image_id != image_id][:fetch_top_k]
+        return make_entry(fetched, fetch_top_k, fetch_threshold, partial_coverage(results))
+    
+    return compute
+
+
+def _prefetch_similar(
+    results: List[dict],
+    top_k: int,
+    threshold: float,
+    vector_service: VectorService,
+    search_cache: AdvancedCacheService
+):
+    # Users tend to click a top result next; have its "more like this"
+    # answer cached before they do.
+    if not scale_settings.prefetch_enabled:
+        return
+    for result in results[:scale_settings.prefetch_top_n]:
+        search_cache.prefetch(
+            _similar_key(result['image_id']), top_k, threshold,
+            _similar_compute(result['image_id'], vector_service, {})
+        )
+
+
+async def _refresh_search_cache(
+    search_cache: AdvancedCacheService,
+    fingerprint: str,
+    cache_lookup: SearchCacheLookup,
+    compute: Callable[[int, float], Awaitable[Dict[str, Any]]]
+):
+    try:
+        await search_cache.fill_search_cache(fingerprint, cache_lookup, compute, wait=False)
+    except Exception as e:
+        logger.error(f"Early refresh failed: {str(e)}")
 
 
 @router.post("/search", response_model=SearchResponse)
@@ -38,10 +220,11 @@ async def search_similar_images(
     req: Request,
     ml_service: MLService = Depends(get_ml_service_dep),
     vector_service: VectorService = Depends(get_vector_service_dep),
-    cache_service: CacheService = Depends(get_cache_service_dep)
+    search_cache: AdvancedCacheService = Depends(get_tiered_cache_dep)
 ):
     start_time = time.time()
     query_id = str(uuid.uuid4())
+    budget = SearchBudget(request.latency_budget_ms, start_time=start_time)
     
     active_requests.inc()
     
@@ -52,62 +235,58 @@ async def search_similar_images(
             status="processing"
         ).inc()
         
-        cached_results = await cache_service.get_search_cache(request.image_data)
-        if cached_results:
+        fingerprint = await fingerprint_image(request.image_data)
+        cache_lookup = await search_cache.get_search_cache(
+            fingerprint.digest, request.top_k, request.threshold, budget.select_effort().level
+        )
+        if cache_lookup.results is not None:
             logger.info(f"Cache hit for query {query_id}")
             cache_hits_total.labels(cache_type="search").inc()
+            vector_searches_avoided_total.labels(cache="result").inc()
             
-            response = SearchResponse(
-                query_id=query_id,
-                results=[SimilarImage(**result) for result in cached_results[:request.top_k]],
-                total_found=len(cached_results),
-                search_time_ms=(time.time() - start_time) * 1000,
-                cached=True
-            )
-            
-            http_requests_total.labels(
-                method="POST",
-                endpoint="/api/v1/search",
-                status="200"
-            ).inc()
+            if cache_lookup.refresh:
+                refresh = _search_compute(
+                    fingerprint, cache_lookup.generation, SearchBudget(None), ml_service, vector_service,
+                    search_cache, {}, allow_semantic=False
+                )
+                asyncio.create_task(_refresh_search_cache(search_cache, fingerprint.digest, cache_lookup, refresh))
             
-            return response
+            if request.prefetch_similar:
+                _prefetch_similar(cache_lookup.results, request.top_k, request.threshold, vector_service, search_cache)
+            return _cached_search_response(
+                query_id, cache_lookup.results, request.include_metadata, start_time, effort=cache_lookup.effort
+            )
         else:
             cache_misses_total.labels(cache_type="search").inc()
         
-        logger.info(f"Extracting features for query {query_id}")
-        features = await ml_service.extract_features(request.image_data)
+        # Identical concurrent misses share one computation (in this process
+        # and, through a Redis lease, across workers); only the request whose
+        # compute actually ran reports cached=False.
+        state = {}
+        compute = _search_compute(
+            fingerprint, cache_lookup.generation, budget, ml_service, vector_service, search_cache, state
+        )
+        entry = await search_cache.fill_search_cache(fingerprint.digest, cache_lookup, compute)
         
-        logger.info(f"Searching similar images for query {query_id}")
+        served = serve_from_entry(entry, request.top_k, request.threshold)
+        if served is None:
+            served = filter_results(entry['results'], request.top_k, request.threshold)
         
-        @track_vector_search()
-        async def search_with_metrics():
-            return await vector_service.search_similar(
-                query_vector=features,
-                top_k=request.top_k,
-                threshold=request.threshold,
-                include_metadata=request.include_metadata
-            )
+        if request.prefetch_similar:
+            _prefetch_similar(served, request.top_k, request.threshold, vector_service, search_cache)
         
-        results = await search_with_metrics()
+        if not state.get('computed'):
+            return _cached_search_response(
+                query_id, served, request.include_metadata, start_time,
+                effort=entry.get('effort'), partial=entry.get('partial')
+            )
         
+        results = [
+            SimilarImage(**{**result, 'metadata': result['metadata'] if request.include_metadata else None})
+            for result in served
+        ]
         vector_search_results.observe(len(results))
         
-        async def cache_results():
-            try:
-                @track_cache_operation("set")
-                async def set_cache():
-                    return await cache_service.set_search_cache(
-                        request.image_data, 
-                        [result.dict() for result in results]
-                    )
-                await set_cache()
-            except Exception as e:
-                logger.error(f"Failed to cache results: {str(e)}")
-        
-        import asyncio
-        asyncio.create_task(cache_results())
-        
         search_time = (time.time() - start_time) * 1000
         logger.info(f"Query {query_id} completed in {search_time:.2f}ms, found {len(results)} results")
         
@@ -127,9 +306,11 @@ async def search_similar_images(
             results=results,
             total_found=len(results),
             search_time_ms=search_time,
-            cached=False
+            cached=False,
+            effort=entry.get('effort'),
+            partial=entry.get('partial')
         )
-        
+    
     except Exception as e:
         logger.error(f"Search failed for query {query_id}: {str(e)}")
         
@@ -158,12 +339,121 @@ async def search_similar_images(
         ).observe(duration)
 
 
+@router.get("/similar/{image_id}", response_model=SearchResponse)
+async def search_similar_to_image(
+    image_id: str,
+    req: Request,
+    top_k: int = Query(default=10, ge=1, le=100),
+    threshold: float = Query(default=0.0, ge=0.0, le=1.0),
+    include_metadata: bool = True,
+    vector_service: VectorService = Depends(get_vector_service_dep),
+    search_cache: AdvancedCacheService = Depends(get_tiered_cache_dep)
+):
+    start_time = time.time()
+    query_id = str(uuid.uuid4())
+    key = _similar_key(image_id)
+    
+    active_requests.inc()
+    
+    try:
+        cache_lookup = await search_cache.get_search_cache(key, top_k, threshold)
+        if cache_lookup.results is not None:
+            cache_hits_total.labels(cache_type="similar").inc()
+            vector_searches_avoided_total.labels(cache="result").inc()
+            
+            if cache_lookup.refresh:
+                refresh = _similar_compute(image_id, vector_service, {})
+                asyncio.create_task(_refresh_search_cache(search_cache, key, cache_lookup, refresh))
+            
+            return _cached_search_response(
+                query_id, cache_lookup.results, include_metadata, start_time,
+                method="GET", endpoint="/api/v1/similar/{image_id}"
+            )
+        
+        cache_misses_total.labels(cache_type="similar").inc()
+        state = {}
+        entry = await search_cache.fill_search_cache(
+            key, cache_lookup, _similar_compute(image_id, vector_service, state)
+        )
+        
+        served = serve_from_entry(entry, top_k, threshold)
+        if served is None:
+            served = filter_results(entry['results'], top_k, threshold)
+        
+        if not state.get('computed'):
+            return _cached_search_response(
+                query_id, served, include_metadata, start_time,
+                method="GET", endpoint="/api/v1/similar/{image_id}", partial=entry.get('partial')
+            )
+        
+        results = [
+            SimilarImage(**{**result, 'metadata': result['metadata'] if include_metadata else None})
+            for result in served
+        ]
+        vector_search_results.observe(len(results))
+        
+        http_requests_total.labels(
+            method="GET",
+            endpoint="/api/v1/similar/{image_id}",
+            status="200"
+        ).inc()
+        
+        return SearchResponse(
+            query_id=query_id,
+            results=results,
+            total_found=len(results),
+            search_time_ms=(time.time() - start_time) * 1000,
+            cached=False,
+            partial=entry.get('partial')
+        )
+    
+    except ImageNotFoundError:
+        http_requests_total.labels(
+            method="GET",
+            endpoint="/api/v1/similar/{image_id}",
+            status="404"
+        ).inc()
+        
+        raise HTTPException(
+            status_code=404,
+            detail=f"Image {image_id} not found"
+        )
+    except Exception as e:
+        logger.error(f"Similar search failed for image {image_id}: {str(e)}")
+        
+        errors_total.labels(
+            error_type=type(e).__name__,
+            endpoint="/api/v1/similar/{image_id}"
+        ).inc()
+        
+        http_requests_total.labels(
+            method="GET",
+            endpoint="/api/v1/similar/{image_id}",
+            status="500"
+        ).inc()
+        
+        raise HTTPException(
+            status_code=500,
+            detail=f"Similar search failed: {str(e)}"
+        )
+    finally:
+        active_requests.dec()
+        
+        duration = time.time() - start_time
+        http_request_duration_seconds.labels(
+            method="GET",
+            endpoint="/api/v1/similar/{image_id}"
+        ).observe(duration)
+
+
 @router.post("/index", response_model=IndexResponse)
 async def index_image(
     request: ImageUpload,
     req: Request,
     ml_service: MLService = Depends(get_ml_service_dep),
-    vector_service: VectorService = Depends(get_vector_service_dep)
+    vector_service: VectorService = Depends(get_vector_service_dep),
+    search_cache: AdvancedCacheService = Depends(get_tiered_cache_dep),
+    write_buffer: Optional[IndexWriteBuffer] = Depends(get_index_write_buffer_dep)
 ):
     start_time = time.time()
     image_id = request.image_id or str(uuid.uuid4())
@@ -179,14 +469,25 @@ async def index_image(
         
         logger.info(f"Indexing image {image_id}")
         
-        features = await ml_service.extract_features(request.image_data)
-        
-        await vector_service.insert_vectors(
-            vectors=[features],
-            image_ids=[image_id],
-            metadata=[request.metadata]
-        )
-        
+        fingerprint = await fingerprint_image(request.image_data)
+        features = await _extract_features_cached(fingerprint, ml_service, search_cache)
+        
+        # Cached results are invalidated once the write is searchable from
+        # every worker: when the write buffer flushes or the delta index
+        # confirms the point. A direct upsert also invalidates right away,
+        # which is final when it waited for Qdrant and otherwise keeps this
+        # worker's reads fresh until the delta index bumps again.
+        if write_buffer is not None:
+            await write_buffer.enqueue(features, image_id, request.metadata)
+            message = "Image queued for indexing"
+        else:
+            await vector_service.insert_vectors(
+                vectors=[features],
+                image_ids=[image_id],
+                metadata=[request.metadata]
+            )
+            message = "Image indexed successfully"
+            await search_cache.invalidate_results()
         indexed_images_total.inc()
         
         processing_time = (time.time() - start_time) * 1000
@@ -201,10 +502,25 @@ async def index_image(
         return IndexResponse(
             image_id=image_id,
             success=True,
-            message="Image indexed successfully",
+            message=message,
             processing_time_ms=processing_time
         )
+    
+    except (IndexBufferFullError, ShardQueueFullError) as e:
+        logger.warning(f"Rejected index request for {image_id}: {str(e)}")
+        
+        http_requests_total.labels(
+            method="POST",
+            endpoint="/api/v1/index",
+            status="503"
+        ).inc()
         
+        raise HTTPException(
+            status_code=503,
+            detail="Indexing is temporarily overloaded, retry later",
+            headers={"Retry-After": "1"}
+        )
+    
     except Exception as e:
         logger.error(f"Failed to index image {image_id}: {str(e)}")
         
@@ -233,11 +549,79 @@ async def index_image(
         ).observe(duration)
 
 
+@router.get("/index/{image_id}")
+async def get_image(
+    image_id: str,
+    req: Request,
+    vector_service: VectorService = Depends(get_vector_service_dep)
+):
+    start_time = time.time()
+    
+    active_requests.inc()
+    
+    try:
+        image = await vector_service.get_image(image_id)
+        
+        if image is None:
+            http_requests_total.labels(
+                method="GET",
+                endpoint="/api/v1/index/{image_id}",
+                status="404"
+            ).inc()
+            
+            raise HTTPException(
+                status_code=404,
+                detail=f"Image {image_id} not found"
+            )
+        
+        http_requests_total.labels(
+            method="GET",
+            endpoint="/api/v1/index/{image_id}",
+            status="200"
+        ).inc()
+        
+        return {
+            "image_id": image_id,
+            "metadata": image["metadata"]
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get image {image_id}: {str(e)}")
+        
+        errors_total.labels(
+            error_type=type(e).__name__,
+            endpoint="/api/v1/index/{image_id}"
+        ).inc()
+        
+        http_requests_total.labels(
+            method="GET",
+            endpoint="/api/v1/index/{image_id}",
+            status="500"
+        ).inc()
+        
+        raise HTTPException(
+            status_code=500,
+            detail=f"Lookup failed: {str(e)}"
+        )
+    finally:
+        active_requests.dec()
+        
+        duration = time.time() - start_time
+        http_request_duration_seconds.labels(
+            method="GET",
+            endpoint="/api/v1/index/{image_id}"
+        ).observe(duration)
+
+
 @router.delete("/index/{image_id}")
 async def delete_image(
     image_id: str,
     req: Request,
-    vector_service: VectorService = Depends(get_vector_service_dep)
+    vector_service: VectorService = Depends(get_vector_service_dep),
+    search_cache: AdvancedCacheService = Depends(get_tiered_cache_dep),
+    write_buffer: Optional[IndexWriteBuffer] = Depends(get_index_write_buffer_dep)
 ):
     start_time = time.time()
     
@@ -250,9 +634,12 @@ async def delete_image(
             status="processing"
         ).inc()
         
-        success = await vector_service.delete_by_image_id(image_id)
+        # Queued writes go first, or the next flush would re-index the image.
+        cancelled = await write_buffer.cancel(image_id) if write_buffer is not None else 0
+        success = await vector_service.delete_by_image_id(image_id) or cancelled > 0
         
         if success:
+            await search_cache.invalidate_results()
             indexed_images_total.dec()
             
             http_requests_total.labels(
@@ -273,7 +660,7 @@ async def delete_image(
                 status_code=404,
                 detail=f"Image {image_id} not found"
             )
-            
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -308,7 +695,8 @@ async def delete_image(
 async def get_search_stats(
     req: Request,
     vector_service: VectorService = Depends(get_vector_service_dep),
-    cache_service: CacheService = Depends(get_cache_service_dep)
+    cache_service: CacheService = Depends(get_cache_service_dep),
+    search_cache: AdvancedCacheService = Depends(get_tiered_cache_dep)
 ):
     start_time = time.time()
     
@@ -323,6 +711,7 @@ async def get_search_stats(
         
         collection_info = await vector_service.get_collection_info()
         cache_stats = await cache_service.get_stats()
+        cache_stats["tiers"] = await search_cache.get_stats()
         
         indexed_images_total.set(collection_info.get("points_count", 0))
         
@@ -337,7 +726,7 @@ async def get_search_stats(
             "cache": cache_stats,
             "status": "healthy"
         }
-        
+    
     except Exception as e:
         logger.error(f"Failed to get stats: {str(e)}")
         
@@ -4,7 +4,7 @@ from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
-
+    
     app_name: str = "Image Similarity Engine"
     app_version: str = "0.1.0"
     debug: bool = False
@@ -21,8 +21,33 @@ class Settings(BaseSettings):
     
     qdrant_host: str = "localhost"
     qdrant_port: int = 6333
+    qdrant_grpc_port: int = 6334
+    qdrant_api_key: Optional[str] = None
     qdrant_collection_name: str = "image_features"
     
+    sharding_enabled: bool = False
+    shard_stats_cache_ttl: float = 5.0
+    
+    delta_index_enabled: bool = False
+    delta_index_capacity: int = 10000
+    delta_index_max_age: float = 120.0
+    delta_index_reconcile_interval: float = 1.0
+    
+    index_buffer_enabled: bool = False
+    index_buffer_max_batch: int = 256
+    index_buffer_flush_interval: float = 0.05
+    index_buffer_max_pending: int = 10000
+    index_buffer_enqueue_timeout: float = 1.0
+    index_buffer_durability: str = "journal"
+    index_buffer_journal_dir: str = "./data/index_journal"
+    
+    projection_enabled: bool = False
+    projection_dimension: int = 256
+    projection_rerank: bool = True
+    projection_rerank_factor: int = 4
+    projection_model_dir: str = "./models/projection"
+    projection_refresh_interval: float = 5.0
+    
     redis_host: str = "localhost"
     redis_port: int = 6379
     redis_db: int = 0
@@ -33,6 +58,7 @@ class Settings(BaseSettings):
     
     max_image_size: int = 10 * 1024 * 1024  
     search_timeout: int = 30
+    search_latency_budget_ms: float = 1000.0
     cache_ttl: int = 3600
     
     class Config:
@@ -6,13 +6,63 @@ from pydantic_settings import BaseSettings
 class ScaleSettings(BaseSettings):
     shard_count: int = 8
     shard_replicas: int = 2
+    sharding_mode: str = "hash"
+    n_probe_shards: int = 2
+    semantic_router_path: str = "./models/semantic_router/router.json"
+    shard_virtual_nodes: int = 128
+    shard_ring_path: str = "./data/shard_ring.json"
+    shard_ring_redis_key: str = "shard:ring"
+    shard_ring_poll_interval: float = 2.0
+    shard_ring_ack_timeout: float = 120.0
+    shard_limit_overflow_probability: float = 0.01
+    shard_request_timeout: float = 2.0
+    shard_hedge_percentile: float = 95.0
+    shard_hedge_min_delay: float = 0.005
+    shard_write_queue_size: int = 10000
+    shard_write_batch_size: int = 512
+    shard_write_max_in_flight: int = 4
+    shard_write_max_retries: int = 5
+    shard_write_linger: float = 0.005
+    shard_write_enqueue_timeout: float = 5.0
+    rebalance_batch_size: int = 256
+    rebalance_max_points_per_sec: float = 2000.0
     
     cache_strategy: str = "multi_tier"
-    local_cache_size: int = 50000
+    local_cache_max_bytes: int = 256 * 1024 * 1024
+    local_cache_window_ratio: float = 0.01
+    local_cache_pinned_ratio: float = 0.05
+    heavy_hitters_top_k: int = 100
+    heavy_hitters_sync_interval: float = 10.0
+    heavy_hitters_window: float = 300.0
+    bloom_filter_enabled: bool = True
+    bloom_filter_capacity: int = 1000000
+    bloom_filter_error_rate: float = 0.01
+    bloom_filter_sync_interval: float = 5.0
+    # Each slice doubles the previous one; a worker holds two filters
+    # (current and previous epoch) of at most max_bytes each.
+    bloom_filter_max_slices: int = 4
+    bloom_filter_max_bytes: int = 32 * 1024 * 1024
+    hot_query_log_size: int = 1000
+    hot_query_log_interval: float = 60.0
+    hot_query_log_path: str = "./data/hot_queries.msgpack"
+    cache_warm_enabled: bool = True
+    cache_warm_batch_size: int = 32
+    cache_warm_max_qps: float = 50.0
+    cache_warm_check_interval: float = 30.0
+    cache_generation_refresh_interval: float = 1.0
+    cache_lease_timeout: float = 5.0
+    cache_xfetch_beta: float = 1.0
+    semantic_cache_enabled: bool = True
+    semantic_cache_similarity: float = 0.995
+    semantic_cache_bits: int = 16
+    semantic_cache_tables: int = 4
+    semantic_cache_max_entries: int = 100000
     redis_cache_size_gb: int = 32
     cache_ttl_short: int = 300
     cache_ttl_medium: int = 3600
     cache_ttl_long: int = 86400
+    cache_ttl_medium_hits: int = 3
+    cache_ttl_long_hits: int = 10
     
     batch_size_index: int = 1000
     batch_size_search: int = 100
@@ -28,6 +78,8 @@ class ScaleSettings(BaseSettings):
     
     prefetch_enabled: bool = True
     prefetch_size: int = 1000
+    prefetch_top_n: int = 3
+    prefetch_max_qps: float = 20.0
     
     monitoring_enabled: bool = True
     metrics_port: int = 9090
@@ -44,6 +96,8 @@ class ScaleSettings(BaseSettings):
     
     compression_enabled: bool = True
     compression_level: int = 6
+    cache_compression: str = "zstd"
+    cache_compression_min_bytes: int = 1024
     
     class Config:
         env_file = ".env.scale"
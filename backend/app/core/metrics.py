@@ -45,6 +45,80 @@ vector_search_results = Histogram(
     'Number of results returned by vector search'
 )
 
+search_effort_total = Counter(
+    'search_effort_total',
+    'Searches by ANN effort level actually used',
+    ['level']
+)
+
+search_budget_remaining_seconds = Histogram(
+    'search_budget_remaining_seconds',
+    'Latency budget left when the ANN stage starts',
+    buckets=(0.0, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+delta_index_size = Gauge(
+    'delta_index_size',
+    'Recently written vectors awaiting index confirmation'
+)
+
+delta_index_results_total = Counter(
+    'delta_index_results_total',
+    'Search results served from the in-memory delta index'
+)
+
+circuit_breaker_state = Gauge(
+    'circuit_breaker_state',
+    'Replica circuit breaker state (0=closed, 1=half_open, 2=open)',
+    ['replica']
+)
+
+circuit_breaker_rejections_total = Counter(
+    'circuit_breaker_rejections_total',
+    'Calls rejected because the replica circuit was open',
+    ['replica']
+)
+
+shard_requests_total = Counter(
+    'shard_requests_total',
+    'Per-shard search requests by outcome',
+    ['outcome']
+)
+
+shard_merge_refetches_total = Counter(
+    'shard_merge_refetches_total',
+    'Shards re-queried because their adaptive candidate limit was exhausted'
+)
+
+shard_write_queue_depth = Gauge(
+    'shard_write_queue_depth',
+    'Points submitted to a shard write pipeline and not yet acknowledged',
+    ['shard']
+)
+
+shard_replication_lag_seconds = Gauge(
+    'shard_replication_lag_seconds',
+    'Age of the oldest unacknowledged write in a shard write pipeline',
+    ['shard']
+)
+
+shard_write_retries_total = Counter(
+    'shard_write_retries_total',
+    'Shard upserts retried after a transient error',
+    ['shard']
+)
+
+index_buffer_pending = Gauge(
+    'index_buffer_pending',
+    'Acknowledged index writes not yet flushed to the vector database'
+)
+
+index_buffer_flush_size = Histogram(
+    'index_buffer_flush_size',
+    'Points per coalesced upsert from the index write buffer',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+
 indexed_images_total = Gauge(
     'indexed_images_total',
     'Total number of indexed images'
@@ -62,6 +136,89 @@ cache_misses_total = Counter(
     ['cache_type']
 )
 
+cache_tier_hits_total = Counter(
+    'cache_tier_hits_total',
+    'Cache hits by tier (l1 in-process, l2 Redis)',
+    ['tier']
+)
+
+cache_tier_evictions_total = Counter(
+    'cache_tier_evictions_total',
+    'Cache evictions by tier (l1 in-process, l2 Redis)',
+    ['tier']
+)
+
+semantic_cache_lookups_total = Counter(
+    'semantic_cache_lookups_total',
+    'Embedding-neighbourhood result cache lookups by outcome',
+    ['outcome']
+)
+
+vector_searches_avoided_total = Counter(
+    'vector_searches_avoided_total',
+    'Vector database searches skipped because a result cache answered',
+    ['cache']
+)
+
+search_coalesced_total = Counter(
+    'search_coalesced_total',
+    'Searches answered by another request computing the same key (local flight or remote lease holder)',
+    ['scope']
+)
+
+search_early_refreshes_total = Counter(
+    'search_early_refreshes_total',
+    'Cached search entries scheduled for probabilistic early refresh'
+)
+
+search_partial_uncached_total = Counter(
+    'search_partial_uncached_total',
+    'Search results left out of the cache because not every shard answered'
+)
+
+cache_ttl_promotions_total = Counter(
+    'cache_ttl_promotions_total',
+    'Cached entries moved to a longer TTL tier after repeated hits',
+    ['tier']
+)
+
+cache_l1_bytes = Gauge(
+    'cache_l1_bytes',
+    'Bytes held by the in-process L1 cache'
+)
+
+cache_bloom_lookups_total = Counter(
+    'cache_bloom_lookups_total',
+    'Bloom filter checks before Redis lookups by outcome (skipped, present, false_positive)',
+    ['outcome']
+)
+
+cache_bloom_false_positive_rate = Gauge(
+    'cache_bloom_false_positive_rate',
+    'Estimated false positive rate of the cache key Bloom filter'
+)
+
+cache_bloom_error_rate_target = Gauge(
+    'cache_bloom_error_rate_target',
+    'Configured false positive rate the cache key Bloom filter is sized for'
+)
+
+cache_prefetch_total = Counter(
+    'cache_prefetch_total',
+    'Predictive similar-image prefetches by outcome (queued, dropped, skipped, computed, hit)',
+    ['outcome']
+)
+
+cache_warmed_queries_total = Counter(
+    'cache_warmed_queries_total',
+    'Hot queries replayed into the result cache by the cache warmer'
+)
+
+cache_l1_pinned_entries = Gauge(
+    'cache_l1_pinned_entries',
+    'Heavy-hitter entries pinned in the in-process L1 cache'
+)
+
 cache_operation_duration_seconds = Histogram(
     'cache_operation_duration_seconds',
     'Cache operation duration',
@@ -13,6 +13,10 @@ from app.api.endpoints import search, health, batch
 from app.services.ml_service import get_ml_service
 from app.services.vector_service import get_vector_service
 from app.services.cache_service import get_cache_service
+from app.services.cache_strategy import get_advanced_cache_service
+from app.services.cache_warmer import get_cache_warmer
+from app.config_scale import get_scale_settings
+from app.services.index_write_buffer import get_index_write_buffer
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -35,6 +39,17 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning(f"Vector database connection failed: {str(e)} - continuing without it")
         
+        # Result caches are invalidated when writes become searchable
+        # cluster-wide, not when they are accepted.
+        search_cache = get_advanced_cache_service()
+        if get_vector_service().delta_index is not None:
+            get_vector_service().delta_index.add_listener(search_cache.invalidate_results)
+        
+        if settings.index_buffer_enabled:
+            logger.info("Starting index write buffer...")
+            get_index_write_buffer().add_flush_listener(search_cache.invalidate_results)
+            await get_index_write_buffer().start()
+        
         logger.info("Connecting to cache service...")
         try:
             cache_service = get_cache_service()
@@ -42,8 +57,15 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning(f"Cache service connection failed: {str(e)} - continuing without it")
         
-        logger.info("All available services initialized successfully")
+        if get_scale_settings().cache_warm_enabled:
+            logger.info("Starting cache warmer...")
+            try:
+                await get_cache_warmer().start()
+            except Exception as e:
+                logger.warning(f"Cache warmer failed to start: {str(e)} - continuing without it")
         
+        logger.info("All available services initialized successfully")
+    
     except Exception as e:
         logger.error(f"Failed to initialize services: {str(e)}")
         raise
@@ -51,6 +73,12 @@ async def lifespan(app: FastAPI):
     yield
     
     logger.info("Shutting down services...")
+    if settings.index_buffer_enabled:
+        await get_index_write_buffer().stop()
+    if get_scale_settings().cache_warm_enabled:
+        await get_cache_warmer().stop()
+    await get_vector_service().close()
+    await get_advanced_cache_service().disconnect()
 
 
 app = FastAPI(
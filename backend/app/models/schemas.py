@@ -0,0 +1,60 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+
+class SearchRequest(BaseModel):
+    image_data: str
+    top_k: int = Field(default=10, ge=1, le=100)
+    threshold: float = Field(default=0.0, ge=0.0, le=1.0)
+    include_metadata: bool = True
+    latency_budget_ms: Optional[float] = Field(default=None, gt=0)
+    prefetch_similar: bool = False
+
+
+class SimilarImage(BaseModel):
+    image_id: str
+    score: float
+    metadata: Optional[Dict[str, Any]] = None
+
+
+class ShardCoverage(BaseModel):
+    answered: int
+    timed_out: int
+    failed: int
+
+
+class SearchResponse(BaseModel):
+    query_id: str
+    results: List[SimilarImage]
+    total_found: int
+    search_time_ms: float
+    cached: bool = False
+    effort: Optional[str] = None
+    partial: Optional[ShardCoverage] = None
+
+
+class ImageUpload(BaseModel):
+    image_data: str
+    image_id: Optional[str] = None
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+
+
+class IndexResponse(BaseModel):
+    image_id: str
+    success: bool
+    message: str
+    processing_time_ms: float
+
+
+class ErrorResponse(BaseModel):
+    error: str
+    message: str
+    status_code: Optional[int] = None
+
+
+class HealthResponse(BaseModel):
+    status: str
+    timestamp: datetime
+    version: str
+    services: Dict[str, str]
@@ -0,0 +1,129 @@
+import logging
+from typing import Any, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    # Zero vectors stay zero instead of turning into NaNs.
+    vectors = np.atleast_2d(vectors).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def pack_sign_codes(vectors: np.ndarray) -> np.ndarray:
+    return np.packbits(np.atleast_2d(vectors) > 0, axis=1)
+
+
+def hamming_distances(query_code: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        if codes.shape[1] % 8 == 0:
+            codes = codes.view(np.uint64)
+            query_code = query_code.view(np.uint64)
+        return np.bitwise_count(np.bitwise_xor(codes, query_code)).sum(axis=1, dtype=np.uint16)
+    return _POPCOUNT_TABLE[np.bitwise_xor(codes, query_code)].sum(axis=1, dtype=np.uint16)
+
+
+class BinaryQuantizedIndex:
+    # Sign codes give a cheap Hamming shortlist (1 bit per dimension instead
+    # of 32); the shortlist is re-ranked with exact cosine on the float vectors.
+    # With `storage_path` the float vectors live in a memory-mapped file, so
+    # only the codes have to stay resident. Both arrays grow by doubling.
+    def __init__(self, dimension: int = 512, shortlist_factor: int = 50,
+                 storage_path: Optional[str] = None):
+        self.d = dimension
+        self.shortlist_factor = shortlist_factor
+        self.storage_path = storage_path
+        self._size = 0
+        self._codes = np.empty((0, (dimension + 7) // 8), dtype=np.uint8)
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+    
+    @property
+    def ntotal(self) -> int:
+        return self._size
+    
+    @property
+    def codes(self) -> np.ndarray:
+        return self._codes[:self._size]
+    
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self._size]
+    
+    def _grow_vectors(self, capacity: int) -> np.ndarray:
+        if self.storage_path is None:
+            vectors = np.empty((capacity, self.d), dtype=np.float32)
+            vectors[:self._size] = self._vectors[:self._size]
+            return vectors
+        
+        # Extend the backing file in place; existing rows are not copied.
+        if self._size:
+            self._vectors.flush()
+            with open(self.storage_path, "r+b") as f:
+                f.truncate(capacity * self.d * 4)
+        mode = "r+" if self._size else "w+"
+        return np.memmap(self.storage_path, dtype=np.float32, mode=mode, shape=(capacity, self.d))
+    
+    def _reserve(self, count: int):
+        capacity = len(self._codes)
+        if self._size + count <= capacity:
+            return
+        
+        capacity = max(self._size + count, capacity * 2, 1024)
+        codes = np.empty((capacity, self._codes.shape[1]), dtype=np.uint8)
+        codes[:self._size] = self._codes[:self._size]
+        self._codes = codes
+        self._vectors = self._grow_vectors(capacity)
+    
+    def add(self, vectors: np.ndarray):
+        vectors = normalize_rows(vectors)
+        self._reserve(len(vectors))
+        end = self._size + len(vectors)
+        self._codes[self._size:end] = pack_sign_codes(vectors)
+        self._vectors[self._size:end] = vectors
+        self._size = end
+    
+    def search(self, queries: np.ndarray, k: int, params: Optional[Any] = None,
+               shortlist_size: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        queries = normalize_rows(queries)
+        query_codes = pack_sign_codes(queries)
+        codes = self.codes
+        
+        k = min(k, self.ntotal)
+        shortlist_size = min(shortlist_size or k * self.shortlist_factor, self.ntotal)
+        
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        labels = np.full((len(queries), k), -1, dtype=np.int64)
+        if k == 0:
+            return scores, labels
+        
+        for row, (query, query_code) in enumerate(zip(queries, query_codes)):
+            distances = hamming_distances(query_code, codes)
+            if shortlist_size < self.ntotal:
+                shortlist = np.argpartition(distances, shortlist_size - 1)[:shortlist_size]
+            else:
+                shortlist = np.arange(self.ntotal)
+            
+            # Sorted ids turn memory-mapped gathers into forward reads.
+            shortlist = np.sort(shortlist)
+            exact = self._vectors[shortlist] @ query
+            top = np.argpartition(-exact, k - 1)[:k]
+            top = top[np.argsort(-exact[top])]
+            
+            scores[row] = exact[top]
+            labels[row] = shortlist[top]
+        
+        return scores, labels
+    
+    def memory_usage(self) -> dict:
+        float_bytes = self.vectors.nbytes
+        return {
+            "code_bytes": self.codes.nbytes,
+            "float_bytes": float_bytes,
+            "float_storage": "disk" if self.storage_path is not None else "memory",
+            "resident_bytes": self.codes.nbytes + (0 if self.storage_path is not None else float_bytes),
+            "bytes_per_code": self.codes.shape[1]
+        }
@@ -0,0 +1,292 @@
+import hashlib
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+# Log entries pack the slice index above the bit position.
+_SLICE_SHIFT = 40
+
+
+class BloomFilter:
+    # Bit layout matches a Redis bitmap (SETBIT offset 0 is the high bit of
+    # byte 0), so a GET of the bitmap can be OR-ed straight into `bits`.
+    def __init__(self, capacity: int = 1000000, error_rate: float = 0.01):
+        self.n_bits = self.size_bits(capacity, error_rate)
+        self.n_hashes = max(1, round(self.n_bits / capacity * math.log(2)))
+        self.bits = np.zeros(self.n_bits // 8, dtype=np.uint8)
+    
+    @staticmethod
+    def size_bits(capacity: int, error_rate: float) -> int:
+        n_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        return (n_bits + 7) // 8 * 8
+    
+    def positions(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+    
+    def add_positions(self, positions):
+        positions = np.asarray(positions, dtype=np.int64)
+        np.bitwise_or.at(self.bits, positions >> 3, (0x80 >> (positions & 7)).astype(np.uint8))
+    
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (0x80 >> (position & 7)) for position in self.positions(key))
+    
+    def merge(self, data: Optional[bytes]):
+        if data:
+            size = min(len(data), len(self.bits))
+            self.bits[:size] |= np.frombuffer(data, dtype=np.uint8, count=size)
+    
+    def fill_ratio(self) -> float:
+        return int(_POPCOUNT[self.bits].sum(dtype=np.int64)) / self.n_bits
+    
+    def false_positive_rate(self) -> float:
+        return self.fill_ratio() ** self.n_hashes
+
+
+class ScalableBloomFilter:
+    # Grows instead of saturating. Slice i holds capacity * 2**i keys at
+    # error_rate * (1 - r) * r**i (r = 1/2), so the compound false positive
+    # rate stays under error_rate however many slices are added. A slice is
+    # added once the newest one is half full, the fill an optimally sized
+    # filter reaches at its capacity. New keys go to the newest slice.
+    # Memory roughly doubles per slice: from 1M keys at 1%, slices take 1.3,
+    # 3.0, 6.6 and 14.6 MB (26 MB for the default 4 slices and 15M keys),
+    # and an 8th slice alone would take 322 MB. Growth stops at `max_slices`
+    # or before the slices would exceed `max_bytes`, whichever comes first;
+    # past that the false positive rate rises above target (and alerts).
+    def __init__(self, capacity: int = 1000000, error_rate: float = 0.01, max_slices: int = 4,
+                 fill_limit: float = 0.5, max_bytes: Optional[int] = None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.fill_limit = fill_limit
+        self.max_slices = max(1, max_slices)
+        if max_bytes is not None:
+            while self.max_slices > 1 and self.worst_case_bytes() > max_bytes:
+                self.max_slices -= 1
+        self.slices: List[BloomFilter] = []
+        self.slice(0)
+    
+    def _slice_params(self, index: int):
+        return self.capacity * 2**index, self.error_rate * 0.5**(index + 1)
+    
+    def worst_case_bytes(self) -> int:
+        return sum(BloomFilter.size_bits(*self._slice_params(i)) // 8 for i in range(self.max_slices))
+    
+    @property
+    def active(self) -> int:
+        return len(self.slices) - 1
+    
+    def slice(self, index: int) -> BloomFilter:
+        index = min(index, self.max_slices - 1)
+        while len(self.slices) <= index:
+            self.slices.append(BloomFilter(*self._slice_params(len(self.slices))))
+        return self.slices[index]
+    
+    def maybe_grow(self) -> bool:
+        if len(self.slices) >= self.max_slices or self.slices[-1].fill_ratio() < self.fill_limit:
+            return False
+        self.slice(len(self.slices))
+        logger.info(f"Bloom filter grew to {len(self.slices)} slices")
+        return True
+    
+    def __contains__(self, key: str) -> bool:
+        return any(key in bloom for bloom in self.slices)
+    
+    def fill_ratio(self) -> float:
+        return self.slices[-1].fill_ratio()
+    
+    def false_positive_rate(self) -> float:
+        return 1 - float(np.prod([1 - bloom.false_positive_rate() for bloom in self.slices]))
+
+
+class SharedBloomFilter:
+    # Per-worker filter of cache keys known to exist, mirrored in Redis so
+    # every worker learns about the others' writes. Writes set bits locally
+    # at once; the next sync SETBITs them into the shared bitmaps and appends
+    # them to a per-epoch log. A worker pulls the full bitmaps once per
+    # epoch and afterwards only the log entries it has not seen, so a steady
+    # sync costs in proportion to new keys, not to the filter size. The log
+    # holds 8 bytes per bit set and expires with its epoch.
+    # Bloom filters cannot forget, so filters rotate every `epoch_seconds`
+    # (>= the longest cache TTL): a key is checked against the current and
+    # previous epoch and stale bits are dropped two epochs on.
+    # A key written on another worker can read as absent until the next sync;
+    # that costs one recomputation, never a wrong answer.
+    def __init__(self, capacity: int = 1000000, error_rate: float = 0.01, epoch_seconds: float = 86400.0,
+                 sync_interval: float = 5.0, key_prefix: str = "cache:bloom", max_pending: int = 100000,
+                 max_slices: int = 4, max_bytes: Optional[int] = None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.epoch_seconds = epoch_seconds
+        self.sync_interval = sync_interval
+        self.key_prefix = key_prefix
+        self.max_pending = max_pending
+        self.max_slices = max_slices
+        self.max_bytes = max_bytes
+        self.redis_client = None
+        self.epoch = self._current_epoch()
+        self.current = self._new_filter()
+        self.previous = self._new_filter()
+        # What max_bytes leaves of max_slices; bootstrap reads this many
+        # bitmaps per epoch.
+        self.max_slices = self.current.max_slices
+        self._pending: List[int] = []
+        self._log_cursor: Optional[int] = None
+        self._previous_synced = False
+        self.last_sync: Optional[float] = None
+    
+    def bind(self, redis_client):
+        self.redis_client = redis_client
+    
+    def _new_filter(self) -> ScalableBloomFilter:
+        return ScalableBloomFilter(self.capacity, self.error_rate, self.max_slices, max_bytes=self.max_bytes)
+    
+    def _current_epoch(self) -> int:
+        return int(time.time() // self.epoch_seconds)
+    
+    def _key(self, epoch: int, slice_index: int) -> str:
+        return f"{self.key_prefix}:{epoch}:{slice_index}"
+    
+    def _log_key(self, epoch: int) -> str:
+        return f"{self.key_prefix}:{epoch}:log"
+    
+    @property
+    def ready(self) -> bool:
+        # Until the shared bitmap has been pulled (or once syncing stalls),
+        # the local bits miss other workers' writes; report "maybe" instead.
+        if self.redis_client is None:
+            return False
+        return self.last_sync is not None and time.time() - self.last_sync < 3 * self.sync_interval
+    
+    def might_contain(self, key: str) -> bool:
+        if not self.ready:
+            return True
+        return key in self.current or key in self.previous
+    
+    def add(self, key: str, publish: bool = True):
+        self._rotate()
+        slice_index = self.current.active
+        positions = self.current.slices[slice_index].positions(key)
+        self.current.slices[slice_index].add_positions(positions)
+        if publish and len(self._pending) < self.max_pending:
+            self._pending.extend((slice_index << _SLICE_SHIFT) | position for position in positions)
+    
+    def _rotate(self):
+        epoch = self._current_epoch()
+        if epoch == self.epoch:
+            return
+        if epoch == self.epoch + 1:
+            self.previous = self.current
+        else:
+            self.previous = self._new_filter()
+        self.current = self._new_filter()
+        self.epoch = epoch
+        self._pending.clear()
+        self._log_cursor = None
+        self._previous_synced = False
+    
+    def _merge_log(self, entries: List[bytes]):
+        for entry in entries:
+            encoded = np.frombuffer(entry, dtype="<i8")
+            slice_indexes = encoded >> _SLICE_SHIFT
+            positions = encoded & ((1 << _SLICE_SHIFT) - 1)
+            for slice_index in np.unique(slice_indexes):
+                self.current.slice(int(slice_index)).add_positions(positions[slice_indexes == slice_index])
+    
+    async def sync(self) -> bool:
+        if self.redis_client is None:
+            return False
+        
+        self._rotate()
+        self.current.maybe_grow()
+        epoch = self.epoch
+        pending, self._pending = self._pending, []
+        bootstrap = self._log_cursor is None
+        log_key = self._log_key(epoch)
+        ttl = int(self.epoch_seconds * 2) + 60
+        
+        try:
+            pipeline = self.redis_client.pipeline()
+            touched = set()
+            for encoded in pending:
+                slice_index = encoded >> _SLICE_SHIFT
+                touched.add(slice_index)
+                pipeline.setbit(self._key(epoch, slice_index), encoded & ((1 << _SLICE_SHIFT) - 1), 1)
+            if pending:
+                pipeline.rpush(log_key, np.asarray(pending, dtype="<i8").tobytes())
+                pipeline.expire(log_key, ttl)
+            for slice_index in touched:
+                pipeline.expire(self._key(epoch, slice_index), ttl)
+            
+            # Read back in the same transaction so the bitmaps and the log
+            # position describe one consistent state.
+            reads = len(pipeline)
+            if bootstrap:
+                for slice_index in range(self.max_slices):
+                    pipeline.get(self._key(epoch, slice_index))
+            else:
+                pipeline.lrange(log_key, self._log_cursor, -1)
+            pipeline.llen(log_key)
+            if not self._previous_synced:
+                for slice_index in range(self.max_slices):
+                    pipeline.get(self._key(epoch - 1, slice_index))
+            results = await pipeline.execute()
+        except Exception as e:
+            logger.error(f"Failed to sync bloom filter: {str(e)}")
+            self._pending = (pending + self._pending)[:self.max_pending]
+            return False
+        
+        if epoch != self.epoch:
+            return False
+        
+        results = results[reads:]
+        if bootstrap:
+            for slice_index, data in enumerate(results[:self.max_slices]):
+                if data:
+                    self.current.slice(slice_index).merge(data)
+            results = results[self.max_slices:]
+            self._log_cursor = results[0]
+        else:
+            entries, log_length = results[0], results[1]
+            self._merge_log(entries)
+            self._log_cursor += len(entries)
+            if log_length < self._log_cursor:
+                # The log was lost (Redis restart or eviction); pull the
+                # bitmaps again on the next sync.
+                self._log_cursor = None
+        results = results[1:] if bootstrap else results[2:]
+        
+        if not self._previous_synced:
+            for slice_index, data in enumerate(results[:self.max_slices]):
+                if data:
+                    self.previous.slice(slice_index).merge(data)
+            self._previous_synced = True
+        
+        self.last_sync = time.time()
+        return True
+    
+    def false_positive_rate(self) -> float:
+        # Either filter matching counts as a hit.
+        return 1 - (1 - self.current.false_positive_rate()) * (1 - self.previous.false_positive_rate())
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'ready': self.ready,
+            'slices': len(self.current.slices),
+            'bits': sum(bloom.n_bits for bloom in self.current.slices),
+            'worst_case_bytes': 2 * self.current.worst_case_bytes(),
+            'hashes': [bloom.n_hashes for bloom in self.current.slices],
+            'fill_ratio': self.current.fill_ratio(),
+            'estimated_false_positive_rate': self.false_positive_rate(),
+            'target_false_positive_rate': self.error_rate,
+            'pending_bits': len(self._pending),
+            'log_cursor': self._log_cursor,
+            'last_sync': self.last_sync
+        }
@@ -0,0 +1,98 @@
+import json
+import struct
+import zlib
+from typing import Any, Optional
+import msgpack
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Header: marker, version, payload format, compression. The marker byte can
+# never start a JSON document, so entries written before the codec existed
+# are still readable as JSON.
+MARKER = 0x00
+VERSION = 1
+HEADER = struct.Struct("!BBBB")
+
+FORMAT_MSGPACK = 1
+FORMAT_FLOAT16 = 2
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+
+COMPRESSIONS = {"zlib": COMPRESSION_ZLIB, "zstd": COMPRESSION_ZSTD}
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+class CacheCodec:
+    def __init__(self, compression: Optional[str] = "zstd", level: int = 6, min_compress_bytes: int = 1024):
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown cache compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            compression = "zlib"
+        
+        self.compression = COMPRESSIONS[compression] if compression else COMPRESSION_NONE
+        self.level = level
+        self.min_compress_bytes = min_compress_bytes
+        self._zstd_compressor = zstandard.ZstdCompressor(level=level) if zstandard is not None else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+    
+    def encode(self, value: Any) -> bytes:
+        return self._pack(FORMAT_MSGPACK, msgpack.packb(value, default=_default, use_bin_type=True))
+    
+    def encode_vector(self, vector: Any) -> bytes:
+        # Cosine search on normalized embeddings is insensitive to float16
+        # rounding, and it halves the bytes of the raw float32 buffer.
+        return self._pack(FORMAT_FLOAT16, np.asarray(vector, dtype="<f2").tobytes())
+    
+    def decode(self, data: bytes) -> Any:
+        if not data:
+            return None
+        if data[0] != MARKER:
+            return json.loads(data)
+        
+        _, version, payload_format, compression = HEADER.unpack_from(data)
+        if version > VERSION:
+            raise ValueError(f"Cache entry version {version} is newer than codec version {VERSION}")
+        
+        payload = self._decompress(data[HEADER.size:], compression)
+        if payload_format == FORMAT_FLOAT16:
+            return np.frombuffer(payload, dtype="<f2").astype(np.float32)
+        return msgpack.unpackb(payload, raw=False)
+    
+    def _pack(self, payload_format: int, payload: bytes) -> bytes:
+        compression = COMPRESSION_NONE
+        if self.compression != COMPRESSION_NONE and len(payload) >= self.min_compress_bytes:
+            compressed = self._compress(payload)
+            # Small or high-entropy payloads (float16 vectors) may not shrink.
+            if len(compressed) < len(payload):
+                payload, compression = compressed, self.compression
+        
+        return HEADER.pack(MARKER, VERSION, payload_format, compression) + payload
+    
+    def _compress(self, payload: bytes) -> bytes:
+        if self.compression == COMPRESSION_ZSTD:
+            return self._zstd_compressor.compress(payload)
+        return zlib.compress(payload, self.level)
+    
+    def _decompress(self, payload: bytes, compression: int) -> bytes:
+        if compression == COMPRESSION_NONE:
+            return payload
+        if compression == COMPRESSION_ZLIB:
+            return zlib.decompress(payload)
+        if compression == COMPRESSION_ZSTD:
+            if self._zstd_decompressor is None:
+                raise ValueError("Cache entry is zstd-compressed but zstandard is not installed")
+            return self._zstd_decompressor.decompress(payload)
+        raise ValueError(f"Unknown cache compression id: {compression}")
@@ -0,0 +1,59 @@
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CacheGeneration:
+    # Per-scope generation counters in Redis. Result cache keys embed the
+    # current generation, so a write invalidates every cached result with
+    # one INCR; old keys are never read again and age out via TTL/eviction.
+    # Each process reuses its last read for `refresh_interval` seconds, which
+    # bounds how long other workers can serve results from before a write.
+    def __init__(self, key_prefix: str = "cache:generation", refresh_interval: float = 1.0):
+        self.key_prefix = key_prefix
+        self.refresh_interval = refresh_interval
+        self.redis_client = None
+        self._local: Dict[str, Tuple[int, float]] = {}
+    
+    def bind(self, redis_client):
+        self.redis_client = redis_client
+    
+    def _key(self, scope: str) -> str:
+        return f"{self.key_prefix}:{scope}"
+    
+    def cached(self, scope: str = "global") -> Optional[int]:
+        local = self._local.get(scope)
+        return local[0] if local is not None else None
+    
+    async def current(self, scope: str = "global") -> int:
+        local = self._local.get(scope)
+        if local is not None and time.time() - local[1] < self.refresh_interval:
+            return local[0]
+        
+        if self.redis_client is None:
+            return local[0] if local is not None else 0
+        
+        try:
+            value = await self.redis_client.get(self._key(scope))
+            generation = int(value) if value is not None else 0
+        except Exception as e:
+            logger.error(f"Failed to read cache generation {scope}: {str(e)}")
+            return local[0] if local is not None else 0
+        
+        self._local[scope] = (generation, time.time())
+        return generation
+    
+    async def bump(self, scope: str = "global") -> Optional[int]:
+        if self.redis_client is None:
+            return None
+        
+        try:
+            generation = await self.redis_client.incr(self._key(scope))
+        except Exception as e:
+            logger.error(f"Failed to bump cache generation {scope}: {str(e)}")
+            return None
+        
+        self._local[scope] = (generation, time.time())
+        return generation
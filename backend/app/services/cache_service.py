@@ -4,18 +4,27 @@ import logging
 import hashlib
 from typing import Any, Optional, List
 from functools import lru_cache
+import numpy as np
 import redis.asyncio as redis
 from datetime import timedelta
 
 from app.config import get_settings
+from app.config_scale import get_scale_settings
+from app.services.cache_codec import CacheCodec
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
+scale_settings = get_scale_settings()
 
 
 class CacheService:
     def __init__(self):
         self.redis_client: Optional[redis.Redis] = None
+        self.codec = CacheCodec(
+            compression=scale_settings.cache_compression if scale_settings.compression_enabled else None,
+            level=scale_settings.compression_level,
+            min_compress_bytes=scale_settings.cache_compression_min_bytes
+        )
         logger.info("Cache service initialized")
     
     async def connect(self):
@@ -28,7 +37,7 @@ class CacheService:
                 port=settings.redis_port,
                 db=settings.redis_db,
                 password=settings.redis_password,
-                decode_responses=True,
+                decode_responses=False,
                 socket_keepalive=True,
                 socket_keepalive_options={},
                 health_check_interval=30,
@@ -36,7 +45,7 @@ class CacheService:
             
             await self.redis_client.ping()
             logger.info(f"Connected to Redis at {settings.redis_host}:{settings.redis_port}")
-            
+        
         except Exception as e:
             logger.error(f"Failed to connect to Redis: {str(e)}")
             raise
@@ -50,6 +59,9 @@ class CacheService:
         hash_object = hashlib.md5(content.encode())
         return f"{prefix}:{hash_object.hexdigest()}"
     
+    def _fingerprint_key(self, prefix: str, fingerprint: str) -> str:
+        return f"{prefix}:{fingerprint}"
+    
     async def get(self, key: str) -> Optional[Any]:
         if self.redis_client is None:
             await self.connect()
@@ -57,9 +69,9 @@ class CacheService:
         try:
             value = await self.redis_client.get(key)
             if value:
-                return json.loads(value)
+                return self.codec.decode(value)
             return None
-            
+        
         except Exception as e:
             logger.error(f"Failed to get cache key {key}: {str(e)}")
             return None
@@ -70,12 +82,14 @@ class CacheService:
         value: Any, 
         ttl: Optional[int] = None
     ) -> bool:
+        return await self._set_encoded(key, self.codec.encode(value), ttl)
+    
+    async def _set_encoded(self, key: str, serialized_value: bytes, ttl: Optional[int] = None) -> bool:
         if self.redis_client is None:
             await self.connect()
         
         try:
             ttl = ttl or settings.cache_ttl
-            serialized_value = json.dumps(value, default=str)
             
             result = await self.redis_client.setex(
                 key, 
@@ -83,7 +97,7 @@ class CacheService:
                 serialized_value
             )
             return result
-            
+        
         except Exception as e:
             logger.error(f"Failed to set cache key {key}: {str(e)}")
             return False
@@ -95,36 +109,37 @@ class CacheService:
         try:
             result = await self.redis_client.delete(key)
             return result > 0
-            
+        
         except Exception as e:
             logger.error(f"Failed to delete cache key {key}: {str(e)}")
             return False
     
-    async def get_search_cache(self, image_data: str) -> Optional[List[dict]]:
-        cache_key = self._generate_cache_key("search", image_data)
+    async def get_search_cache(self, fingerprint: str) -> Optional[List[dict]]:
+        cache_key = self._fingerprint_key("search", fingerprint)
         return await self.get(cache_key)
     
     async def set_search_cache(
         self, 
-        image_data: str, 
+        fingerprint: str, 
         results: List[dict], 
         ttl: Optional[int] = None
     ) -> bool:
-        cache_key = self._generate_cache_key("search", image_data)
+        cache_key = self._fingerprint_key("search", fingerprint)
         return await self.set(cache_key, results, ttl)
     
-    async def get_feature_cache(self, image_data: str) -> Optional[List[float]]:
-        cache_key = self._generate_cache_key("features", image_data)
-        return await self.get(cache_key)
+    async def get_feature_cache(self, fingerprint: str) -> Optional[List[float]]:
+        cache_key = self._fingerprint_key("features", fingerprint)
+        features = await self.get(cache_key)
+        return features.tolist() if isinstance(features, np.ndarray) else features
     
     async def set_feature_cache(
         self, 
-        image_data: str, 
+        fingerprint: str, 
         features: List[float], 
         ttl: Optional[int] = None
     ) -> bool:
-        cache_key = self._generate_cache_key("features", image_data)
-        return await self.set(cache_key, features, ttl)
+        cache_key = self._fingerprint_key("features", fingerprint)
+        return await self._set_encoded(cache_key, self.codec.encode_vector(features), ttl)
     
     async def clear_all(self) -> bool:
         if self.redis_client is None:
@@ -134,7 +149,7 @@ class CacheService:
             await self.redis_client.flushdb()
             logger.info("All cache cleared")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Failed to clear cache: {str(e)}")
             return False
@@ -153,7 +168,7 @@ class CacheService:
                 "keyspace_misses": info.get("keyspace_misses", 0),
                 "total_commands_processed": info.get("total_commands_processed", 0),
             }
-            
+        
         except Exception as e:
             logger.error(f"Failed to get cache stats: {str(e)}")
             return {}
@@ -1,101 +1,643 @@
 import asyncio
-import json
+import dataclasses
 import time
-from typing import Any, Dict, List, Optional, Set
-from datetime import datetime, timedelta
-import redis.asyncio as redis
-from collections import defaultdict
-import heapq
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from collections import OrderedDict
+from functools import lru_cache
 import logging
+import numpy as np
+
+from app.config import get_settings
+from app.config_scale import get_scale_settings
+from app.core.metrics import (
+    cache_tier_hits_total, cache_tier_evictions_total, cache_l1_bytes, semantic_cache_lookups_total,
+    search_coalesced_total, search_early_refreshes_total, cache_ttl_promotions_total, cache_l1_pinned_entries,
+    cache_bloom_lookups_total, cache_bloom_false_positive_rate, cache_bloom_error_rate_target, cache_prefetch_total,
+    search_partial_uncached_total
+)
+from app.services.cache_service import CacheService, get_cache_service
+from app.services.search_budget import is_degraded
+from app.services.search_cache_entry import SearchCacheLookup, make_entry, lookup, serve_from_entry
+from app.services.semantic_cache import SemanticResultCache
+from app.services.cache_generation import CacheGeneration
+from app.services.single_flight import SingleFlight, RedisLease, should_refresh_early
+from app.services.frequency_sketch import FrequencySketch
+from app.services.ttl_policy import PopularityTTLPolicy
+from app.services.heavy_hitters import HeavyHitterTracker
+from app.services.bloom_filter import SharedBloomFilter
+from app.services.hot_query_log import HotQueryLog
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Rough per-entry cost of the node, dict slot and key string on top of the
+# encoded value, so tiny entries still count against the byte budget.
+NODE_OVERHEAD = 200
+
+
+class _Node:
+    __slots__ = ('key', 'value', 'weight', 'expires_at', 'segment', 'prev', 'next')
+    
+    def __init__(self, key: Optional[str] = None, value: Any = None, weight: int = 0,
+                 expires_at: Optional[float] = None):
+        self.key = key
+        self.value = value
+        self.weight = weight
+        self.expires_at = expires_at
+        self.segment: Optional["_Segment"] = None
+        self.prev: "_Node" = self
+        self.next: "_Node" = self
+
+
+class _Segment:
+    # Doubly linked LRU list around a sentinel; head.next is most recent.
+    __slots__ = ('name', 'head', 'weight', 'max_weight')
+    
+    def __init__(self, name: str, max_weight: int):
+        self.name = name
+        self.head = _Node()
+        self.weight = 0
+        self.max_weight = max_weight
+    
+    def push_front(self, node: _Node):
+        node.prev = self.head
+        node.next = self.head.next
+        self.head.next.prev = node
+        self.head.next = node
+        node.segment = self
+        self.weight += node.weight
+    
+    def remove(self, node: _Node):
+        node.prev.next = node.next
+        node.next.prev = node.prev
+        node.segment = None
+        self.weight -= node.weight
+    
+    def lru(self) -> Optional[_Node]:
+        node = self.head.prev
+        return None if node is self.head else node
 
 
-class LFUCache:
-    def __init__(self, capacity: int):
-        self.capacity = capacity
-        self.cache = {}
-        self.freq = defaultdict(int)
-        self.min_freq = 0
-        self.freq_to_keys = defaultdict(set)
+class TinyLFUCache:
+    # W-TinyLFU bounded by bytes: new entries land in a small LRU window;
+    # an entry leaving the window only enters the main SLRU (probation +
+    # protected) if the frequency sketch says it is more popular than the
+    # entry it would push out, so one-off queries cannot flush hot ones.
+    # Keys named by `pin()` live in a separate pinned segment that eviction
+    # never scans; it is carved out of `max_bytes` up front.
+    def __init__(self, max_bytes: int, window_ratio: float = 0.01, protected_ratio: float = 0.8,
+                 expected_entry_bytes: int = 2048, pinned_ratio: float = 0.0):
+        self.max_bytes = max_bytes
+        window_bytes = max(1, int(max_bytes * window_ratio))
+        pinned_bytes = int(max_bytes * pinned_ratio)
+        self.main_bytes = max_bytes - window_bytes - pinned_bytes
+        self.pinned = _Segment("pinned", pinned_bytes)
+        self.pinned_keys: Set[str] = set()
+        self.window = _Segment("window", window_bytes)
+        self.probation = _Segment("probation", self.main_bytes)
+        self.protected = _Segment("protected", int(self.main_bytes * protected_ratio))
+        self.sketch = FrequencySketch(max_bytes // expected_entry_bytes)
+        self.entries: Dict[str, _Node] = {}
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'rejections': 0,
+            'pinned_hits': 0
+        }
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+    
+    @property
+    def bytes_used(self) -> int:
+        return self.window.weight + self.probation.weight + self.protected.weight + self.pinned.weight
     
     def get(self, key: str) -> Optional[Any]:
-        if key not in self.cache:
+        self.sketch.increment(key)
+        node = self.entries.get(key)
+        
+        if node is not None and node.expires_at is not None and node.expires_at <= time.time():
+            self._discard(node)
+            node = None
+        
+        if node is None:
+            self.stats['misses'] += 1
             return None
         
-        self._update_freq(key)
-        return self.cache[key]
+        self.stats['hits'] += 1
+        segment = node.segment
+        segment.remove(node)
+        if segment is self.pinned:
+            self.stats['pinned_hits'] += 1
+            segment.push_front(node)
+        elif segment is self.probation:
+            self.protected.push_front(node)
+            self._demote_protected()
+        else:
+            segment.push_front(node)
+        return node.value
     
-    def put(self, key: str, value: Any):
-        if self.capacity <= 0:
-            return
+    def put(self, key: str, value: Any, weight: int, ttl: Optional[float] = None) -> int:
+        # Returns how many entries were evicted to make room.
+        self.sketch.increment(key)
+        expires_at = time.time() + ttl if ttl else None
         
-        if key in self.cache:
-            self.cache[key] = value
-            self._update_freq(key)
-            return
+        node = self.entries.get(key)
+        if weight > self.main_bytes:
+            # Could never be admitted; drop a smaller older value as well.
+            if node is not None:
+                self._discard(node)
+            return 0
         
-        if len(self.cache) >= self.capacity:
-            self._evict()
+        if node is not None:
+            segment = node.segment
+            segment.remove(node)
+            node.value, node.weight, node.expires_at = value, weight, expires_at
+            segment.push_front(node)
+            if segment is self.protected:
+                self._demote_protected()
+            elif segment is self.pinned and self.pinned.weight > self.pinned.max_weight:
+                # Grew past the pinned budget: compete like any other entry.
+                self.pinned.remove(node)
+                self.window.push_front(node)
+        else:
+            node = _Node(key, value, weight, expires_at)
+            self.entries[key] = node
+            if key in self.pinned_keys and self.pinned.weight + weight <= self.pinned.max_weight:
+                self.pinned.push_front(node)
+            else:
+                self.window.push_front(node)
         
-        self.cache[key] = value
-        self.freq[key] = 1
-        self.freq_to_keys[1].add(key)
-        self.min_freq = 1
+        return self._evict()
+    
+    def pin(self, keys: Iterable[str]) -> int:
+        # Replaces the pinned key set. Entries that are no longer pinned go
+        # back through admission from probation; newly pinned entries already
+        # cached move in while the pinned budget allows. Returns evictions.
+        self.pinned_keys = set(keys)
+        
+        for node in self._nodes(self.pinned):
+            if node.key not in self.pinned_keys:
+                self.pinned.remove(node)
+                self.probation.push_front(node)
+        
+        for key in self.pinned_keys:
+            node = self.entries.get(key)
+            if node is None or node.segment is self.pinned:
+                continue
+            if self.pinned.weight + node.weight > self.pinned.max_weight:
+                continue
+            node.segment.remove(node)
+            self.pinned.push_front(node)
+        
+        return self._evict()
+    
+    def _nodes(self, segment: _Segment) -> List[_Node]:
+        nodes = []
+        node = segment.head.next
+        while node is not segment.head:
+            nodes.append(node)
+            node = node.next
+        return nodes
+    
+    def remove(self, key: str) -> bool:
+        node = self.entries.get(key)
+        if node is None:
+            return False
+        self._discard(node)
+        return True
+    
+    def clear(self):
+        for node in list(self.entries.values()):
+            self._discard(node)
+    
+    def _discard(self, node: _Node):
+        node.segment.remove(node)
+        del self.entries[node.key]
     
-    def _update_freq(self, key: str):
-        freq = self.freq[key]
-        self.freq[key] += 1
-        self.freq_to_keys[freq].remove(key)
+    def _demote_protected(self):
+        while self.protected.weight > self.protected.max_weight:
+            node = self.protected.lru()
+            self.protected.remove(node)
+            self.probation.push_front(node)
+    
+    def _evict(self) -> int:
+        evicted = 0
+        while self.window.weight > self.window.max_weight:
+            candidate = self.window.lru()
+            self.window.remove(candidate)
+            evicted += self._admit(candidate)
         
-        if not self.freq_to_keys[freq]:
-            del self.freq_to_keys[freq]
-            if freq == self.min_freq:
-                self.min_freq += 1
+        # Updates that grew an entry in the main space can overshoot as well.
+        while self.probation.weight + self.protected.weight > self.main_bytes:
+            victim = self.probation.lru() or self.protected.lru()
+            self._discard(victim)
+            evicted += 1
         
-        self.freq_to_keys[freq + 1].add(key)
+        self.stats['evictions'] += evicted
+        return evicted
     
-    def _evict(self):
-        key = next(iter(self.freq_to_keys[self.min_freq]))
-        self.freq_to_keys[self.min_freq].remove(key)
+    def _admit(self, candidate: _Node) -> int:
+        evicted = 0
+        candidate_frequency = self.sketch.frequency(candidate.key)
         
-        if not self.freq_to_keys[self.min_freq]:
-            del self.freq_to_keys[self.min_freq]
+        while self.probation.weight + self.protected.weight + candidate.weight > self.main_bytes:
+            victim = self.probation.lru() or self.protected.lru()
+            if victim is None or candidate_frequency <= self.sketch.frequency(victim.key):
+                del self.entries[candidate.key]
+                self.stats['rejections'] += 1
+                return evicted + 1
+            self._discard(victim)
+            evicted += 1
         
-        del self.cache[key]
-        del self.freq[key]
+        self.probation.push_front(candidate)
+        return evicted
+    
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'entries': len(self.entries),
+            'pinned_entries': len(self._nodes(self.pinned)),
+            'pinned_bytes': self.pinned.weight,
+            'bytes': self.bytes_used,
+            'max_bytes': self.max_bytes,
+            'hit_rate': self.stats['hits'] / lookups if lookups else 0.0
+        }
 
 
 class AdvancedCacheService:
-    def __init__(self, redis_url: str, cache_size: int = 10000):
-        self.redis_url = redis_url
-        self.redis_client: Optional[redis.Redis] = None
-        self.local_cache = LFUCache(cache_size)
-        self.prefetch_queue = asyncio.Queue(maxsize=1000)
+    # In-process W-TinyLFU tier (L1) in front of the Redis-backed
+    # CacheService (L2). L1 keeps the codec-encoded bytes, so its byte bound
+    # is exact and a promoted entry is never re-encoded.
+    def __init__(self, cache_service: CacheService, local_cache_bytes: int = 256 * 1024 * 1024,
+                 window_ratio: float = 0.01, semantic_cache: Optional[SemanticResultCache] = None,
+                 generation_refresh_interval: float = 1.0, lease_timeout: float = 5.0,
+                 xfetch_beta: float = 1.0, ttl_policy: Optional[PopularityTTLPolicy] = None,
+                 pinned_ratio: float = 0.05, heavy_hitters: Optional[HeavyHitterTracker] = None,
+                 heavy_hitters_sync_interval: float = 10.0, key_filter: Optional[SharedBloomFilter] = None,
+                 hot_queries: Optional[HotQueryLog] = None, hot_query_log_interval: float = 60.0,
+                 prefetch_size: int = 1000, prefetch_max_qps: float = 20.0):
+        self.cache_service = cache_service
+        self.codec = cache_service.codec
+        self.redis_client = None
+        self.local_cache = TinyLFUCache(local_cache_bytes, window_ratio, pinned_ratio=pinned_ratio)
+        self.heavy_hitters = heavy_hitters or HeavyHitterTracker()
+        self.heavy_hitters_sync_interval = heavy_hitters_sync_interval
+        self.key_filter = key_filter
+        self.hot_queries = hot_queries or HotQueryLog()
+        self.hot_query_log_interval = hot_query_log_interval
+        self._hot_queries_persisted = time.time()
+        self.semantic_cache = semantic_cache
+        self.generation = CacheGeneration(refresh_interval=generation_refresh_interval)
+        self.flights = SingleFlight()
+        self.lease = RedisLease(lease_ms=int(lease_timeout * 1000))
+        self.xfetch_beta = xfetch_beta
+        self.ttl_policy = ttl_policy or PopularityTTLPolicy()
+        self.prefetch_queue = asyncio.Queue(maxsize=prefetch_size)
+        self.prefetch_max_qps = prefetch_max_qps
+        self._prefetch_seen: "OrderedDict[str, None]" = OrderedDict()
         self.stats = {
-            'hits': 0,
+            'l1_hits': 0,
+            'l2_hits': 0,
             'misses': 0,
+            'prefetch_queued': 0,
+            'prefetch_dropped': 0,
+            'prefetch_skipped': 0,
+            'prefetch_computed': 0,
             'prefetch_hits': 0,
-            'evictions': 0
+            'l1_evictions': 0,
+            'l2_evictions': 0
         }
+        self._redis_evicted_keys: Optional[int] = None
         self._prefetch_task = None
+        self._heavy_hitters_task = None
+        self._key_filter_task = None
     
     async def connect(self):
-        self.redis_client = redis.from_url(self.redis_url, decode_responses=False)
-        await self.redis_client.ping()
+        if self.redis_client is not None:
+            return
+        
+        await self.cache_service.connect()
+        self.redis_client = self.cache_service.redis_client
+        self.generation.bind(self.redis_client)
+        self.lease.bind(self.redis_client)
+        self.heavy_hitters.bind(self.redis_client)
         self._prefetch_task = asyncio.create_task(self._prefetch_worker())
+        self._heavy_hitters_task = asyncio.create_task(self._heavy_hitters_worker())
+        if self.key_filter is not None:
+            self.key_filter.bind(self.redis_client)
+            self._key_filter_task = asyncio.create_task(self._key_filter_worker())
         logger.info("Advanced cache service connected")
     
     async def disconnect(self):
+        # The Redis client belongs to the wrapped CacheService.
         if self._prefetch_task:
             self._prefetch_task.cancel()
+        if self._heavy_hitters_task:
+            self._heavy_hitters_task.cancel()
+        if self._key_filter_task:
+            self._key_filter_task.cancel()
+        if self.key_filter is not None:
+            self.key_filter.bind(None)
+        self.generation.bind(None)
+        self.lease.bind(None)
+        self.heavy_hitters.bind(None)
+        self.redis_client = None
+    
+    def _record_hit(self, tier: str):
+        self.stats[f'{tier}_hits'] += 1
+        cache_tier_hits_total.labels(tier=tier).inc()
+    
+    def _get_local(self, key: str) -> Optional[Any]:
+        data = self.local_cache.get(key)
+        if data is None:
+            return None
+        self._record_hit("l1")
+        return self.codec.decode(data)
+    
+    def _put_local(self, key: str, data: bytes, ttl: Optional[float] = None):
+        evicted = self.local_cache.put(key, data, len(data) + NODE_OVERHEAD, ttl)
+        if evicted:
+            self.stats['l1_evictions'] += evicted
+            cache_tier_evictions_total.labels(tier="l1").inc(evicted)
+        cache_l1_bytes.set(self.local_cache.bytes_used)
+    
+    async def get(self, key: str, filtered: bool = False) -> Optional[Any]:
+        # `filtered` keys are only written through set(..., filtered=True), so
+        # the key filter can rule them out without a Redis round trip.
+        value = self._get_local(key)
+        if value is not None:
+            return value
+        
+        if filtered and self.key_filter is not None and not self.key_filter.might_contain(key):
+            cache_bloom_lookups_total.labels(outcome="skipped").inc()
+            self.stats['misses'] += 1
+            return None
+        
         if self.redis_client:
-            await self.redis_client.close()
+            try:
+                pipeline = self.redis_client.pipeline()
+                pipeline.get(key)
+                pipeline.ttl(key)
+                data, ttl = await pipeline.execute()
+                
+                if filtered and self.key_filter is not None and self.key_filter.ready:
+                    cache_bloom_lookups_total.labels(
+                        outcome="present" if data is not None else "false_positive"
+                    ).inc()
+                
+                if data is not None:
+                    self._record_hit("l2")
+                    # Promoted entries expire from L1 no later than in Redis.
+                    self._put_local(key, data, ttl if ttl and ttl > 0 else None)
+                    return self.codec.decode(data)
+            except Exception as e:
+                logger.error(f"Cache get error: {str(e)}")
+        
+        self.stats['misses'] += 1
+        return None
+    
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None, filtered: bool = False) -> bool:
+        if filtered and self.key_filter is not None:
+            self.key_filter.add(key)
+        data = self.codec.encode(value)
+        self._put_local(key, data, ttl or settings.cache_ttl)
+        return await self.cache_service._set_encoded(key, data, ttl)
+    
+    def _search_key(self, fingerprint: str, generation: int) -> str:
+        return self.cache_service._fingerprint_key("search", f"g{generation}:{fingerprint}")
+    
+    async def get_search_cache(self, fingerprint: str, top_k: int, threshold: float,
+                               effort: Optional[str] = None) -> SearchCacheLookup:
+        # `effort` is the most the request could spend now; entries computed
+        # at less than full effort are recomputed when it is higher.
+        self.ttl_policy.record(fingerprint)
+        self.heavy_hitters.record(fingerprint)
+        generation = await self.generation.current()
+        key = self._search_key(fingerprint, generation)
+        entry = await self.get(key, filtered=True)
+        result = lookup(entry, top_k, threshold, generation, effort)
+        
+        if result.results is not None:
+            entry = await self._promote(key, fingerprint, entry)
+            if entry.get('prefetched'):
+                await self._record_prefetch_hit(key)
+        if result.results is not None and 'expires_at' in entry and should_refresh_early(
+            entry['compute_seconds'], entry['expires_at'], self.xfetch_beta
+        ):
+            # Serve this hit, but recompute the whole entry before it expires.
+            search_early_refreshes_total.inc()
+            result = dataclasses.replace(
+                result, refresh=True, fetch_top_k=entry['top_k'], fetch_threshold=entry['threshold']
+            )
+        return result
     
-    async def get_with_ttl(self, key: str) -> Optional[Tuple[Any, int]]:
-        local_result = self.local_cache.get(key)
+    async def _promote(self, key: str, fingerprint: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        # Entries are written with the TTL their popularity earned at the
+        # time; once hits push the fingerprint into a longer tier, rewrite
+        # the entry so Redis (and XFetch's expires_at) keep it that long.
+        ttl = self._entry_ttl(fingerprint, entry)
+        if 'ttl' not in entry or ttl <= entry['ttl']:
+            return entry
+        
+        entry = {**entry, 'ttl': ttl, 'expires_at': time.time() + ttl}
+        if await self.set(key, entry, ttl, filtered=True):
+            tier = self.ttl_policy.tier(fingerprint)
+            self.ttl_policy.promotions[tier] += 1
+            cache_ttl_promotions_total.labels(tier=tier).inc()
+        return entry
+    
+    def _entry_ttl(self, fingerprint: str, entry: Dict[str, Any]) -> int:
+        # Degraded answers are kept only briefly and never promoted, so a
+        # deadline-squeezed search cannot pin an approximation for a day.
+        if is_degraded(entry.get('effort')):
+            return self.ttl_policy.ttls['short']
+        return self.ttl_policy.ttl(fingerprint)
+    
+    async def fill_search_cache(
+        self,
+        fingerprint: str,
+        cache_lookup: SearchCacheLookup,
+        compute: Callable[[int, float], Awaitable[Dict[str, Any]]],
+        wait: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        # One computation per key across the cluster: callers in this process
+        # share a flight, and the flight holds a Redis lease so other workers
+        # wait for the published entry instead of recomputing it. Returns the
+        # entry, or None when `wait` is off and another worker holds the lease.
+        key = self._search_key(fingerprint, cache_lookup.generation)
+        flight_key = f"{key}:{cache_lookup.fetch_top_k}:{cache_lookup.fetch_threshold}"
+        if self.flights.in_flight(flight_key):
+            search_coalesced_total.labels(scope="local").inc()
+        
+        return await self.flights.do(
+            flight_key, lambda: self._fill_leased(key, flight_key, fingerprint, cache_lookup, compute, wait)
+        )
+    
+    async def _fill_leased(self, key: str, flight_key: str, fingerprint: str, cache_lookup: SearchCacheLookup,
+                           compute: Callable[[int, float], Awaitable[Dict[str, Any]]],
+                           wait: bool) -> Optional[Dict[str, Any]]:
+        token = await self.lease.acquire(flight_key)
+        if token is None:
+            if not wait:
+                return None
+            entry = await self._wait_for_entry(key, cache_lookup)
+            if entry is not None:
+                search_coalesced_total.labels(scope="remote").inc()
+                return entry
+            # The holder is slow or died; compute without the lease.
+        
+        try:
+            start_time = time.time()
+            entry = await compute(cache_lookup.fetch_top_k, cache_lookup.fetch_threshold)
+            ttl = self._entry_ttl(fingerprint, entry)
+            entry = {
+                **entry,
+                'compute_seconds': time.time() - start_time,
+                'ttl': ttl,
+                'expires_at': time.time() + ttl
+            }
+            if entry.get('partial'):
+                # Missing some shards' matches; the next request retries them.
+                search_partial_uncached_total.inc()
+                return entry
+            # Published before the lease is released so waiting workers find it.
+            await self.set(key, entry, ttl, filtered=True)
+            return entry
+        finally:
+            if token is not None:
+                await self.lease.release(flight_key, token)
+    
+    async def _wait_for_entry(self, key: str, cache_lookup: SearchCacheLookup) -> Optional[Dict[str, Any]]:
+        deadline = time.time() + self.lease.lease_ms / 1000
+        delay = 0.01
+        while time.time() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+            
+            try:
+                data = await self.redis_client.get(key)
+            except Exception as e:
+                logger.error(f"Failed to poll cache key {key}: {str(e)}")
+                return None
+            
+            if data is not None:
+                entry = self.codec.decode(data)
+                if serve_from_entry(entry, cache_lookup.fetch_top_k, cache_lookup.fetch_threshold) is not None:
+                    self._put_local(key, data, entry.get('ttl', settings.cache_ttl))
+                    if self.key_filter is not None:
+                        # Published by the lease holder; only our copy lags.
+                        self.key_filter.add(key, publish=False)
+                    return entry
+        return None
+    
+    async def invalidate_results(self, scope: str = "global") -> Optional[int]:
+        # O(1): cached results stop being addressable once the generation moves.
+        generation = await self.generation.bump(scope)
+        self._pin_hot()
+        return generation
+    
+    def _pin_hot(self):
+        # Pin the current-generation result entry and the embedding of each
+        # cluster-wide heavy hitter; they fill on their next lookup.
+        generation = self.generation.cached() or 0
+        keys = []
+        for fingerprint, _ in self.heavy_hitters.hot:
+            keys.append(self._search_key(fingerprint, generation))
+            keys.append(self.cache_service._fingerprint_key("features", fingerprint))
+        
+        evicted = self.local_cache.pin(keys)
+        if evicted:
+            self.stats['l1_evictions'] += evicted
+            cache_tier_evictions_total.labels(tier="l1").inc(evicted)
+        cache_l1_pinned_entries.set(self.local_cache.get_stats()['pinned_entries'])
+    
+    async def _heavy_hitters_worker(self):
+        while True:
+            try:
+                await asyncio.sleep(self.heavy_hitters_sync_interval)
+                await self.heavy_hitters.sync()
+                self._pin_hot()
+                if time.time() - self._hot_queries_persisted >= self.hot_query_log_interval:
+                    self._hot_queries_persisted = time.time()
+                    await self.hot_queries.persist(self.redis_client, self.heavy_hitters.hot)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Heavy hitter sync error: {str(e)}")
+    
+    async def _key_filter_worker(self):
+        cache_bloom_error_rate_target.set(self.key_filter.error_rate)
+        over_target = False
+        while True:
+            try:
+                await self.key_filter.sync()
+                false_positive_rate = self.key_filter.false_positive_rate()
+                cache_bloom_false_positive_rate.set(false_positive_rate)
+                if false_positive_rate > self.key_filter.error_rate and not over_target:
+                    logger.warning(
+                        f"Bloom filter false positive rate {false_positive_rate:.4f} exceeds its "
+                        f"{self.key_filter.error_rate} target ({self.key_filter.get_stats()['slices']} slices); "
+                        f"raise bloom_filter_capacity or bloom_filter_max_slices"
+                    )
+                over_target = false_positive_rate > self.key_filter.error_rate
+                await asyncio.sleep(self.key_filter.sync_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Bloom filter sync error: {str(e)}")
+                await asyncio.sleep(self.key_filter.sync_interval)
+    
+    def semantic_lookup(self, features: np.ndarray, top_k: int, threshold: float) -> Optional[Dict[str, Any]]:
+        # Second chance after inference: a visually identical query with
+        # different bytes (re-encoded, resized) lands next to the cached one.
+        if self.semantic_cache is None:
+            return None
+        
+        entry, similarity = self.semantic_cache.get(features)
+        if entry is not None and entry.get('generation') != (self.generation.cached() or 0):
+            entry = None
+        if entry is None:
+            semantic_cache_lookups_total.labels(outcome="miss").inc()
+            return None
+        
+        if serve_from_entry(entry, top_k, threshold) is None:
+            semantic_cache_lookups_total.labels(outcome="insufficient").inc()
+            return None
+        semantic_cache_lookups_total.labels(outcome="hit").inc()
+        return entry
+    
+    def record_query(self, fingerprint: str, features: np.ndarray, top_k: int, threshold: float):
+        # Embeddings of computed queries, kept so hot ones can be replayed
+        # by the cache warmer.
+        self.hot_queries.observe(fingerprint, features, top_k, threshold)
+    
+    def semantic_store(self, features: np.ndarray, results: List[dict], top_k: int, threshold: float,
+                       generation: int):
+        if self.semantic_cache is not None:
+            self.semantic_cache.put(features, {**make_entry(results, top_k, threshold), 'generation': generation})
+    
+    async def get_feature_cache(self, fingerprint: str) -> Optional[np.ndarray]:
+        features = await self.get(self.cache_service._fingerprint_key("features", fingerprint), filtered=True)
+        return features if isinstance(features, np.ndarray) else None
+    
+    async def set_feature_cache(self, fingerprint: str, features: np.ndarray, ttl: Optional[int] = None) -> bool:
+        key = self.cache_service._fingerprint_key("features", fingerprint)
+        data = self.codec.encode_vector(features)
+        ttl = ttl or self.ttl_policy.ttl(fingerprint)
+        if self.key_filter is not None:
+            self.key_filter.add(key)
+        self._put_local(key, data, ttl)
+        return await self.cache_service._set_encoded(key, data, ttl)
+    
+    async def get_with_ttl(self, key: str) -> Tuple[Optional[Any], int]:
+        local_result = self._get_local(key)
         if local_result is not None:
-            self.stats['hits'] += 1
             return local_result, -1
         
         if self.redis_client:
@@ -106,10 +648,9 @@ class AdvancedCacheService:
                 value, ttl = await pipeline.execute()
                 
                 if value is not None:
-                    self.stats['hits'] += 1
-                    deserialized = json.loads(value)
-                    self.local_cache.put(key, deserialized)
-                    return deserialized, ttl
+                    self._record_hit("l2")
+                    self._put_local(key, value, ttl if ttl and ttl > 0 else None)
+                    return self.codec.decode(value), ttl
             except Exception as e:
                 logger.error(f"Cache get error: {str(e)}")
         
@@ -117,7 +658,7 @@ class AdvancedCacheService:
         return None, -1
     
     async def set_with_priority(self, key: str, value: Any, ttl: int, priority: int = 0):
-        serialized = json.dumps(value, default=str)
+        serialized = self.codec.encode(value)
         
         if self.redis_client:
             try:
@@ -126,7 +667,7 @@ class AdvancedCacheService:
                 pipeline.zadd(f"cache:priority", {key: priority})
                 await pipeline.execute()
                 
-                self.local_cache.put(key, value)
+                self._put_local(key, serialized, ttl)
             except Exception as e:
                 logger.error(f"Cache set error: {str(e)}")
     
@@ -135,10 +676,9 @@ class AdvancedCacheService:
         redis_keys = []
         
         for key in keys:
-            local_result = self.local_cache.get(key)
+            local_result = self._get_local(key)
             if local_result is not None:
                 results[key] = local_result
-                self.stats['hits'] += 1
             else:
                 redis_keys.append(key)
         
@@ -147,10 +687,9 @@ class AdvancedCacheService:
                 values = await self.redis_client.mget(redis_keys)
                 for key, value in zip(redis_keys, values):
                     if value is not None:
-                        deserialized = json.loads(value)
-                        results[key] = deserialized
-                        self.local_cache.put(key, deserialized)
-                        self.stats['hits'] += 1
+                        results[key] = self.codec.decode(value)
+                        self._put_local(key, value)
+                        self._record_hit("l2")
                     else:
                         self.stats['misses'] += 1
             except Exception as e:
@@ -178,46 +717,93 @@ class AdvancedCacheService:
                     values = await self.redis_client.mget(keys)
                     for key, value in zip(keys, values):
                         if value is not None:
-                            try:
-                                deserialized = json.loads(value)
-                                self.local_cache.put(key.decode(), deserialized)
-                                warmed += 1
-                            except:
-                                pass
+                            self._put_local(key.decode(), value)
+                            warmed += 1
             
             logger.info(f"Warmed {warmed} cache entries")
         except Exception as e:
             logger.error(f"Cache warming error: {str(e)}")
     
-    async def prefetch(self, keys: List[str]):
-        for key in keys:
-            try:
-                await self.prefetch_queue.put(key)
-            except asyncio.QueueFull:
-                pass
+    def prefetch(self, fingerprint: str, top_k: int, threshold: float,
+                 compute: Callable[[int, float], Awaitable[Dict[str, Any]]]) -> bool:
+        # Low-priority background fill of a search the caller expects soon.
+        # Never blocks: when the queue is full the prefetch is dropped.
+        try:
+            self.prefetch_queue.put_nowait((fingerprint, top_k, threshold, compute))
+        except asyncio.QueueFull:
+            self.stats['prefetch_dropped'] += 1
+            cache_prefetch_total.labels(outcome="dropped").inc()
+            return False
+        self.stats['prefetch_queued'] += 1
+        cache_prefetch_total.labels(outcome="queued").inc()
+        return True
     
     async def _prefetch_worker(self):
+        # One prefetch at a time, at most prefetch_max_qps, so background
+        # work never competes with live searches for more than a trickle.
         while True:
             try:
-                keys_batch = []
+                fingerprint, top_k, threshold, compute = await self.prefetch_queue.get()
+                start_time = time.time()
+                await self._prefetch_one(fingerprint, top_k, threshold, compute)
                 
-                try:
-                    key = await asyncio.wait_for(self.prefetch_queue.get(), timeout=1.0)
-                    keys_batch.append(key)
-                    
-                    while len(keys_batch) < 50 and not self.prefetch_queue.empty():
-                        keys_batch.append(self.prefetch_queue.get_nowait())
-                except asyncio.TimeoutError:
-                    continue
-                
-                if keys_batch:
-                    await self.batch_get(keys_batch)
-                    self.stats['prefetch_hits'] += len(keys_batch)
-                    
+                if self.prefetch_max_qps > 0:
+                    await asyncio.sleep(max(0.0, 1.0 / self.prefetch_max_qps - (time.time() - start_time)))
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"Prefetch worker error: {str(e)}")
                 await asyncio.sleep(1)
     
+    async def _prefetch_one(self, fingerprint: str, top_k: int, threshold: float,
+                            compute: Callable[[int, float], Awaitable[Dict[str, Any]]]):
+        generation = await self.generation.current()
+        key = self._search_key(fingerprint, generation)
+        if await self._is_cached(key):
+            self.stats['prefetch_skipped'] += 1
+            cache_prefetch_total.labels(outcome="skipped").inc()
+            return
+        
+        async def compute_prefetched(fetch_top_k: int, fetch_threshold: float) -> Dict[str, Any]:
+            return {**await compute(fetch_top_k, fetch_threshold), 'prefetched': True}
+        
+        entry = await self.fill_search_cache(
+            fingerprint, SearchCacheLookup(None, top_k, threshold, generation), compute_prefetched, wait=False
+        )
+        if entry is None:
+            return
+        
+        if self.redis_client:
+            # Marks the entry unused until its first hit, on whichever worker.
+            await self.redis_client.setex(f"prefetch:{key}", entry.get('ttl', settings.cache_ttl), 1)
+        self.stats['prefetch_computed'] += 1
+        cache_prefetch_total.labels(outcome="computed").inc()
+    
+    async def _is_cached(self, key: str) -> bool:
+        if key in self.local_cache:
+            return True
+        if self.key_filter is not None and not self.key_filter.might_contain(key):
+            return False
+        if self.redis_client is None:
+            return False
+        return bool(await self.redis_client.exists(key))
+    
+    async def _record_prefetch_hit(self, key: str):
+        # Counts the first hit on a prefetched entry across the cluster; each
+        # worker checks a given key once.
+        if self.redis_client is None or key in self._prefetch_seen:
+            return
+        self._prefetch_seen[key] = None
+        while len(self._prefetch_seen) > 10000:
+            self._prefetch_seen.popitem(last=False)
+        
+        try:
+            if await self.redis_client.delete(f"prefetch:{key}"):
+                self.stats['prefetch_hits'] += 1
+                cache_prefetch_total.labels(outcome="hit").inc()
+        except Exception as e:
+            logger.error(f"Failed to record prefetch hit {key}: {str(e)}")
+    
     async def invalidate_pattern(self, pattern: str):
         if not self.redis_client:
             return
@@ -235,19 +821,105 @@ class AdvancedCacheService:
                 
                 if keys:
                     await self.redis_client.delete(*keys)
+                    for key in keys:
+                        self.local_cache.remove(key.decode())
                     deleted += len(keys)
             
             logger.info(f"Invalidated {deleted} cache entries")
         except Exception as e:
             logger.error(f"Cache invalidation error: {str(e)}")
     
-    def get_stats(self) -> Dict[str, Any]:
-        total_requests = self.stats['hits'] + self.stats['misses']
-        hit_rate = self.stats['hits'] / total_requests if total_requests > 0 else 0
+    async def _refresh_l2_evictions(self):
+        # Redis only exposes a server-wide evicted_keys counter; track its delta.
+        info = await self.redis_client.info("stats")
+        evicted_keys = info.get("evicted_keys", 0)
+        if self._redis_evicted_keys is not None and evicted_keys > self._redis_evicted_keys:
+            delta = evicted_keys - self._redis_evicted_keys
+            self.stats['l2_evictions'] += delta
+            cache_tier_evictions_total.labels(tier="l2").inc(delta)
+        self._redis_evicted_keys = evicted_keys
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        if self.redis_client:
+            try:
+                await self._refresh_l2_evictions()
+            except Exception as e:
+                logger.error(f"Failed to read Redis eviction stats: {str(e)}")
+        
+        hits = self.stats['l1_hits'] + self.stats['l2_hits']
+        total_requests = hits + self.stats['misses']
         
         return {
             **self.stats,
             'total_requests': total_requests,
-            'hit_rate': hit_rate,
-            'local_cache_size': len(self.local_cache.cache)
+            'hit_rate': hits / total_requests if total_requests > 0 else 0,
+            'l1_hit_rate': self.stats['l1_hits'] / total_requests if total_requests > 0 else 0,
+            'prefetch_hit_ratio': (
+                self.stats['prefetch_hits'] / self.stats['prefetch_computed']
+                if self.stats['prefetch_computed'] > 0 else 0
+            ),
+            'l1': self.local_cache.get_stats(),
+            'ttl_policy': self.ttl_policy.get_stats(),
+            'heavy_hitters': self.heavy_hitters.get_stats(),
+            'key_filter': self.key_filter.get_stats() if self.key_filter is not None else None,
+            'hot_queries': self.hot_queries.get_stats(),
+            'semantic': self.semantic_cache.get_stats() if self.semantic_cache is not None else None
         }
+
+
+@lru_cache()
+def get_advanced_cache_service() -> AdvancedCacheService:
+    scale_settings = get_scale_settings()
+    
+    key_filter = None
+    if scale_settings.bloom_filter_enabled:
+        key_filter = SharedBloomFilter(
+            capacity=scale_settings.bloom_filter_capacity,
+            error_rate=scale_settings.bloom_filter_error_rate,
+            epoch_seconds=scale_settings.cache_ttl_long,
+            sync_interval=scale_settings.bloom_filter_sync_interval,
+            max_slices=scale_settings.bloom_filter_max_slices,
+            max_bytes=scale_settings.bloom_filter_max_bytes
+        )
+    
+    semantic_cache = None
+    if scale_settings.semantic_cache_enabled:
+        semantic_cache = SemanticResultCache(
+            n_bits=scale_settings.semantic_cache_bits,
+            n_tables=scale_settings.semantic_cache_tables,
+            similarity_threshold=scale_settings.semantic_cache_similarity,
+            max_entries=scale_settings.semantic_cache_max_entries,
+            ttl=settings.cache_ttl
+        )
+    
+    return AdvancedCacheService(
+        get_cache_service(),
+        local_cache_bytes=scale_settings.local_cache_max_bytes,
+        window_ratio=scale_settings.local_cache_window_ratio,
+        pinned_ratio=scale_settings.local_cache_pinned_ratio,
+        heavy_hitters=HeavyHitterTracker(
+            k=scale_settings.heavy_hitters_top_k,
+            window=scale_settings.heavy_hitters_window
+        ),
+        heavy_hitters_sync_interval=scale_settings.heavy_hitters_sync_interval,
+        key_filter=key_filter,
+        hot_queries=HotQueryLog(
+            max_entries=scale_settings.hot_query_log_size,
+            path=scale_settings.hot_query_log_path,
+            half_life=scale_settings.hot_query_log_interval
+        ),
+        hot_query_log_interval=scale_settings.hot_query_log_interval,
+        prefetch_size=scale_settings.prefetch_size,
+        prefetch_max_qps=scale_settings.prefetch_max_qps,
+        semantic_cache=semantic_cache,
+        generation_refresh_interval=scale_settings.cache_generation_refresh_interval,
+        lease_timeout=scale_settings.cache_lease_timeout,
+        xfetch_beta=scale_settings.cache_xfetch_beta,
+        ttl_policy=PopularityTTLPolicy(
+            short_ttl=scale_settings.cache_ttl_short,
+            medium_ttl=scale_settings.cache_ttl_medium,
+            long_ttl=scale_settings.cache_ttl_long,
+            medium_hits=scale_settings.cache_ttl_medium_hits,
+            long_hits=scale_settings.cache_ttl_long_hits
+        )
+    )
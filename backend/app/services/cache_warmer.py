@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from app.config_scale import get_scale_settings
+from app.core.metrics import cache_warmed_queries_total
+from app.services.cache_strategy import AdvancedCacheService, get_advanced_cache_service
+from app.services.hot_query_log import HotQueryLog
+from app.services.search_cache_entry import SearchCacheLookup, make_entry, partial_coverage
+from app.services.single_flight import RedisLease
+from app.services.vector_service import get_vector_service
+
+logger = logging.getLogger(__name__)
+
+# Present while the cache has been warmed since the last Redis flush.
+MARKER_KEY = "cache:warmed_at"
+
+
+class CacheWarmer:
+    # Replays the hot-query log through batched vector search, at most
+    # `max_qps` queries per second, into the result and embedding caches.
+    # Runs at startup and whenever the marker key disappears (Redis flush);
+    # a cluster-wide lease keeps workers from warming side by side, and
+    # queries whose entry already exists are skipped.
+    def __init__(self, search_cache: AdvancedCacheService, vector_service, batch_size: int = 32,
+                 max_qps: float = 50.0, check_interval: float = 30.0, lease_timeout: float = 600.0):
+        self.search_cache = search_cache
+        self.vector_service = vector_service
+        self.batch_size = batch_size
+        self.max_qps = max_qps
+        self.check_interval = check_interval
+        self.lease = RedisLease(lease_ms=int(lease_timeout * 1000))
+        self.stats = {
+            'runs': 0,
+            'warmed': 0,
+            'skipped': 0,
+            'failed': 0,
+            'last_run': None
+        }
+        self._task = None
+    
+    async def start(self):
+        if self._task is not None:
+            return
+        await self.search_cache.connect()
+        self.lease.bind(self.search_cache.redis_client)
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.lease.bind(None)
+    
+    async def _run(self):
+        while True:
+            try:
+                if await self._needs_warming():
+                    await self.warm()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache warming error: {str(e)}")
+            await asyncio.sleep(self.check_interval)
+    
+    async def _needs_warming(self) -> bool:
+        redis_client = self.search_cache.redis_client
+        if redis_client is None:
+            return False
+        return not await redis_client.exists(MARKER_KEY)
+    
+    async def warm(self) -> Dict[str, Any]:
+        redis_client = self.search_cache.redis_client
+        token = await self.lease.acquire("cache-warm")
+        if token is None:
+            return self.stats
+        
+        try:
+            entries = await self.search_cache.hot_queries.load(redis_client)
+            generation = await self.search_cache.generation.current()
+            logger.info(f"Warming cache with {len(entries)} hot queries (generation {generation})")
+            
+            for i in range(0, len(entries), self.batch_size):
+                start_time = time.time()
+                batch = await self._uncached(entries[i:i + self.batch_size], generation)
+                if batch:
+                    await self._warm_batch(batch, generation)
+                
+                # Rate limit so warming never competes with live traffic
+                # for more than max_qps searches.
+                if self.max_qps > 0:
+                    elapsed = time.time() - start_time
+                    await asyncio.sleep(max(0.0, len(batch) / self.max_qps - elapsed))
+            
+            if redis_client is not None:
+                await redis_client.set(MARKER_KEY, int(time.time()))
+            self.stats['runs'] += 1
+            self.stats['last_run'] = time.time()
+            logger.info(f"Cache warming finished: {self.stats}")
+        finally:
+            await self.lease.release("cache-warm", token)
+        return self.stats
+    
+    async def _uncached(self, entries: List[Dict[str, Any]], generation: int) -> List[Dict[str, Any]]:
+        redis_client = self.search_cache.redis_client
+        if redis_client is None:
+            return entries
+        
+        pipeline = redis_client.pipeline()
+        for entry in entries:
+            pipeline.exists(self.search_cache._search_key(entry['fingerprint'], generation))
+        exists = await pipeline.execute()
+        
+        self.stats['skipped'] += sum(1 for found in exists if found)
+        return [entry for entry, found in zip(entries, exists) if not found]
+    
+    async def _warm_batch(self, batch: List[Dict[str, Any]], generation: int):
+        queries = [(HotQueryLog.features(entry), entry['top_k'], entry['threshold']) for entry in batch]
+        
+        try:
+            all_results = await self.vector_service.search_batch(queries, include_metadata=True)
+        except Exception as e:
+            logger.error(f"Cache warming search failed: {str(e)}")
+            self.stats['failed'] += len(batch)
+            return
+        
+        for entry, (features, top_k, threshold), results in zip(batch, queries, all_results):
+            if partial_coverage(results):
+                self.stats['failed'] += 1
+                continue
+            fetched = [result.dict() for result in results]
+            
+            async def compute(fetch_top_k: int, fetch_threshold: float, fetched=fetched) -> Dict[str, Any]:
+                return make_entry(fetched, fetch_top_k, fetch_threshold)
+            
+            await self.search_cache.set_feature_cache(entry['fingerprint'], features)
+            await self.search_cache.fill_search_cache(
+                entry['fingerprint'], SearchCacheLookup(None, top_k, threshold, generation), compute, wait=False
+            )
+            self.stats['warmed'] += 1
+            cache_warmed_queries_total.inc()
+
+
+@lru_cache()
+def get_cache_warmer() -> CacheWarmer:
+    scale_settings = get_scale_settings()
+    return CacheWarmer(
+        get_advanced_cache_service(),
+        get_vector_service(),
+        batch_size=scale_settings.cache_warm_batch_size,
+        max_qps=scale_settings.cache_warm_max_qps,
+        check_interval=scale_settings.cache_warm_check_interval
+    )
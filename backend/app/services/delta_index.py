@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from app.core.metrics import delta_index_size, delta_index_results_total
+from app.models.schemas import SimilarImage
+
+logger = logging.getLogger(__name__)
+
+ConfirmFn = Callable[[Hashable, List[str], np.ndarray], Awaitable[List[str]]]
+VisibilityListener = Callable[[], Awaitable[Any]]
+
+
+class DeltaIndex:
+    # Recently written vectors that the ANN backend may not serve yet. Every
+    # search brute-forces this buffer and merges it into the backend results;
+    # entries leave once the backend confirms the point is indexed.
+    def __init__(self, dimension: int = 512, capacity: int = 10000, max_age: float = 120.0):
+        self.dimension = dimension
+        self.capacity = capacity
+        self.max_age = max_age
+        self.vectors = np.zeros((capacity, dimension), dtype=np.float32)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.added_at = np.zeros(capacity, dtype=np.float64)
+        self.entries: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self.slot_by_point: Dict[str, int] = {}
+        self.slot_by_image: Dict[str, int] = {}
+        self.free_slots = list(range(capacity - 1, -1, -1))
+        self._lock = threading.Lock()
+        self._reconcile_task: Optional[asyncio.Task] = None
+        self.listeners: List[VisibilityListener] = []
+    
+    def __len__(self) -> int:
+        return len(self.slot_by_point)
+    
+    def add(self, vectors: List[np.ndarray], image_ids: List[str], point_ids: List[str],
+            metadata: List[Dict[str, Any]], location: Hashable = None):
+        with self._lock:
+            now = time.time()
+            for vector, image_id, point_id, meta in zip(vectors, image_ids, point_ids, metadata):
+                self._remove_image_locked(image_id)
+                
+                if not self.free_slots:
+                    self._evict_oldest_locked()
+                
+                slot = self.free_slots.pop()
+                # A zero vector stays zero and never matches.
+                self.vectors[slot] = vector / max(float(np.linalg.norm(vector)), 1e-12)
+                self.active[slot] = True
+                self.added_at[slot] = now
+                self.entries[slot] = {
+                    "image_id": image_id,
+                    "point_id": point_id,
+                    "metadata": meta,
+                    "location": location
+                }
+                self.slot_by_point[point_id] = slot
+                self.slot_by_image[image_id] = slot
+            
+            delta_index_size.set(len(self.slot_by_point))
+    
+    def _release_locked(self, slot: int):
+        entry = self.entries[slot]
+        self.slot_by_point.pop(entry["point_id"], None)
+        self.slot_by_image.pop(entry["image_id"], None)
+        self.entries[slot] = None
+        self.active[slot] = False
+        self.free_slots.append(slot)
+    
+    def _evict_oldest_locked(self):
+        ages = np.where(self.active, self.added_at, np.inf)
+        self._release_locked(int(np.argmin(ages)))
+    
+    def _remove_image_locked(self, image_id: str):
+        slot = self.slot_by_image.get(image_id)
+        if slot is not None:
+            self._release_locked(slot)
+    
+    def remove_points(self, point_ids: List[str]):
+        with self._lock:
+            for point_id in point_ids:
+                slot = self.slot_by_point.get(point_id)
+                if slot is not None:
+                    self._release_locked(slot)
+            delta_index_size.set(len(self.slot_by_point))
+    
+    def point_ids_for_image(self, image_id: str) -> List[str]:
+        with self._lock:
+            slot = self.slot_by_image.get(image_id)
+            return [self.entries[slot]["point_id"]] if slot is not None else []
+    
+    def remove_image(self, image_id: str):
+        with self._lock:
+            self._remove_image_locked(image_id)
+            delta_index_size.set(len(self.slot_by_point))
+    
+    def expire(self) -> int:
+        with self._lock:
+            cutoff = time.time() - self.max_age
+            expired = np.flatnonzero(self.active & (self.added_at < cutoff))
+            for slot in expired:
+                self._release_locked(int(slot))
+            delta_index_size.set(len(self.slot_by_point))
+            return len(expired)
+    
+    def search(self, query_vector: np.ndarray, top_k: int, threshold: float = 0.0,
+               include_metadata: bool = True) -> List[SimilarImage]:
+        query_norm = float(np.linalg.norm(query_vector))
+        if not self.slot_by_point or query_norm == 0:
+            return []
+        
+        with self._lock:
+            slots = np.flatnonzero(self.active)
+            if len(slots) == 0:
+                return []
+            
+            query = query_vector / query_norm
+            scores = self.vectors[slots] @ query
+            keep = scores >= threshold
+            slots, scores = slots[keep], scores[keep]
+            
+            if len(slots) > top_k:
+                top = np.argpartition(-scores, top_k - 1)[:top_k]
+                slots, scores = slots[top], scores[top]
+            
+            order = np.argsort(-scores)
+            slots, scores = slots[order], scores[order]
+            
+            return [
+                SimilarImage(
+                    image_id=self.entries[slot]["image_id"],
+                    score=float(score),
+                    metadata=self.entries[slot]["metadata"] if include_metadata else None
+                )
+                for slot, score in zip(slots, scores)
+            ]
+    
+    def merge(self, results: List[SimilarImage], query_vector: np.ndarray, top_k: int,
+              threshold: float = 0.0, include_metadata: bool = True) -> List[SimilarImage]:
+        fresh = self.search(query_vector, top_k, threshold, include_metadata)
+        if not fresh:
+            return results
+        
+        delta_index_results_total.inc(len(fresh))
+        
+        merged: Dict[str, SimilarImage] = {}
+        for result in results + fresh:
+            current = merged.get(result.image_id)
+            if current is None or result.score > current.score:
+                merged[result.image_id] = result
+        
+        return sorted(merged.values(), key=lambda r: r.score, reverse=True)[:top_k]
+    
+    def pending(self) -> Dict[Hashable, List[int]]:
+        by_location: Dict[Hashable, List[int]] = {}
+        with self._lock:
+            for slot in self.slot_by_point.values():
+                by_location.setdefault(self.entries[slot]["location"], []).append(slot)
+        return by_location
+    
+    def add_listener(self, listener: VisibilityListener):
+        # Called after a reconcile pass in which points left the buffer, i.e.
+        # once writes this process took are searchable from every worker.
+        self.listeners.append(listener)
+    
+    async def _notify(self):
+        for listener in self.listeners:
+            try:
+                await listener()
+            except Exception as e:
+                logger.error(f"Delta index visibility listener failed: {str(e)}")
+    
+    async def reconcile(self, confirm: ConfirmFn):
+        # Expired entries are assumed visible by now; either way they no
+        # longer shadow the backend.
+        visible = self.expire() > 0
+        
+        for location, slots in self.pending().items():
+            with self._lock:
+                slots = [slot for slot in slots if self.entries[slot] is not None]
+                point_ids = [self.entries[slot]["point_id"] for slot in slots]
+                vectors = self.vectors[slots].copy()
+            
+            if not point_ids:
+                continue
+            
+            try:
+                confirmed = await confirm(location, point_ids, vectors)
+                self.remove_points(confirmed)
+                visible = visible or bool(confirmed)
+            except Exception as e:
+                logger.warning(f"Delta index reconcile failed for {location}: {str(e)}")
+        
+        if visible:
+            await self._notify()
+    
+    def ensure_reconciler(self, confirm: ConfirmFn, interval: float = 1.0):
+        if self._reconcile_task is not None and not self._reconcile_task.done():
+            return
+        self._reconcile_task = asyncio.create_task(self._reconcile_loop(confirm, interval))
+    
+    async def _reconcile_loop(self, confirm: ConfirmFn, interval: float):
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                if self.slot_by_point:
+                    await self.reconcile(confirm)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Delta index reconciler error: {str(e)}")
+    
+    async def stop(self):
+        if self._reconcile_task:
+            self._reconcile_task.cancel()
+            await asyncio.gather(self._reconcile_task, return_exceptions=True)
+            self._reconcile_task = None
+
+
+def confirm_indexed_points(client: QdrantClient, collection_name: str, point_ids: List[str],
+                           vectors: np.ndarray, vector_name: Optional[str] = None,
+                           batch_size: int = 64) -> List[str]:
+    # A point counts as indexed once an indexed_only search restricted to its
+    # id finds it, i.e. every search effort level can return it.
+    confirmed = []
+    for start in range(0, len(point_ids), batch_size):
+        batch_ids = point_ids[start:start + batch_size]
+        requests = [
+            models.SearchRequest(
+                vector=(
+                    models.NamedVector(name=vector_name, vector=vector.tolist())
+                    if vector_name else vector.tolist()
+                ),
+                filter=models.Filter(must=[models.HasIdCondition(has_id=[point_id])]),
+                limit=1,
+                params=models.SearchParams(indexed_only=True),
+                with_payload=False
+            )
+            for point_id, vector in zip(batch_ids, vectors[start:start + batch_size])
+        ]
+        responses = client.search_batch(collection_name=collection_name, requests=requests)
+        confirmed.extend(
+            point_id for point_id, hits in zip(batch_ids, responses) if hits
+        )
+    return confirmed
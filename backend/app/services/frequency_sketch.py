@@ -0,0 +1,38 @@
+class FrequencySketch:
+    # 4-row count-min sketch of 4-bit-style saturating counters (capped at
+    # 15). Every `sample_size` increments all counters are halved so that
+    # old popularity fades, as in TinyLFU.
+    def __init__(self, expected_entries: int, depth: int = 4):
+        width = 1
+        while width < max(64, expected_entries):
+            width <<= 1
+        self.width = width
+        self.mask = width - 1
+        self.depth = depth
+        self.table = [bytearray(width) for _ in range(depth)]
+        self.sample_size = 10 * width
+        self.additions = 0
+        self._seeds = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)[:depth]
+    
+    def _indexes(self, key: str):
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        return [((h * seed) & 0xFFFFFFFFFFFFFFFF) >> 32 & self.mask for seed in self._seeds]
+    
+    def increment(self, key: str):
+        added = False
+        for row, index in zip(self.table, self._indexes(key)):
+            if row[index] < 15:
+                row[index] += 1
+                added = True
+        
+        if added:
+            self.additions += 1
+            if self.additions >= self.sample_size:
+                self._reset()
+    
+    def frequency(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self.table, self._indexes(key)))
+    
+    def _reset(self):
+        self.table = [bytearray(count >> 1 for count in row) for row in self.table]
+        self.additions //= 2
@@ -0,0 +1,120 @@
+import bisect
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _hash64(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class ConsistentHashRing:
+    # Each shard owns `vnodes` points on a 64-bit ring; a key belongs to the
+    # first shard point clockwise from its hash. Adding or removing one shard
+    # only moves the keys between it and its ring neighbours (~1/N of them).
+    def __init__(self, nodes: Iterable[int], vnodes: int = 128, version: int = 0):
+        self.nodes = sorted(set(nodes))
+        self.vnodes = vnodes
+        self.version = version
+        
+        if not self.nodes:
+            raise ValueError("Hash ring needs at least one node")
+        
+        positions = []
+        for node in self.nodes:
+            for replica in range(vnodes):
+                positions.append((_hash64(f"shard-{node}#{replica}"), node))
+        positions.sort()
+        
+        self._positions = [position for position, _ in positions]
+        self._owners = [node for _, node in positions]
+    
+    def get_node(self, key: str) -> int:
+        idx = bisect.bisect_right(self._positions, _hash64(key))
+        if idx == len(self._positions):
+            idx = 0
+        return self._owners[idx]
+    
+    def with_nodes(self, nodes: Iterable[int]) -> "ConsistentHashRing":
+        return ConsistentHashRing(nodes, self.vnodes, self.version + 1)
+    
+    def load_distribution(self) -> Dict[int, float]:
+        # Fraction of the hash space owned by each node.
+        positions = np.array(self._positions, dtype=np.float64)
+        spans = np.diff(np.concatenate([[positions[-1] - 2.0**64], positions]))
+        distribution = {node: 0.0 for node in self.nodes}
+        for owner, span in zip(self._owners, spans):
+            distribution[owner] += span / 2.0**64
+        return distribution
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "vnodes": self.vnodes,
+            "nodes": self.nodes
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ConsistentHashRing":
+        return cls(data["nodes"], data["vnodes"], data["version"])
+
+
+class RingLayout:
+    # Persisted ring state. While `previous` is set a rebalance is in flight:
+    # writes go to both owners and reads fall back to the previous one.
+    def __init__(self, path: str):
+        self.path = path
+    
+    def load(self) -> Optional[Dict[str, Optional[ConsistentHashRing]]]:
+        if not os.path.exists(self.path):
+            return None
+        
+        with open(self.path) as f:
+            data = json.load(f)
+        
+        return self.decode(data)
+    
+    def save(self, current: ConsistentHashRing, previous: Optional[ConsistentHashRing] = None):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.encode(current, previous), f, indent=2)
+        os.replace(tmp_path, self.path)
+        
+        logger.info(
+            f"Saved shard ring v{current.version} with nodes {current.nodes}"
+            + (f" (migrating from v{previous.version})" if previous else "")
+        )
+    
+    @staticmethod
+    def encode(current: ConsistentHashRing, previous: Optional[ConsistentHashRing] = None) -> Dict[str, Any]:
+        return {
+            "current": current.to_dict(),
+            "previous": previous.to_dict() if previous else None,
+            "updated_at": time.time()
+        }
+    
+    @staticmethod
+    def decode(data: Dict[str, Any]) -> Dict[str, Optional[ConsistentHashRing]]:
+        return {
+            "current": ConsistentHashRing.from_dict(data["current"]),
+            "previous": (
+                ConsistentHashRing.from_dict(data["previous"])
+                if data.get("previous") else None
+            )
+        }
+
+
+def ring_state(current: ConsistentHashRing, previous: Optional[ConsistentHashRing] = None) -> str:
+    # What a worker routes with: the ring version plus the one it still
+    # dual-reads and dual-writes, if any.
+    return f"{current.version}:{previous.version if previous else '-'}"
@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class CountMinTopK:
+    # Count-Min sketch with a bounded candidate table of the `k` keys with
+    # the highest estimates. Hashing is stable across processes so counts
+    # from different workers describe the same keys.
+    def __init__(self, k: int = 100, width: int = 4096, depth: int = 4):
+        self.k = k
+        self.width = width
+        self.depth = depth
+        self.counts = np.zeros((depth, width), dtype=np.int64)
+        self.rows = np.arange(depth)
+        self.top: Dict[str, int] = {}
+        self._floor = 0
+    
+    def _indexes(self, key: str) -> np.ndarray:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return np.array([(h1 + i * h2) % self.width for i in range(self.depth)])
+    
+    def add(self, key: str, count: int = 1) -> int:
+        indexes = self._indexes(key)
+        self.counts[self.rows, indexes] += count
+        estimate = int(self.counts[self.rows, indexes].min())
+        
+        if key in self.top or len(self.top) < self.k:
+            self.top[key] = estimate
+        elif estimate > self._floor:
+            # _floor is a lower bound on the smallest tracked estimate, so
+            # most keys are rejected without scanning the table.
+            smallest = min(self.top, key=self.top.get)
+            if estimate > self.top[smallest]:
+                del self.top[smallest]
+                self.top[key] = estimate
+            self._floor = min(self.top.values())
+        return estimate
+    
+    def estimate(self, key: str) -> int:
+        return int(self.counts[self.rows, self._indexes(key)].min())
+    
+    def top_k(self) -> List[Tuple[str, int]]:
+        return sorted(self.top.items(), key=lambda item: item[1], reverse=True)
+    
+    def reset(self):
+        self.counts[:] = 0
+        self.top.clear()
+        self._floor = 0
+
+
+class HeavyHitterTracker:
+    # Per-worker sketch merged cluster-wide through Redis. Each sync adds the
+    # growth of this worker's candidates since the last sync to a sorted set
+    # for the current window; the cluster's heavy hitters are the top `k`
+    # of the current and previous windows combined, so old traffic ages out
+    # after two windows without any coordination between workers.
+    def __init__(self, k: int = 100, window: float = 300.0, key_prefix: str = "cache:heavy_hitters",
+                 width: int = 4096, depth: int = 4):
+        self.k = k
+        self.window = window
+        self.key_prefix = key_prefix
+        # Track more candidates than we report: a key can be globally hot
+        # while only borderline on each worker.
+        self.sketch = CountMinTopK(2 * k, width, depth)
+        self.redis_client = None
+        self._epoch = self._current_epoch()
+        self._published: Dict[str, int] = {}
+        self.hot: List[Tuple[str, int]] = []
+        self.last_sync: Optional[float] = None
+    
+    def bind(self, redis_client):
+        self.redis_client = redis_client
+    
+    def _current_epoch(self) -> int:
+        return int(time.time() // self.window)
+    
+    def _key(self, epoch: int) -> str:
+        return f"{self.key_prefix}:{epoch}"
+    
+    def record(self, key: str):
+        self.sketch.add(key)
+    
+    async def sync(self) -> List[Tuple[str, int]]:
+        epoch = self._current_epoch()
+        if epoch != self._epoch:
+            self.sketch.reset()
+            self._published.clear()
+            self._epoch = epoch
+        
+        candidates = self.sketch.top_k()
+        if self.redis_client is None:
+            self.hot = candidates[:self.k]
+            self.last_sync = time.time()
+            return self.hot
+        
+        try:
+            current_key = self._key(epoch)
+            pipeline = self.redis_client.pipeline()
+            for key, count in candidates:
+                delta = count - self._published.get(key, 0)
+                if delta > 0:
+                    pipeline.zincrby(current_key, delta, key)
+            pipeline.expire(current_key, int(self.window * 2) + 1)
+            pipeline.zrevrange(current_key, 0, self.k - 1, withscores=True)
+            pipeline.zrevrange(self._key(epoch - 1), 0, self.k - 1, withscores=True)
+            results = await pipeline.execute()
+        except Exception as e:
+            logger.error(f"Failed to sync heavy hitters: {str(e)}")
+            return self.hot
+        
+        self._published.update(candidates)
+        merged: Dict[str, float] = {}
+        for member, score in results[-2] + results[-1]:
+            member = member.decode() if isinstance(member, bytes) else member
+            merged[member] = merged.get(member, 0) + score
+        
+        self.hot = sorted(
+            ((member, int(score)) for member, score in merged.items()), key=lambda item: item[1], reverse=True
+        )[:self.k]
+        self.last_sync = time.time()
+        return self.hot
+    
+    def get_stats(self) -> dict:
+        return {
+            'k': self.k,
+            'window': self.window,
+            'tracked': len(self.sketch.top),
+            'hot': len(self.hot),
+            'top': self.hot[:10],
+            'last_sync': self.last_sync
+        }
@@ -0,0 +1,62 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, List, Tuple
+import numpy as np
+
+Attempt = Callable[[], Awaitable[Any]]
+
+
+class LatencyWindow:
+    def __init__(self, size: int = 256, default: float = 0.05):
+        self.samples: Deque[float] = deque(maxlen=size)
+        self.default = default
+    
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+    
+    def percentile(self, q: float) -> float:
+        if len(self.samples) < 20:
+            return self.default
+        return float(np.percentile(self.samples, q))
+
+
+async def hedged_call(attempts: List[Attempt], hedge_delay: float, timeout: float) -> Tuple[Any, int]:
+    # Runs attempts[0]; if it has not answered after hedge_delay (or fails),
+    # starts the next attempt alongside it. The first success wins and the
+    # rest are cancelled. Raises TimeoutError once `timeout` has elapsed, or
+    # the last error if every attempt failed first.
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+    pending = {}
+    next_attempt = 0
+    last_error = None
+    hedge_due = False
+    
+    try:
+        while True:
+            if not pending or (hedge_due and next_attempt < len(attempts)):
+                if next_attempt >= len(attempts):
+                    break
+                task = asyncio.ensure_future(attempts[next_attempt]())
+                pending[task] = next_attempt
+                next_attempt += 1
+            
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            
+            wait_time = min(remaining, hedge_delay) if next_attempt < len(attempts) else remaining
+            done, _ = await asyncio.wait(pending, timeout=wait_time, return_when=asyncio.FIRST_COMPLETED)
+            
+            hedge_due = not done
+            for task in done:
+                attempt = pending.pop(task)
+                if task.exception() is None:
+                    return task.result(), attempt
+                last_error = task.exception()
+                hedge_due = True
+    finally:
+        for task in pending:
+            task.cancel()
+    
+    raise last_error
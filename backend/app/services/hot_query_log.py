@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import msgpack
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class HotQueryLog:
+    # Rolling log of the most requested query fingerprints with their
+    # embeddings, so the result cache can be rebuilt without the original
+    # images. `observe` keeps the embeddings of recently computed queries;
+    # `persist` writes the ones the heavy-hitter tracker calls hot to this
+    # worker's field of a Redis hash, so workers never overwrite each other,
+    # and the merged log to a local file (which survives a Redis flush).
+    # Counts halve per `half_life` of age, computed from the write time, so
+    # they decay once per interval however many workers persist.
+    def __init__(self, max_entries: int = 1000, max_recent: int = 10000,
+                 key: str = "cache:hot_queries", path: Optional[str] = None,
+                 half_life: float = 60.0, worker_id: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_recent = max_recent
+        self.key = f"{key}:workers"
+        self.path = path
+        self.half_life = half_life
+        # Fields of workers that stopped persisting are dropped once their
+        # counts have decayed to nothing.
+        self.retention = half_life * 32
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.recent: "OrderedDict[str, Tuple[bytes, int, float]]" = OrderedDict()
+        self.contributed: List[Dict[str, Any]] = []
+        self.contributed_at = 0.0
+    
+    def observe(self, fingerprint: str, features: np.ndarray, top_k: int, threshold: float):
+        self.recent[fingerprint] = (np.asarray(features, dtype="<f2").tobytes(), top_k, threshold)
+        self.recent.move_to_end(fingerprint)
+        while len(self.recent) > self.max_recent:
+            self.recent.popitem(last=False)
+    
+    def _decayed(self, entries: List[Dict[str, Any]], written_at: float, now: float) -> List[Dict[str, Any]]:
+        factor = 0.5 ** (max(0.0, now - written_at) / self.half_life)
+        return [{**entry, 'count': entry['count'] * factor} for entry in entries]
+    
+    def _merge(self, groups: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        # Every worker sees the same cluster-wide counts, so the highest
+        # one wins rather than the sum.
+        entries = {}
+        for group in groups:
+            for entry in group:
+                if entry['count'] > entries.get(entry['fingerprint'], {}).get('count', -1):
+                    entries[entry['fingerprint']] = entry
+        return sorted(entries.values(), key=lambda entry: entry['count'], reverse=True)[:self.max_entries]
+    
+    def _contribution(self, hot: List[Tuple[str, int]], now: float) -> List[Dict[str, Any]]:
+        entries = {
+            entry['fingerprint']: entry
+            for entry in self._decayed(self.contributed, self.contributed_at, now)
+        }
+        for fingerprint, count in hot:
+            observed = self.recent.get(fingerprint)
+            if observed is not None:
+                features, top_k, threshold = observed
+            elif fingerprint in entries:
+                features, top_k, threshold = (
+                    entries[fingerprint]['features'], entries[fingerprint]['top_k'], entries[fingerprint]['threshold']
+                )
+            else:
+                # Another worker computed it and contributes the embedding.
+                continue
+            previous = entries.get(fingerprint, {}).get('count', 0)
+            entries[fingerprint] = {
+                'fingerprint': fingerprint,
+                'features': features,
+                'top_k': top_k,
+                'threshold': threshold,
+                'count': max(previous, count)
+            }
+        live = [entry for entry in entries.values() if entry['count'] >= 1]
+        return sorted(live, key=lambda entry: entry['count'], reverse=True)[:self.max_entries]
+    
+    async def persist(self, redis_client, hot: List[Tuple[str, int]]) -> int:
+        now = time.time()
+        self.contributed = self._contribution(hot, now)
+        self.contributed_at = now
+        
+        if redis_client is not None:
+            data = msgpack.packb({'at': now, 'entries': self.contributed}, use_bin_type=True)
+            try:
+                await redis_client.hset(self.key, self.worker_id, data)
+            except Exception as e:
+                logger.error(f"Failed to persist hot query log: {str(e)}")
+        
+        entries = await self.load(redis_client, prune=True)
+        if self.path:
+            data = msgpack.packb({'at': now, 'entries': entries}, use_bin_type=True)
+            try:
+                await asyncio.get_event_loop().run_in_executor(None, self._write_file, data)
+            except OSError as e:
+                logger.error(f"Failed to write hot query log {self.path}: {str(e)}")
+        return len(entries)
+    
+    def _write_file(self, data: bytes):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+    
+    def _unpack(self, data: bytes) -> Tuple[float, List[Dict[str, Any]]]:
+        try:
+            stored = msgpack.unpackb(data, raw=False)
+            return stored['at'], stored['entries']
+        except Exception as e:
+            logger.error(f"Corrupt hot query log: {str(e)}")
+            return 0.0, []
+    
+    async def load(self, redis_client, prune: bool = False) -> List[Dict[str, Any]]:
+        # Redis holds every worker's share of the log; fall back to this
+        # host's merged copy when Redis was flushed or is unreachable.
+        now = time.time()
+        fields = {}
+        if redis_client is not None:
+            try:
+                fields = await redis_client.hgetall(self.key)
+            except Exception as e:
+                logger.error(f"Failed to read hot query log: {str(e)}")
+        
+        groups, expired = [], []
+        for worker, data in fields.items():
+            written_at, entries = self._unpack(data)
+            if now - written_at > self.retention:
+                expired.append(worker)
+            else:
+                groups.append(self._decayed(entries, written_at, now))
+        
+        if prune and expired:
+            try:
+                await redis_client.hdel(self.key, *expired)
+            except Exception as e:
+                logger.error(f"Failed to prune hot query log: {str(e)}")
+        
+        if not groups and self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, "rb") as f:
+                    written_at, entries = self._unpack(f.read())
+                groups.append(self._decayed(entries, written_at, now))
+            except OSError as e:
+                logger.error(f"Failed to read hot query log {self.path}: {str(e)}")
+        
+        return self._merge(groups)
+    
+    @staticmethod
+    def features(entry: Dict[str, Any]) -> np.ndarray:
+        return np.frombuffer(entry['features'], dtype="<f2").astype(np.float32)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'recent': len(self.recent),
+            'max_entries': self.max_entries,
+            'path': self.path
+        }
@@ -0,0 +1,428 @@
+import asyncio
+import base64
+import glob
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+import numpy as np
+
+from app.config import get_settings
+from app.core.metrics import index_buffer_pending, index_buffer_flush_size
+from app.services.vector_service import VectorService, get_vector_service
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+DURABILITY_LEVELS = ("memory", "journal", "fsync")
+
+
+class IndexBufferFullError(Exception):
+    pass
+
+
+@dataclass
+class PendingWrite:
+    image_id: str
+    point_id: str
+    vector: np.ndarray
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    segment: Optional[str] = None
+    enqueued_at: float = field(default_factory=time.time)
+
+
+class IndexWriteBuffer:
+    def __init__(
+        self,
+        vector_service: VectorService,
+        max_batch: int = 256,
+        flush_interval: float = 0.05,
+        max_pending: int = 10000,
+        enqueue_timeout: float = 1.0,
+        durability: str = "journal",
+        journal_dir: str = "./data/index_journal",
+        segment_max_bytes: int = 64 * 1024 * 1024
+    ):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability level: {durability}")
+        
+        self.vector_service = vector_service
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.enqueue_timeout = enqueue_timeout
+        self.durability = durability
+        self.journal_dir = journal_dir
+        self.segment_max_bytes = segment_max_bytes
+        
+        self.pending: Deque[PendingWrite] = deque()
+        # Admitted writes still being journaled, counted against max_pending.
+        self.reserved = 0
+        self.segment_refs: Dict[str, int] = {}
+        # Tombstone segment -> older segments still holding the writes it
+        # cancelled; the tombstone's segment stays until those are gone.
+        self.tombstones: List[Tuple[str, Set[str]]] = []
+        self.active_segment: Optional[str] = None
+        self._journal_file = None
+        self._journal_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-journal")
+        self._has_pending = asyncio.Event()
+        self._has_space = asyncio.Event()
+        self._has_space.set()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.flush_listeners: List[Callable[[], Awaitable[Any]]] = []
+        self.stats = {
+            'enqueued': 0,
+            'flushed': 0,
+            'flushes': 0,
+            'coalesced': 0,
+            'rejected': 0,
+            'cancelled': 0,
+            'flush_errors': 0
+        }
+    
+    async def start(self):
+        if self._flush_task is not None:
+            return
+        
+        if self.durability != "memory":
+            await asyncio.get_event_loop().run_in_executor(
+                self._journal_executor, self._replay_journal
+            )
+            await asyncio.get_event_loop().run_in_executor(
+                self._journal_executor, self._rotate_segment
+            )
+        
+        delta_index = self.vector_service.delta_index
+        if delta_index is not None and self.pending:
+            delta_index.add(
+                [write.vector for write in self.pending],
+                [write.image_id for write in self.pending],
+                [write.point_id for write in self.pending],
+                [write.metadata for write in self.pending]
+            )
+        
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(
+            f"Index write buffer started (durability={self.durability}, "
+            f"max_batch={self.max_batch}, replayed={len(self.pending)})"
+        )
+    
+    async def stop(self, timeout: float = 30.0):
+        if self._flush_task is None:
+            return
+        
+        self._flush_task.cancel()
+        await asyncio.gather(self._flush_task, return_exceptions=True)
+        self._flush_task = None
+        
+        deadline = time.time() + timeout
+        while self.pending and time.time() < deadline:
+            if not await self._flush_once():
+                await asyncio.sleep(0.5)
+        
+        if self.pending:
+            logger.warning(f"Index write buffer stopped with {len(self.pending)} writes left in the journal")
+        
+        await asyncio.get_event_loop().run_in_executor(self._journal_executor, self._close_journal)
+        self._journal_executor.shutdown(wait=True)
+        logger.info("Index write buffer drained")
+    
+    async def enqueue(self, vector: np.ndarray, image_id: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+        # Every waiter wakes when a flush frees space, so each one re-checks
+        # the bound before it takes a slot.
+        deadline = time.time() + self.enqueue_timeout
+        while len(self.pending) + self.reserved >= self.max_pending:
+            self._has_space.clear()
+            try:
+                await asyncio.wait_for(self._has_space.wait(), timeout=max(0.0, deadline - time.time()))
+            except asyncio.TimeoutError:
+                self.stats['rejected'] += 1
+                raise IndexBufferFullError(
+                    f"Index write buffer full ({len(self.pending)} pending writes)"
+                )
+        
+        write = PendingWrite(
+            image_id=image_id,
+            point_id=str(uuid.uuid4()),
+            vector=np.asarray(vector, dtype=np.float32),
+            metadata=metadata or {}
+        )
+        
+        if self.durability != "memory":
+            self.reserved += 1
+            try:
+                await asyncio.get_event_loop().run_in_executor(
+                    self._journal_executor, self._append_journal, write
+                )
+            finally:
+                self.reserved -= 1
+        
+        self.pending.append(write)
+        self.stats['enqueued'] += 1
+        index_buffer_pending.set(len(self.pending))
+        
+        delta_index = self.vector_service.delta_index
+        if delta_index is not None:
+            delta_index.add([write.vector], [image_id], [write.point_id], [write.metadata])
+        
+        if len(self.pending) >= self.max_batch:
+            self._has_pending.set()
+        
+        return write.point_id
+    
+    async def _flush_loop(self):
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._has_pending.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._has_pending.clear()
+                
+                if self.pending and not await self._flush_once():
+                    await asyncio.sleep(min(1.0, self.flush_interval * 10))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Index write buffer flush loop error: {str(e)}")
+                await asyncio.sleep(1)
+    
+    async def cancel(self, image_id: str) -> int:
+        # Drops the queued writes for a deleted image, so neither the next
+        # flush nor a journal replay brings it back. Waits out a flush in
+        # progress, whose upsert the caller's delete then overrides.
+        async with self._flush_lock:
+            cancelled = [write for write in self.pending if write.image_id == image_id]
+            if not cancelled:
+                return 0
+            
+            self.pending = deque(write for write in self.pending if write.image_id != image_id)
+            index_buffer_pending.set(len(self.pending))
+            if len(self.pending) < self.max_pending:
+                self._has_space.set()
+            
+            if self.durability != "memory":
+                await asyncio.get_event_loop().run_in_executor(
+                    self._journal_executor, self._append_tombstone, image_id, cancelled
+                )
+            self.stats['cancelled'] += len(cancelled)
+            return len(cancelled)
+    
+    async def _flush_once(self) -> bool:
+        async with self._flush_lock:
+            return await self._flush_batch()
+    
+    async def _flush_batch(self) -> bool:
+        batch = [self.pending[i] for i in range(min(self.max_batch, len(self.pending)))]
+        if not batch:
+            return True
+        
+        latest: Dict[str, PendingWrite] = {}
+        for write in batch:
+            latest[write.image_id] = write
+        writes = list(latest.values())
+        
+        try:
+            await self.vector_service.insert_vectors(
+                vectors=[write.vector for write in writes],
+                image_ids=[write.image_id for write in writes],
+                metadata=[write.metadata for write in writes],
+                point_ids=[write.point_id for write in writes]
+            )
+        except Exception as e:
+            self.stats['flush_errors'] += 1
+            logger.error(f"Failed to flush {len(writes)} buffered writes: {str(e)}")
+            return False
+        
+        for _ in batch:
+            self.pending.popleft()
+        
+        self.stats['flushed'] += len(writes)
+        self.stats['coalesced'] += len(batch) - len(writes)
+        self.stats['flushes'] += 1
+        index_buffer_flush_size.observe(len(writes))
+        index_buffer_pending.set(len(self.pending))
+        
+        if len(self.pending) < self.max_pending:
+            self._has_space.set()
+        
+        if self.durability != "memory":
+            await asyncio.get_event_loop().run_in_executor(
+                self._journal_executor, self._release_segments, batch
+            )
+        
+        # Without a delta index the flush upserts with wait=True, so the
+        # batch is searchable everywhere now; with one, the delta index
+        # reports visibility once the backend confirms the points.
+        if self.vector_service.delta_index is None:
+            await self._notify_flushed()
+        
+        return True
+    
+    def add_flush_listener(self, listener: Callable[[], Awaitable[Any]]):
+        self.flush_listeners.append(listener)
+    
+    async def _notify_flushed(self):
+        for listener in self.flush_listeners:
+            try:
+                await listener()
+            except Exception as e:
+                logger.error(f"Index write buffer flush listener failed: {str(e)}")
+    
+    def _segment_paths(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.journal_dir, "segment-*.jsonl")))
+    
+    def _rotate_segment(self):
+        self._close_journal()
+        
+        if self.active_segment is not None and self.segment_refs.get(self.active_segment, 0) == 0:
+            self._remove_segment(self.active_segment)
+        
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self.active_segment = os.path.join(
+            self.journal_dir, f"segment-{time.time_ns():020d}.jsonl"
+        )
+        self._journal_file = open(self.active_segment, "a")
+        self.segment_refs[self.active_segment] = 0
+    
+    def _append_journal(self, write: PendingWrite):
+        record = {
+            "image_id": write.image_id,
+            "point_id": write.point_id,
+            "vector": base64.b64encode(write.vector.tobytes()).decode(),
+            "metadata": write.metadata,
+            "enqueued_at": write.enqueued_at
+        }
+        self._write_record(record)
+        
+        write.segment = self.active_segment
+        self.segment_refs[self.active_segment] += 1
+        
+        if self._journal_file.tell() >= self.segment_max_bytes:
+            self._rotate_segment()
+    
+    def _write_record(self, record: Dict[str, Any]):
+        self._journal_file.write(json.dumps(record, default=str) + "\n")
+        self._journal_file.flush()
+        if self.durability == "fsync":
+            os.fsync(self._journal_file.fileno())
+    
+    def _append_tombstone(self, image_id: str, cancelled: List[PendingWrite]):
+        self._write_record({"tombstone": image_id, "enqueued_at": time.time()})
+        self._hold_tombstone(
+            self.active_segment,
+            {write.segment for write in cancelled if write.segment is not None}
+        )
+        self._release_segments(cancelled)
+        
+        if self._journal_file.tell() >= self.segment_max_bytes:
+            self._rotate_segment()
+    
+    def _hold_tombstone(self, segment: str, cancelled_segments: Set[str]):
+        # Writes in the tombstone's own segment disappear together with it.
+        held = cancelled_segments - {segment}
+        if held:
+            self.tombstones.append((segment, held))
+            self.segment_refs[segment] = self.segment_refs.get(segment, 0) + 1
+    
+    def _release_segments(self, writes: List[PendingWrite]):
+        for write in writes:
+            if write.segment is not None:
+                self._release_segment(write.segment)
+        
+        # Start a fresh segment once the active one is fully flushed so the
+        # journal never grows past one flush window.
+        if self.active_segment is not None and self.segment_refs.get(self.active_segment) == 0:
+            self._journal_file.truncate(0)
+            self._journal_file.seek(0)
+    
+    def _release_segment(self, path: str):
+        self.segment_refs[path] -= 1
+        if self.segment_refs[path] == 0 and path != self.active_segment:
+            self._remove_segment(path)
+    
+    def _remove_segment(self, path: str):
+        self.segment_refs.pop(path, None)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        
+        for tombstone in list(self.tombstones):
+            segment, held = tombstone
+            held.discard(path)
+            if not held:
+                self.tombstones.remove(tombstone)
+                self._release_segment(segment)
+    
+    def _replay_journal(self):
+        paths = self._segment_paths()
+        writes: List[PendingWrite] = []
+        tombstones = []
+        for path in paths:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line from a crash mid-append.
+                        continue
+                    if "tombstone" in record:
+                        cancelled = [write for write in writes if write.image_id == record["tombstone"]]
+                        writes = [write for write in writes if write.image_id != record["tombstone"]]
+                        tombstones.append((path, {write.segment for write in cancelled}))
+                        continue
+                    writes.append(PendingWrite(
+                        image_id=record["image_id"],
+                        point_id=record["point_id"],
+                        vector=np.frombuffer(base64.b64decode(record["vector"]), dtype=np.float32),
+                        metadata=record["metadata"],
+                        segment=path,
+                        enqueued_at=record["enqueued_at"]
+                    ))
+        
+        self.pending.extend(writes)
+        for write in writes:
+            self.segment_refs[write.segment] = self.segment_refs.get(write.segment, 0) + 1
+        for path, cancelled_segments in tombstones:
+            self._hold_tombstone(path, cancelled_segments)
+        for path in paths:
+            if not self.segment_refs.get(path):
+                self._remove_segment(path)
+        
+        if self.pending:
+            logger.info(f"Replayed {len(self.pending)} buffered writes from journal")
+    
+    def _close_journal(self):
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'pending': len(self.pending),
+            'max_pending': self.max_pending,
+            'durability': self.durability,
+            'journal_segments': len(self.segment_refs)
+        }
+
+
+@lru_cache()
+def get_index_write_buffer() -> IndexWriteBuffer:
+    return IndexWriteBuffer(
+        get_vector_service(),
+        max_batch=settings.index_buffer_max_batch,
+        flush_interval=settings.index_buffer_flush_interval,
+        max_pending=settings.index_buffer_max_pending,
+        enqueue_timeout=settings.index_buffer_enqueue_timeout,
+        durability=settings.index_buffer_durability,
+        journal_dir=settings.index_buffer_journal_dir
+    )
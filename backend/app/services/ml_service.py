@@ -54,12 +54,15 @@ class MLService:
         ).to(self.device)
         self.model.eval()
     
-    def _decode_image(self, image_data: str) -> Image.Image:
+    def _decode_image(self, image_data: Union[str, bytes]) -> Image.Image:
         try:
-            if image_data.startswith('data:image'):
-                image_data = image_data.split(',')[1]
-            
-            image_bytes = base64.b64decode(image_data)
+            if isinstance(image_data, bytes):
+                # Already decoded, e.g. by the request fingerprint.
+                image_bytes = image_data
+            else:
+                if image_data.startswith('data:image'):
+                    image_data = image_data.split(',')[1]
+                image_bytes = base64.b64decode(image_data)
             image = Image.open(io.BytesIO(image_bytes))
             
             if image.mode != 'RGB':
@@ -74,7 +77,7 @@ class MLService:
         if len(image_bytes) > settings.max_image_size:
             raise ValueError(f"Image size {len(image_bytes)} exceeds maximum {settings.max_image_size}")
     
-    async def extract_features(self, image_data: str) -> np.ndarray:
+    async def extract_features(self, image_data: Union[str, bytes]) -> np.ndarray:
         if self.model is None:
             await self.load_model()
         
@@ -87,7 +90,7 @@ class MLService:
             )
             
             return features
-            
+        
         except Exception as e:
             logger.error(f"Feature extraction failed: {str(e)}")
             raise
@@ -121,7 +124,7 @@ class MLService:
                 all_features.extend(batch_features)
             
             return all_features
-            
+        
         except Exception as e:
             logger.error(f"Batch feature extraction failed: {str(e)}")
             raise
@@ -55,12 +55,15 @@ class MLService:
         ).to(self.device)
         self.model.eval()
     
-    def _decode_image(self, image_data: str) -> Image.Image:
+    def _decode_image(self, image_data: Union[str, bytes]) -> Image.Image:
         try:
-            if image_data.startswith('data:image'):
-                image_data = image_data.split(',')[1]
-            
-            image_bytes = base64.b64decode(image_data)
+            if isinstance(image_data, bytes):
+                # Already decoded, e.g. by the request fingerprint.
+                image_bytes = image_data
+            else:
+                if image_data.startswith('data:image'):
+                    image_data = image_data.split(',')[1]
+                image_bytes = base64.b64decode(image_data)
             image = Image.open(io.BytesIO(image_bytes))
             
             if image.mode != 'RGB':
@@ -76,7 +79,7 @@ class MLService:
             raise ValueError(f"Image size {len(image_bytes)} exceeds maximum {settings.max_image_size}")
     
     @track_ml_inference("clip-vit-b32", "extract_features")
-    async def extract_features(self, image_data: str) -> np.ndarray:
+    async def extract_features(self, image_data: Union[str, bytes]) -> np.ndarray:
         if self.model is None:
             await self.load_model()
         
@@ -89,7 +92,7 @@ class MLService:
             )
             
             return features
-            
+        
         except Exception as e:
             logger.error(f"Feature extraction failed: {str(e)}")
             ml_inference_total.labels(
@@ -129,7 +132,7 @@ class MLService:
                 all_features.extend(batch_features)
             
             return all_features
-            
+        
         except Exception as e:
             logger.error(f"Batch feature extraction failed: {str(e)}")
             raise
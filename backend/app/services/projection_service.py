@@ -0,0 +1,367 @@
+import asyncio
+import json
+import logging
+import os
+import pickle
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from sklearn.decomposition import IncrementalPCA
+from sklearn.preprocessing import normalize
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass
+class EmbeddingProjection:
+    version: int
+    model: IncrementalPCA
+    input_dimension: int
+    output_dimension: int
+    trained_on: int
+    created_at: float
+    
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        reduced = self.model.transform(np.atleast_2d(vectors).astype(np.float32))
+        return normalize(reduced).astype(np.float32)
+    
+    def collection_name(self, base_name: str) -> str:
+        return f"{base_name}_pca{self.output_dimension}_v{self.version}"
+    
+    def explained_variance(self) -> float:
+        return float(np.sum(self.model.explained_variance_ratio_))
+
+
+class ProjectionService:
+    # A new projection is staged first: serving workers pick it up on their
+    # next refresh and dual-write to its collection while it is backfilled.
+    # Only after the backfill is it published and used for search.
+    def __init__(self, model_dir: Optional[str] = None, refresh_interval: float = 5.0):
+        self.model_dir = model_dir or settings.projection_model_dir
+        self.refresh_interval = refresh_interval
+        self.projection: Optional[EmbeddingProjection] = None
+        self.staged: Optional[EmbeddingProjection] = None
+        self._refreshed_at = 0.0
+        self._mtimes: Dict[str, float] = {}
+    
+    def _manifest_path(self) -> str:
+        return os.path.join(self.model_dir, "manifest.json")
+    
+    def _staged_path(self) -> str:
+        return os.path.join(self.model_dir, "staged.json")
+    
+    def _model_path(self, version: int) -> str:
+        return os.path.join(self.model_dir, f"projection_v{version}.pkl")
+    
+    def _load(self, manifest_path: str) -> Optional[EmbeddingProjection]:
+        if not os.path.exists(manifest_path):
+            return None
+        
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        
+        with open(self._model_path(manifest["version"]), "rb") as f:
+            model = pickle.load(f)
+        
+        return EmbeddingProjection(
+            version=manifest["version"],
+            model=model,
+            input_dimension=manifest["input_dimension"],
+            output_dimension=manifest["output_dimension"],
+            trained_on=manifest["trained_on"],
+            created_at=manifest["created_at"]
+        )
+    
+    def load_latest(self) -> Optional[EmbeddingProjection]:
+        projection = self._load(self._manifest_path())
+        if projection is None:
+            return None
+        
+        self.projection = projection
+        logger.info(
+            f"Loaded embedding projection v{self.projection.version} "
+            f"({self.projection.input_dimension} -> {self.projection.output_dimension})"
+        )
+        return self.projection
+    
+    def _changed(self, path: str) -> bool:
+        mtime = os.path.getmtime(path) if os.path.exists(path) else 0.0
+        if self._mtimes.get(path) == mtime:
+            return False
+        self._mtimes[path] = mtime
+        return True
+    
+    def refresh(self):
+        # Cheap enough for the request path: at most a couple of stat calls
+        # per interval, and a model load only when a manifest changed.
+        now = time.time()
+        if now - self._refreshed_at < self.refresh_interval:
+            return
+        self._refreshed_at = now
+        
+        try:
+            if self._changed(self._staged_path()):
+                self.staged = self._load(self._staged_path())
+                if self.staged is not None:
+                    logger.info(f"Dual-writing to staged projection v{self.staged.version}")
+            
+            if self._changed(self._manifest_path()):
+                published = self._load(self._manifest_path())
+                if published is not None and (self.projection is None or published.version > self.projection.version):
+                    self.projection = published
+                    logger.info(f"Switched to published projection v{published.version}")
+            
+            if self.staged is not None and self.projection is not None and self.staged.version <= self.projection.version:
+                self.staged = None
+        except Exception as e:
+            logger.error(f"Failed to refresh projection: {str(e)}")
+    
+    def write_targets(self) -> List[EmbeddingProjection]:
+        return [projection for projection in (self.projection, self.staged) if projection is not None]
+    
+    def stage(self, projection: EmbeddingProjection):
+        os.makedirs(self.model_dir, exist_ok=True)
+        
+        with open(self._model_path(projection.version), "wb") as f:
+            pickle.dump(projection.model, f)
+        
+        self._write_manifest(self._staged_path(), projection)
+    
+    def publish(self, projection: EmbeddingProjection):
+        self._write_manifest(self._manifest_path(), projection)
+        if os.path.exists(self._staged_path()):
+            os.remove(self._staged_path())
+    
+    def _write_manifest(self, path: str, projection: EmbeddingProjection):
+        manifest = {
+            "version": projection.version,
+            "input_dimension": projection.input_dimension,
+            "output_dimension": projection.output_dimension,
+            "trained_on": projection.trained_on,
+            "created_at": projection.created_at,
+            "explained_variance": projection.explained_variance()
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+    
+    async def train_from_collection(
+        self,
+        client: QdrantClient,
+        collection_name: str,
+        output_dimension: Optional[int] = None,
+        batch_size: int = 2000,
+        max_points: Optional[int] = None
+    ) -> EmbeddingProjection:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None,
+            self._train_sync,
+            client,
+            collection_name,
+            output_dimension or settings.projection_dimension,
+            batch_size,
+            max_points
+        )
+    
+    def _train_sync(
+        self,
+        client: QdrantClient,
+        collection_name: str,
+        output_dimension: int,
+        batch_size: int,
+        max_points: Optional[int]
+    ) -> EmbeddingProjection:
+        batch_size = max(batch_size, output_dimension)
+        model = IncrementalPCA(n_components=output_dimension, batch_size=batch_size)
+        
+        offset = None
+        pending = []
+        trained_on = 0
+        
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=False,
+                with_vectors=True
+            )
+            pending.extend(point.vector for point in points)
+            
+            # IncrementalPCA needs at least n_components rows per partial_fit.
+            if len(pending) >= batch_size or (offset is None and len(pending) >= output_dimension):
+                model.partial_fit(np.asarray(pending, dtype=np.float32))
+                trained_on += len(pending)
+                pending = []
+            
+            if offset is None or (max_points is not None and trained_on >= max_points):
+                break
+        
+        if trained_on == 0:
+            raise ValueError(
+                f"Need at least {output_dimension} vectors in {collection_name} to train a projection"
+            )
+        
+        current = self.load_latest() if self.projection is None else self.projection
+        projection = EmbeddingProjection(
+            version=(current.version + 1) if current else 1,
+            model=model,
+            input_dimension=model.n_features_in_,
+            output_dimension=output_dimension,
+            trained_on=trained_on,
+            created_at=time.time()
+        )
+        # Not published yet: searching it before the backfill would miss
+        # every point it has not copied. The collection exists before the
+        # stage so workers can dual-write into it right away.
+        ensure_reduced_collection(client, projection.collection_name(collection_name), projection)
+        self.stage(projection)
+        logger.info(
+            f"Trained projection v{projection.version} on {trained_on} vectors, "
+            f"explained variance {projection.explained_variance():.3f}"
+        )
+        return projection
+    
+    async def backfill_collection(
+        self,
+        client: QdrantClient,
+        source_collection: str,
+        projection: EmbeddingProjection,
+        batch_size: int = 1000
+    ) -> int:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None, self._backfill_sync, client, source_collection, projection, batch_size
+        )
+    
+    def _backfill_sync(
+        self,
+        client: QdrantClient,
+        source_collection: str,
+        projection: EmbeddingProjection,
+        batch_size: int
+    ) -> int:
+        target_collection = projection.collection_name(source_collection)
+        ensure_reduced_collection(client, target_collection, projection)
+        
+        offset = None
+        copied = 0
+        
+        while True:
+            points, offset = client.scroll(
+                collection_name=source_collection,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            if points:
+                self._copy_points(client, target_collection, projection, points)
+                self._recheck_points(client, source_collection, target_collection, projection, points)
+                copied += len(points)
+            
+            if offset is None:
+                break
+        
+        logger.info(f"Backfilled {copied} points into {target_collection}")
+        return copied
+    
+    def _copy_points(self, client: QdrantClient, target_collection: str,
+                     projection: EmbeddingProjection, points: List[Any]):
+        # wait=True: the projection is published right after the backfill, and
+        # searches must not reach points the collection has not applied yet.
+        full_vectors = np.asarray([point.vector for point in points], dtype=np.float32)
+        reduced_vectors = projection.transform(full_vectors)
+        client.upsert(
+            collection_name=target_collection,
+            points=[
+                models.PointStruct(
+                    id=point.id,
+                    vector={"reduced": reduced.tolist()},
+                    payload=point.payload
+                )
+                for point, reduced in zip(points, reduced_vectors)
+            ],
+            wait=True
+        )
+    
+    def _recheck_points(self, client: QdrantClient, source_collection: str, target_collection: str,
+                        projection: EmbeddingProjection, points: List[Any]):
+        # A delete or re-index dual-written between the scroll and the copy
+        # was just overwritten by the scanned version; re-read the batch and
+        # apply the current state again.
+        current = {
+            str(point.id): point
+            for point in client.retrieve(
+                collection_name=source_collection,
+                ids=[point.id for point in points],
+                with_payload=True,
+                with_vectors=True
+            )
+        }
+        deleted = [point.id for point in points if str(point.id) not in current]
+        changed = [
+            current[str(point.id)]
+            for point in points
+            if str(point.id) in current and (
+                current[str(point.id)].vector != point.vector or current[str(point.id)].payload != point.payload
+            )
+        ]
+        
+        if deleted:
+            client.delete(
+                collection_name=target_collection,
+                points_selector=models.PointIdsList(points=deleted),
+                wait=True
+            )
+        if changed:
+            self._copy_points(client, target_collection, projection, changed)
+    
+    def activate(self, projection: EmbeddingProjection):
+        self.projection = projection
+    
+    def get_info(self) -> Dict[str, Any]:
+        if self.projection is None:
+            return {"enabled": False}
+        
+        return {
+            "enabled": True,
+            "version": self.projection.version,
+            "input_dimension": self.projection.input_dimension,
+            "output_dimension": self.projection.output_dimension,
+            "trained_on": self.projection.trained_on,
+            "explained_variance": self.projection.explained_variance()
+        }
+
+
+def ensure_reduced_collection(client: QdrantClient, collection_name: str, projection: EmbeddingProjection):
+    collections = client.get_collections()
+    if any(collection.name == collection_name for collection in collections.collections):
+        return
+    
+    # Only the reduced vector lives here; the re-rank reads full vectors
+    # back from the source collection, which keeps them on disk.
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config={
+            "reduced": models.VectorParams(
+                size=projection.output_dimension,
+                distance=models.Distance.COSINE
+            )
+        }
+    )
+    logger.info(f"Created reduced collection {collection_name}")
+
+
+@lru_cache()
+def get_projection_service() -> ProjectionService:
+    return ProjectionService(refresh_interval=settings.projection_refresh_interval)
@@ -1,11 +1,15 @@
 import numpy as np
 from typing import List, Dict, Any, Optional, Tuple
 import asyncio
-from sklearn.decomposition import PCA
 from sklearn.preprocessing import normalize
 import faiss
-import pickle
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.search_budget import SearchEffort
+from app.services.projection_service import EmbeddingProjection
+from app.services.binary_index import BinaryQuantizedIndex
 
 logger = logging.getLogger(__name__)
 
@@ -13,83 +17,105 @@ logger = logging.getLogger(__name__)
 class QueryOptimizer:
     def __init__(self, dimension: int = 512):
         self.dimension = dimension
-        self.pca_model: Optional[PCA] = None
+        self.projection: Optional[EmbeddingProjection] = None
         self.index_flat: Optional[faiss.IndexFlatIP] = None
         self.index_ivf: Optional[faiss.IndexIVFFlat] = None
         self.quantizer: Optional[faiss.IndexFlatL2] = None
         self.reduced_dimension = min(256, dimension)
     
+    def set_projection(self, projection: Optional[EmbeddingProjection]):
+        self.projection = projection
+        if projection is not None:
+            self.reduced_dimension = projection.output_dimension
+    
+    def _index_dimension(self) -> int:
+        return self.projection.output_dimension if self.projection is not None else self.dimension
+    
+    def _prepare_vectors(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.atleast_2d(vectors).astype(np.float32)
+        if self.projection is not None:
+            return self.projection.transform(vectors)
+        return normalize(vectors).astype(np.float32)
+    
     async def initialize(self, sample_vectors: np.ndarray):
         loop = asyncio.get_event_loop()
         await loop.run_in_executor(None, self._initialize_sync, sample_vectors)
     
     def _initialize_sync(self, sample_vectors: np.ndarray):
-        if len(sample_vectors) > 10000:
-            self.pca_model = PCA(n_components=self.reduced_dimension)
-            self.pca_model.fit(sample_vectors)
-            logger.info(f"PCA model trained, reduced dimension: {self.reduced_dimension}")
-        
-        self.index_flat = faiss.IndexFlatIP(self.dimension)
+        dimension = self._index_dimension()
+        self.index_flat = faiss.IndexFlatIP(dimension)
         
         nlist = min(100, int(np.sqrt(len(sample_vectors))))
-        self.quantizer = faiss.IndexFlatL2(self.dimension)
-        self.index_ivf = faiss.IndexIVFFlat(self.quantizer, self.dimension, nlist)
+        self.quantizer = faiss.IndexFlatL2(dimension)
+        self.index_ivf = faiss.IndexIVFFlat(self.quantizer, dimension, nlist)
         
         if len(sample_vectors) > 0:
-            self.index_ivf.train(sample_vectors)
+            self.index_ivf.train(self._prepare_vectors(sample_vectors))
             logger.info(f"IVF index trained with {nlist} centroids")
     
     async def optimize_query_vector(self, query_vector: np.ndarray) -> np.ndarray:
-        normalized = normalize(query_vector.reshape(1, -1))[0]
-        
-        if self.pca_model is not None:
+        if self.projection is not None:
             loop = asyncio.get_event_loop()
             reduced = await loop.run_in_executor(
-                None, self.pca_model.transform, normalized.reshape(1, -1)
+                None, self._prepare_vectors, query_vector
             )
             return reduced[0]
         
-        return normalized
+        return normalize(query_vector.reshape(1, -1))[0]
     
-    async def build_optimized_index(self, vectors: np.ndarray, ids: List[str]) -> Dict[str, Any]:
+    async def build_optimized_index(self, vectors: np.ndarray, ids: List[str],
+                                    index_type: str = "auto") -> Dict[str, Any]:
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self._build_index_sync, vectors, ids)
+        return await loop.run_in_executor(None, self._build_index_sync, vectors, ids, index_type)
     
-    def _build_index_sync(self, vectors: np.ndarray, ids: List[str]) -> Dict[str, Any]:
-        normalized_vectors = normalize(vectors)
+    def _build_index_sync(self, vectors: np.ndarray, ids: List[str],
+                          index_type: str = "auto") -> Dict[str, Any]:
+        normalized_vectors = self._prepare_vectors(vectors)
+        dimension = self._index_dimension()
         
-        if len(vectors) < 10000:
-            index = faiss.IndexFlatIP(self.dimension)
-        else:
+        if index_type == "auto":
+            index_type = "flat" if len(vectors) < 10000 else "ivf"
+        
+        if index_type == "binary":
+            index = BinaryQuantizedIndex(dimension)
+        elif index_type == "flat":
+            index = faiss.IndexFlatIP(dimension)
+        elif index_type == "ivf":
             nlist = int(np.sqrt(len(vectors)))
-            quantizer = faiss.IndexFlatL2(self.dimension)
-            index = faiss.IndexIVFFlat(quantizer, self.dimension, nlist)
+            quantizer = faiss.IndexFlatIP(dimension)
+            index = faiss.IndexIVFFlat(
+                quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT
+            )
             index.train(normalized_vectors)
+        else:
+            raise ValueError(f"Unknown index type: {index_type}")
         
         index.add(normalized_vectors)
         
         return {
             'index': index,
             'ids': ids,
-            'size': len(vectors)
+            'size': len(vectors),
+            'type': index_type
         }
     
     async def search_optimized(self, index_data: Dict[str, Any], query_vector: np.ndarray, 
-                             k: int) -> List[Tuple[str, float]]:
+                             k: int, effort: Optional[SearchEffort] = None) -> List[Tuple[str, float]]:
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(
-            None, self._search_sync, index_data, query_vector, k
+            None, self._search_sync, index_data, query_vector, k, effort
         )
     
     def _search_sync(self, index_data: Dict[str, Any], query_vector: np.ndarray, 
-                    k: int) -> List[Tuple[str, float]]:
+                    k: int, effort: Optional[SearchEffort] = None) -> List[Tuple[str, float]]:
         index = index_data['index']
         ids = index_data['ids']
         
-        normalized_query = normalize(query_vector.reshape(1, -1))
+        normalized_query = self._prepare_vectors(query_vector)
         
         if hasattr(index, 'nprobe'):
-            index.nprobe = min(10, index.nlist)
+            nprobe = effort.nprobe if effort is not None else 10
+            index.nprobe = min(nprobe, index.nlist)
         
         distances, indices = index.search(normalized_query, min(k, len(ids)))
         
@@ -101,13 +127,14 @@ class QueryOptimizer:
         return results
     
     def estimate_memory_usage(self, num_vectors: int) -> Dict[str, float]:
-        vector_memory = num_vectors * self.dimension * 4 / (1024**3)
+        dimension = self._index_dimension()
+        vector_memory = num_vectors * dimension * 4 / (1024**3)
         
         if num_vectors < 10000:
             index_memory = vector_memory
         else:
             nlist = int(np.sqrt(num_vectors))
-            index_memory = vector_memory + (nlist * self.dimension * 4 / (1024**3))
+            index_memory = vector_memory + (nlist * dimension * 4 / (1024**3))
         
         return {
             'vector_memory_gb': vector_memory,
@@ -117,39 +144,136 @@ class QueryOptimizer:
         }
     
     async def create_partitioned_index(self, vectors: np.ndarray, ids: List[str], 
-                                     partitions: int = 4) -> List[Dict[str, Any]]:
-        partition_size = len(vectors) // partitions
-        tasks = []
-        
-        for i in range(partitions):
-            start_idx = i * partition_size
-            end_idx = start_idx + partition_size if i < partitions - 1 else len(vectors)
-            
-            partition_vectors = vectors[start_idx:end_idx]
-            partition_ids = ids[start_idx:end_idx]
-            
-            task = asyncio.create_task(
-                self.build_optimized_index(partition_vectors, partition_ids)
+                                     partitions: int = 4,
+                                     max_workers: Optional[int] = None,
+                                     index_type: str = "auto",
+                                     omp_threads: Optional[int] = None) -> 'PartitionedIndex':
+        engine = PartitionedIndex(self, max_workers=max_workers or partitions, omp_threads=omp_threads)
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, engine.build, vectors, ids, partitions, index_type)
+        return engine
+    
+    async def search_partitioned(self, partitioned_index: 'PartitionedIndex', 
+                                query_vector: np.ndarray, k: int,
+                                effort: Optional[SearchEffort] = None) -> List[Tuple[str, float]]:
+        results = await self.search_partitioned_batch(
+            partitioned_index, query_vector.reshape(1, -1), k, effort
+        )
+        return results[0]
+    
+    async def search_partitioned_batch(self, partitioned_index: 'PartitionedIndex',
+                                      query_vectors: np.ndarray, k: int,
+                                      effort: Optional[SearchEffort] = None) -> List[List[Tuple[str, float]]]:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None, partitioned_index.search_batch, query_vectors, k, effort
+        )
+
+
+class PartitionedIndex:
+    # FAISS releases the GIL during search, so a plain thread pool searches
+    # all partitions on separate cores.
+    
+    def __init__(self, optimizer: QueryOptimizer, max_workers: Optional[int] = None,
+                 omp_threads: Optional[int] = None):
+        self.optimizer = optimizer
+        self.max_workers = max(1, min(max_workers or os.cpu_count() or 1, os.cpu_count() or 1))
+        # Avoid oversubscribing cores with OpenMP threads inside each search.
+        # The OpenMP thread count is per calling thread, so it is set in the
+        # pool's own threads and the rest of the process keeps its setting.
+        self.omp_threads = omp_threads or max(1, (os.cpu_count() or 1) // self.max_workers)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="partition-search",
+            initializer=faiss.omp_set_num_threads,
+            initargs=(self.omp_threads,)
+        )
+        self.partitions: List[Dict[str, Any]] = []
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.ids = np.empty(0, dtype=object)
+    
+    def build(self, vectors: np.ndarray, ids: List[str], partitions: int = 4,
+              index_type: str = "auto"):
+        bounds = np.linspace(0, len(vectors), partitions + 1, dtype=np.int64)
+        futures = [
+            self.executor.submit(
+                self.optimizer._build_index_sync,
+                vectors[bounds[i]:bounds[i + 1]],
+                ids[bounds[i]:bounds[i + 1]],
+                index_type
             )
-            tasks.append(task)
+            for i in range(partitions)
+            if bounds[i + 1] > bounds[i]
+        ]
+        self.partitions = [future.result() for future in futures]
         
-        return await asyncio.gather(*tasks)
+        sizes = [partition['size'] for partition in self.partitions]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        self.ids = np.asarray(list(ids), dtype=object)
+        
+        logger.info(
+            f"Built {len(self.partitions)} partitions over {len(ids)} vectors "
+            f"with {self.max_workers} search threads ({self.omp_threads} OpenMP threads each)"
+        )
     
-    async def search_partitioned(self, partitioned_indices: List[Dict[str, Any]], 
-                                query_vector: np.ndarray, k: int) -> List[Tuple[str, float]]:
-        tasks = []
-        for index_data in partitioned_indices:
-            task = asyncio.create_task(
-                self.search_optimized(index_data, query_vector, k * 2)
-            )
-            tasks.append(task)
+    def _search_partition(self, partition_idx: int, queries: np.ndarray, k: int,
+                          effort: Optional[SearchEffort]) -> Tuple[np.ndarray, np.ndarray]:
+        index = self.partitions[partition_idx]['index']
+        
+        params = None
+        if hasattr(index, 'nprobe'):
+            nprobe = effort.nprobe if effort is not None else 10
+            params = faiss.SearchParametersIVF(nprobe=min(nprobe, index.nlist))
+        
+        scores, labels = index.search(queries, min(k, index.ntotal), params=params)
         
-        partition_results = await asyncio.gather(*tasks)
+        if scores.shape[1] < k:
+            pad = k - scores.shape[1]
+            scores = np.pad(scores, ((0, 0), (0, pad)), constant_values=-np.inf)
+            labels = np.pad(labels, ((0, 0), (0, pad)), constant_values=-1)
         
-        all_results = []
-        for results in partition_results:
-            all_results.extend(results)
+        scores = np.where(labels >= 0, scores, -np.inf)
+        labels = np.where(labels >= 0, labels + self.offsets[partition_idx], -1)
+        return scores, labels
+    
+    def search_batch(self, query_vectors: np.ndarray, k: int,
+                     effort: Optional[SearchEffort] = None) -> List[List[Tuple[str, float]]]:
+        queries = self.optimizer._prepare_vectors(query_vectors)
+        
+        futures = [
+            self.executor.submit(self._search_partition, i, queries, k, effort)
+            for i in range(len(self.partitions))
+        ]
+        partition_results = [future.result() for future in futures]
         
-        all_results.sort(key=lambda x: x[1], reverse=True)
+        scores = np.concatenate([result[0] for result in partition_results], axis=1)
+        labels = np.concatenate([result[1] for result in partition_results], axis=1)
+        top_scores, top_labels = merge_top_k(scores, labels, k)
         
-        return all_results[:k]
+        results = []
+        for row_scores, row_labels in zip(top_scores, top_labels):
+            valid = row_labels >= 0
+            results.append(list(zip(
+                self.ids[row_labels[valid]].tolist(),
+                row_scores[valid].astype(float).tolist()
+            )))
+        return results
+    
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+def merge_top_k(scores: np.ndarray, labels: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return scores[:, :0], labels[:, :0]
+    
+    candidate_idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    candidate_scores = np.take_along_axis(scores, candidate_idx, axis=1)
+    order = np.argsort(-candidate_scores, axis=1)
+    top_idx = np.take_along_axis(candidate_idx, order, axis=1)
+    
+    return (
+        np.take_along_axis(scores, top_idx, axis=1),
+        np.take_along_axis(labels, top_idx, axis=1)
+    )
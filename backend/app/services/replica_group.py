@@ -0,0 +1,254 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from qdrant_client import QdrantClient
+
+from app.core.metrics import circuit_breaker_state, circuit_breaker_rejections_total
+
+logger = logging.getLogger(__name__)
+
+BALANCERS = ("round_robin", "least_outstanding", "latency_ewma")
+CONSISTENCY_LEVELS = ("eventual", "quorum", "all")
+
+_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class ReplicaWriteError(RuntimeError):
+    def __init__(self, message: str, errors: List[Exception]):
+        super().__init__(message)
+        self.errors = errors
+
+
+class CircuitBreaker:
+    # Opens after `failure_threshold` consecutive failures and rejects calls
+    # until `reset_timeout` has passed; then one probe call is let through and
+    # its outcome closes or re-opens the circuit.
+    def __init__(self, name: str, failure_threshold: int = 50, reset_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+    
+    def available(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            return time.time() - self.opened_at >= self.reset_timeout
+        return not self._probe_in_flight
+    
+    def allow(self) -> bool:
+        if self.state == "open" and time.time() - self.opened_at >= self.reset_timeout:
+            self._set_state("half_open")
+        
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+    
+    def release_probe(self):
+        self._probe_in_flight = False
+    
+    def record_success(self):
+        self.failures = 0
+        self._probe_in_flight = False
+        if self.state != "closed":
+            logger.info(f"Circuit {self.name} closed")
+            self._set_state("closed")
+    
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            logger.warning(f"Circuit {self.name} opened after {self.failures} consecutive failures")
+            self.opened_at = time.time()
+            self._set_state("open")
+    
+    def _set_state(self, state: str):
+        self.state = state
+        circuit_breaker_state.labels(replica=self.name).set(_STATE_VALUES[state])
+
+
+class Replica:
+    def __init__(self, client: QdrantClient, name: str, breaker: CircuitBreaker):
+        self.client = client
+        self.name = name
+        self.breaker = breaker
+        self.outstanding = 0
+        self.latency_ewma: Optional[float] = None
+        # Last write dispatched to this replica per point id, including ones
+        # still running after the group write already returned.
+        self.pending_writes: Dict[str, asyncio.Future] = {}
+    
+    def record_latency(self, seconds: float, alpha: float = 0.2):
+        if self.latency_ewma is None:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma = alpha * seconds + (1 - alpha) * self.latency_ewma
+
+
+class ReplicaGroup:
+    def __init__(self, clients: List[QdrantClient], names: List[str], algorithm: str = "round_robin",
+                 failure_threshold: int = 50, reset_timeout: float = 60.0):
+        if algorithm not in BALANCERS:
+            raise ValueError(f"Unknown load balancer algorithm: {algorithm}")
+        
+        self.algorithm = algorithm
+        self.replicas = [
+            Replica(client, name, CircuitBreaker(name, failure_threshold, reset_timeout))
+            for client, name in zip(clients, names)
+        ]
+        self._round_robin = itertools.count()
+    
+    @property
+    def primary(self) -> QdrantClient:
+        return self.replicas[0].client
+    
+    def read_order(self) -> List[Replica]:
+        available = [replica for replica in self.replicas if replica.breaker.available()]
+        
+        if self.algorithm == "round_robin":
+            if not available:
+                return []
+            start = next(self._round_robin) % len(available)
+            return available[start:] + available[:start]
+        if self.algorithm == "least_outstanding":
+            return sorted(available, key=lambda replica: replica.outstanding)
+        # Unmeasured replicas sort first so they get sampled.
+        return sorted(available, key=lambda replica: replica.latency_ewma or 0.0)
+    
+    async def call(self, replica: Replica, fn: Callable[[QdrantClient], Any]) -> Any:
+        if not replica.breaker.allow():
+            circuit_breaker_rejections_total.labels(replica=replica.name).inc()
+            raise CircuitOpenError(f"Circuit open for replica {replica.name}")
+        
+        replica.outstanding += 1
+        start_time = time.time()
+        try:
+            result = await asyncio.get_event_loop().run_in_executor(None, fn, replica.client)
+        except asyncio.CancelledError:
+            # Lost a hedge race; says nothing about the replica's health.
+            replica.breaker.release_probe()
+            raise
+        except Exception:
+            replica.breaker.record_failure()
+            raise
+        else:
+            replica.breaker.record_success()
+            replica.record_latency(time.time() - start_time)
+            return result
+        finally:
+            replica.outstanding -= 1
+    
+    def read_attempts(self, fn: Callable[[QdrantClient], Any]) -> List[Callable[[], Any]]:
+        return [
+            (lambda replica=replica: self.call(replica, fn))
+            for replica in self.read_order()
+        ]
+    
+    async def read(self, fn: Callable[[QdrantClient], Any]) -> Any:
+        last_error = None
+        for attempt in self.read_attempts(fn):
+            try:
+                return await attempt()
+            except Exception as e:
+                last_error = e
+        raise last_error or CircuitOpenError("No replica available")
+    
+    def required_acks(self, consistency_level: str) -> int:
+        if consistency_level == "all":
+            return len(self.replicas)
+        if consistency_level == "quorum":
+            return len(self.replicas) // 2 + 1
+        return 1
+    
+    async def _ordered_call(self, replica: Replica, fn: Callable[[QdrantClient], Any],
+                            earlier: List[asyncio.Future]) -> Any:
+        if earlier:
+            await asyncio.wait(earlier)
+        return await self.call(replica, fn)
+    
+    def _dispatch(self, replica: Replica, fn: Callable[[QdrantClient], Any],
+                  keys: Optional[List[str]]) -> asyncio.Future:
+        # A replica applies writes to the same points in the order they were
+        # issued, even when the earlier one is still running there after the
+        # group already returned on other replicas' acks. A write without keys
+        # waits for everything in flight on the replica.
+        if keys is None:
+            earlier = set(replica.pending_writes.values())
+        else:
+            earlier = {replica.pending_writes[key] for key in keys if key in replica.pending_writes}
+        task = asyncio.ensure_future(self._ordered_call(replica, fn, list(earlier)))
+        
+        for key in keys or []:
+            replica.pending_writes[key] = task
+        
+        def untrack(_):
+            for key in keys or []:
+                if replica.pending_writes.get(key) is task:
+                    del replica.pending_writes[key]
+        
+        task.add_done_callback(untrack)
+        return task
+    
+    async def write(self, fn: Callable[[QdrantClient], Any], consistency_level: str = "eventual",
+                    keys: Optional[Iterable[Any]] = None):
+        if consistency_level not in CONSISTENCY_LEVELS:
+            raise ValueError(f"Unknown consistency level: {consistency_level}")
+        
+        required = self.required_acks(consistency_level)
+        keys = [str(key) for key in keys] if keys is not None else None
+        tasks = [self._dispatch(replica, fn, keys) for replica in self.replicas]
+        
+        acks = 0
+        errors = []
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                await next_done
+                acks += 1
+            except Exception as e:
+                errors.append(e)
+            
+            if acks >= required or len(errors) > len(tasks) - required:
+                break
+        
+        # Remaining replicas keep applying the write in the background; later
+        # writes to the same points queue behind it on those replicas.
+        for task in tasks:
+            task.add_done_callback(self._log_background_failure)
+        
+        if acks >= required:
+            return acks
+        
+        raise ReplicaWriteError(
+            f"Write reached {acks}/{required} replicas for consistency={consistency_level}: "
+            f"{'; '.join(str(e) for e in errors)}",
+            errors
+        )
+    
+    @staticmethod
+    def _log_background_failure(task: asyncio.Future):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Replica write failed: {str(task.exception())}")
+    
+    def get_stats(self) -> List[dict]:
+        return [
+            {
+                'replica': replica.name,
+                'circuit': replica.breaker.state,
+                'outstanding': replica.outstanding,
+                'latency_ewma_ms': replica.latency_ewma * 1000 if replica.latency_ewma is not None else None
+            }
+            for replica in self.replicas
+        ]
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from functools import lru_cache
+from typing import Dict, List, Optional
+import redis.asyncio as redis
+
+from app.services.hash_ring import ConsistentHashRing, RingLayout
+
+logger = logging.getLogger(__name__)
+
+
+class RingCoordinator:
+    # Shares the shard ring through Redis so every serving worker routes with
+    # the same layout. Workers poll the layout and report the state they
+    # route with; a migration step only proceeds once every live worker has
+    # reported it.
+    def __init__(self, redis_client: redis.Redis, key: str = "shard:ring",
+                 poll_interval: float = 2.0, worker_id: Optional[str] = None):
+        self.redis_client = redis_client
+        self.key = key
+        self.acks_key = f"{key}:acks"
+        self.poll_interval = poll_interval
+        # A worker that missed three heartbeats is gone; it reloads the
+        # layout before serving again.
+        self.liveness = poll_interval * 3
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    
+    async def publish(self, current: ConsistentHashRing, previous: Optional[ConsistentHashRing] = None,
+                      only_if_missing: bool = False) -> bool:
+        value = json.dumps(RingLayout.encode(current, previous))
+        return bool(await self.redis_client.set(self.key, value, nx=only_if_missing))
+    
+    async def fetch(self) -> Optional[Dict[str, Optional[ConsistentHashRing]]]:
+        value = await self.redis_client.get(self.key)
+        if value is None:
+            return None
+        return RingLayout.decode(json.loads(value))
+    
+    async def ack(self, state: str):
+        await self.redis_client.hset(
+            self.acks_key, self.worker_id, json.dumps({"state": state, "at": time.time()})
+        )
+    
+    async def withdraw(self):
+        await self.redis_client.hdel(self.acks_key, self.worker_id)
+    
+    async def lagging_workers(self, state: str) -> List[str]:
+        acks = await self.redis_client.hgetall(self.acks_key)
+        now = time.time()
+        lagging, dead = [], []
+        for worker, value in acks.items():
+            ack = json.loads(value)
+            if now - ack["at"] > self.liveness:
+                dead.append(worker)
+            elif ack["state"] != state:
+                lagging.append(worker.decode() if isinstance(worker, bytes) else worker)
+        
+        if dead:
+            await self.redis_client.hdel(self.acks_key, *dead)
+        return lagging
+    
+    async def wait_for_acks(self, state: str, timeout: float = 120.0):
+        deadline = time.time() + timeout
+        while True:
+            lagging = await self.lagging_workers(state)
+            if not lagging:
+                logger.info(f"All workers route with shard ring state {state}")
+                return
+            if time.time() > deadline:
+                raise TimeoutError(
+                    f"{len(lagging)} workers did not pick up shard ring state {state} "
+                    f"within {timeout:.0f}s: {lagging}"
+                )
+            await asyncio.sleep(self.poll_interval / 2)
+
+
+@lru_cache()
+def get_ring_coordinator() -> RingCoordinator:
+    from app.config import get_settings
+    from app.config_scale import get_scale_settings
+    settings = get_settings()
+    scale_settings = get_scale_settings()
+    
+    redis_client = redis.Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        db=settings.redis_db,
+        password=settings.redis_password,
+        decode_responses=False
+    )
+    return RingCoordinator(
+        redis_client,
+        key=scale_settings.shard_ring_redis_key,
+        poll_interval=scale_settings.shard_ring_poll_interval
+    )
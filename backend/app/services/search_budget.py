@@ -0,0 +1,69 @@
+import math
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class SearchEffort:
+    level: str
+    hnsw_ef: int
+    nprobe: int
+    rescore: bool
+    indexed_only: bool
+    min_remaining_ms: float
+
+
+# Ordered from most to least expensive; the last level is the fallback once
+# the budget is (nearly) spent.
+EFFORT_LEVELS: Tuple[SearchEffort, ...] = (
+    SearchEffort("high", hnsw_ef=256, nprobe=64, rescore=True, indexed_only=False, min_remaining_ms=250.0),
+    SearchEffort("medium", hnsw_ef=128, nprobe=16, rescore=True, indexed_only=False, min_remaining_ms=100.0),
+    SearchEffort("low", hnsw_ef=48, nprobe=4, rescore=False, indexed_only=False, min_remaining_ms=30.0),
+    SearchEffort("minimal", hnsw_ef=16, nprobe=1, rescore=False, indexed_only=True, min_remaining_ms=0.0),
+)
+
+
+def get_effort(level: str) -> SearchEffort:
+    for effort in EFFORT_LEVELS:
+        if effort.level == level:
+            return effort
+    raise ValueError(f"Unknown search effort level: {level}")
+
+
+def effort_rank(level: str) -> int:
+    # 0 is the most thorough level.
+    return EFFORT_LEVELS.index(get_effort(level))
+
+
+def is_degraded(level: Optional[str]) -> bool:
+    # Results that skipped rescoring or unindexed segments are approximations
+    # of the full answer; entries without a level were computed in full.
+    if level is None:
+        return False
+    effort = get_effort(level)
+    return not effort.rescore or effort.indexed_only
+
+
+class SearchBudget:
+    def __init__(self, budget_ms: Optional[float] = None, start_time: Optional[float] = None):
+        self.budget_ms = budget_ms or settings.search_latency_budget_ms
+        self.start_time = start_time if start_time is not None else time.time()
+        self.deadline = self.start_time + self.budget_ms / 1000
+    
+    def remaining_ms(self) -> float:
+        return max(0.0, (self.deadline - time.time()) * 1000)
+    
+    def select_effort(self) -> SearchEffort:
+        remaining = self.remaining_ms()
+        for effort in EFFORT_LEVELS:
+            if remaining >= effort.min_remaining_ms:
+                return effort
+        return EFFORT_LEVELS[-1]
+    
+    def backend_timeout(self) -> int:
+        return max(1, math.ceil(self.remaining_ms() / 1000))
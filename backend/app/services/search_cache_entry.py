@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from app.services.search_budget import effort_rank, is_degraded
+
+
+@dataclass
+class SearchCacheLookup:
+    # `results` is set on a hit; on a miss, `fetch_top_k`/`fetch_threshold`
+    # say what to search for so the stored entry also covers the old one.
+    # The refill must be stored under `generation`, the one read before the
+    # search, so a write racing the search cannot be cached over. `effort` is
+    # the level the served entry was computed at.
+    results: Optional[List[Dict[str, Any]]]
+    fetch_top_k: int
+    fetch_threshold: float
+    generation: int = 0
+    refresh: bool = False
+    effort: Optional[str] = None
+
+
+def make_entry(results: List[Dict[str, Any]], top_k: int, threshold: float,
+               partial: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    entry = {
+        'top_k': top_k,
+        'threshold': threshold,
+        'results': results
+    }
+    if partial:
+        # Not every shard answered; served to the caller but never cached.
+        entry['partial'] = partial
+    return entry
+
+
+def partial_coverage(results: List[Any]) -> Optional[Dict[str, int]]:
+    # Set by the sharded backend when some shards did not answer.
+    return getattr(results, 'partial', None)
+
+
+def filter_results(results: List[Dict[str, Any]], top_k: int, threshold: float) -> List[Dict[str, Any]]:
+    return [result for result in results if result['score'] >= threshold][:top_k]
+
+
+def serve_from_entry(entry: Any, top_k: int, threshold: float) -> Optional[List[Dict[str, Any]]]:
+    # The entry holds the best `entry_k` matches scoring >= `entry_threshold`,
+    # i.e. a prefix of the full ranking, so it answers any request that
+    # filters that prefix without running past its end.
+    if not isinstance(entry, dict) or 'top_k' not in entry:
+        # Bare result lists from before entries recorded how they were made.
+        return None
+    if threshold < entry['threshold']:
+        return None
+    
+    cached = entry['results']
+    served = filter_results(cached, top_k, threshold)
+    if len(served) == top_k:
+        return served
+    
+    # Fewer than top_k left after filtering: correct only if nothing beyond
+    # the cached prefix can still pass the threshold.
+    exhausted = len(cached) < entry['top_k']
+    crossed_threshold = bool(cached) and cached[-1]['score'] < threshold
+    return served if exhausted or crossed_threshold else None
+
+
+def needs_more_effort(entry: Dict[str, Any], effort: Optional[str]) -> bool:
+    # A degraded entry only stands in for the full answer while requests
+    # cannot afford more effort themselves.
+    if effort is None or not is_degraded(entry.get('effort')):
+        return False
+    return effort_rank(effort) < effort_rank(entry['effort'])
+
+
+def lookup(entry: Any, top_k: int, threshold: float, generation: int = 0,
+           effort: Optional[str] = None) -> SearchCacheLookup:
+    results = serve_from_entry(entry, top_k, threshold) if entry is not None else None
+    if results is not None and needs_more_effort(entry, effort):
+        results = None
+    if results is not None:
+        return SearchCacheLookup(results, top_k, threshold, generation, effort=entry.get('effort'))
+    if not isinstance(entry, dict) or 'top_k' not in entry:
+        return SearchCacheLookup(results, top_k, threshold, generation)
+    
+    return SearchCacheLookup(
+        None,
+        max(top_k, entry['top_k']),
+        min(threshold, entry['threshold']),
+        generation
+    )
@@ -0,0 +1,113 @@
+import itertools
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy as np
+
+
+class _SemanticEntry:
+    __slots__ = ('vector', 'signatures', 'value', 'expires_at')
+    
+    def __init__(self, vector: np.ndarray, signatures: List[int], value: Any, expires_at: float):
+        self.vector = vector
+        self.signatures = signatures
+        self.value = value
+        self.expires_at = expires_at
+
+
+class SemanticResultCache:
+    # Random-hyperplane LSH over query embeddings. Each of `n_tables` tables
+    # hashes a vector to `n_bits` sign bits; two queries at angle theta share
+    # a bit with probability 1 - theta/pi, so near-duplicates (cosine 0.995,
+    # ~0.1 rad) collide in at least one of 4x16-bit tables ~97% of the time.
+    # Candidates from the buckets are then checked with exact cosine.
+    def __init__(self, dim: int = 512, n_bits: int = 16, n_tables: int = 4,
+                 similarity_threshold: float = 0.995, max_entries: int = 100000,
+                 ttl: float = 3600.0, seed: int = 7):
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((n_tables * n_bits, dim)).astype(np.float32)
+        self.n_bits = n_bits
+        self.n_tables = n_tables
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._bit_weights = 1 << np.arange(n_bits, dtype=np.int64)
+        self.buckets: List[Dict[int, Set[int]]] = [defaultdict(set) for _ in range(n_tables)]
+        self.entries: "OrderedDict[int, _SemanticEntry]" = OrderedDict()
+        self._ids = itertools.count()
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def _normalize(self, vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+    
+    def _signatures(self, vector: np.ndarray) -> List[int]:
+        bits = (self.planes @ vector > 0).reshape(self.n_tables, self.n_bits)
+        return (bits @ self._bit_weights).tolist()
+    
+    def _nearest(self, vector: np.ndarray, signatures: List[int]) -> Tuple[Optional[int], float]:
+        candidates = set()
+        for table, signature in zip(self.buckets, signatures):
+            candidates.update(table.get(signature, ()))
+        
+        now = time.time()
+        for entry_id in [entry_id for entry_id in candidates if self.entries[entry_id].expires_at <= now]:
+            self._remove(entry_id)
+            candidates.discard(entry_id)
+        
+        if not candidates:
+            return None, 0.0
+        
+        ids = list(candidates)
+        similarities = np.stack([self.entries[entry_id].vector for entry_id in ids]) @ vector
+        best = int(np.argmax(similarities))
+        return ids[best], float(similarities[best])
+    
+    def get(self, vector: np.ndarray) -> Tuple[Optional[Any], float]:
+        vector = self._normalize(vector)
+        entry_id, similarity = self._nearest(vector, self._signatures(vector))
+        if entry_id is None or similarity < self.similarity_threshold:
+            return None, similarity
+        
+        self.entries.move_to_end(entry_id)
+        return self.entries[entry_id].value, similarity
+    
+    def put(self, vector: np.ndarray, value: Any, ttl: Optional[float] = None):
+        vector = self._normalize(vector)
+        signatures = self._signatures(vector)
+        
+        # A near-duplicate already cached is superseded rather than kept
+        # alongside, so one neighbourhood holds one (the newest) answer.
+        entry_id, similarity = self._nearest(vector, signatures)
+        if entry_id is not None and similarity >= self.similarity_threshold:
+            self._remove(entry_id)
+        
+        entry_id = next(self._ids)
+        self.entries[entry_id] = _SemanticEntry(vector, signatures, value, time.time() + (ttl or self.ttl))
+        for table, signature in zip(self.buckets, signatures):
+            table[signature].add(entry_id)
+        
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+    
+    def _remove(self, entry_id: int):
+        entry = self.entries.pop(entry_id)
+        for table, signature in zip(self.buckets, entry.signatures):
+            bucket = table[signature]
+            bucket.discard(entry_id)
+            if not bucket:
+                del table[signature]
+    
+    def clear(self):
+        self.entries.clear()
+        for table in self.buckets:
+            table.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self.entries),
+            'buckets': [len(table) for table in self.buckets],
+            'similarity_threshold': self.similarity_threshold
+        }
@@ -0,0 +1,98 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, Optional
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+class SemanticShardRouter:
+    # One k-means centroid per shard: a vector lives on the shard of its
+    # nearest centroid and a query probes the n closest shards, the same
+    # coarse-quantizer idea as IVF lists but one level up.
+    def __init__(self, centroids: np.ndarray, version: int = 0, trained_on: int = 0,
+                 created_at: Optional[float] = None):
+        self.centroids = _normalize(centroids)
+        self.version = version
+        self.trained_on = trained_on
+        self.created_at = created_at or time.time()
+    
+    @property
+    def shard_count(self) -> int:
+        return len(self.centroids)
+    
+    @classmethod
+    def train(cls, batches: Iterable[np.ndarray], shard_count: int, version: int = 0,
+              batch_size: int = 4096, seed: int = 42) -> "SemanticShardRouter":
+        model = MiniBatchKMeans(
+            n_clusters=shard_count, batch_size=batch_size, random_state=seed, n_init=3
+        )
+        trained_on = 0
+        for batch in batches:
+            batch = _normalize(batch)
+            if len(batch) < shard_count:
+                continue
+            model.partial_fit(batch)
+            trained_on += len(batch)
+        
+        if trained_on == 0:
+            raise ValueError("Not enough vectors to train the semantic router")
+        
+        return cls(model.cluster_centers_, version, trained_on)
+    
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(_normalize(vectors) @ self.centroids.T, axis=1)
+    
+    def probe(self, query_vector: np.ndarray, n_probe: int) -> np.ndarray:
+        scores = _normalize(query_vector)[0] @ self.centroids.T
+        n_probe = min(n_probe, self.shard_count)
+        nearest = np.argpartition(-scores, n_probe - 1)[:n_probe]
+        return nearest[np.argsort(-scores[nearest])]
+    
+    def balance(self, vectors: np.ndarray) -> Dict[int, float]:
+        counts = np.bincount(self.assign(vectors), minlength=self.shard_count)
+        return {shard: count / max(1, len(vectors)) for shard, count in enumerate(counts)}
+    
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        np.save(f"{path}.npy", self.centroids)
+        with open(path, "w") as f:
+            json.dump({
+                "version": self.version,
+                "shard_count": self.shard_count,
+                "trained_on": self.trained_on,
+                "created_at": self.created_at,
+                "centroids": os.path.basename(f"{path}.npy")
+            }, f, indent=2)
+        
+        logger.info(f"Saved semantic router v{self.version} ({self.shard_count} shards) to {path}")
+    
+    @classmethod
+    def load(cls, path: str) -> Optional["SemanticShardRouter"]:
+        if not os.path.exists(path):
+            return None
+        
+        with open(path) as f:
+            manifest = json.load(f)
+        
+        centroids = np.load(os.path.join(os.path.dirname(path), manifest["centroids"]))
+        return cls(centroids, manifest["version"], manifest["trained_on"], manifest["created_at"])
+    
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "shard_count": self.shard_count,
+            "trained_on": self.trained_on,
+            "created_at": self.created_at
+        }
@@ -0,0 +1,63 @@
+import heapq
+import math
+from typing import Any, Dict, List
+
+ShardResults = List[Dict[str, Any]]
+
+
+def shard_candidate_limit(top_k: int, shard_count: int, overflow_probability: float = 0.01) -> int:
+    # Images are hashed uniformly across shards, so the number of global
+    # top-k hits living on one shard is Binomial(k, 1/S). A shard whose whole
+    # answer makes the cut (X >= limit) might hold more and gets refetched,
+    # so pick the smallest limit with S * P(X >= limit) <= overflow_probability.
+    if shard_count <= 1:
+        return top_k
+    p = 1.0 / shard_count
+    below = 0.0
+    for limit in range(1, top_k):
+        below += math.comb(top_k, limit - 1) * p**(limit - 1) * (1 - p)**(top_k - limit + 1)
+        if shard_count * (1.0 - below) <= overflow_probability:
+            return limit
+    return top_k
+
+
+def merge_shard_results(shard_results: List[ShardResults], top_k: int) -> ShardResults:
+    # k-way merge of per-shard lists that are already sorted by descending
+    # score. Only the heads sit in the heap; once k distinct images are out
+    # no remaining head can beat the k-th score.
+    heap = [
+        (-results[0]['score'], shard, 0)
+        for shard, results in enumerate(shard_results)
+        if results
+    ]
+    heapq.heapify(heap)
+    
+    merged = []
+    seen = set()
+    while heap and len(merged) < top_k:
+        _, shard, pos = heapq.heappop(heap)
+        result = shard_results[shard][pos]
+        
+        if result['image_id'] not in seen:
+            seen.add(result['image_id'])
+            merged.append(result)
+        
+        if pos + 1 < len(shard_results[shard]):
+            heapq.heappush(heap, (-shard_results[shard][pos + 1]['score'], shard, pos + 1))
+    
+    return merged
+
+
+def shards_to_refetch(shard_results: List[ShardResults], limit: int, merged: ShardResults,
+                      top_k: int) -> List[int]:
+    # A shard that filled its limit and whose weakest candidate still made
+    # the cut may hold more top-k results than it was asked for.
+    if limit >= top_k:
+        return []
+    
+    kth_score = merged[-1]['score'] if len(merged) == top_k else -math.inf
+    return [
+        shard
+        for shard, results in enumerate(shard_results)
+        if len(results) >= limit and results[-1]['score'] >= kth_score
+    ]
@@ -0,0 +1,44 @@
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ShardPlacement:
+    # Which shard holds each image under semantic sharding, where the owner
+    # follows the vector and cannot be derived from the id. One Redis hash
+    # field per image (~60 bytes). Lookups return None when Redis is
+    # unavailable so callers can fall back to asking every shard.
+    def __init__(self, redis_client, key: str = "shard:placement"):
+        self.redis_client = redis_client
+        self.key = key
+    
+    async def lookup(self, image_ids: List[str]) -> Optional[Dict[str, int]]:
+        if not image_ids:
+            return {}
+        try:
+            values = await self.redis_client.hmget(self.key, image_ids)
+        except Exception as e:
+            logger.error(f"Failed to look up shard placements: {str(e)}")
+            return None
+        return {
+            image_id: int(value)
+            for image_id, value in zip(image_ids, values)
+            if value is not None
+        }
+    
+    async def record(self, placement: Dict[str, int]):
+        if not placement:
+            return
+        try:
+            await self.redis_client.hset(self.key, mapping=placement)
+        except Exception as e:
+            logger.error(f"Failed to record shard placements: {str(e)}")
+    
+    async def forget(self, image_ids: List[str]):
+        if not image_ids:
+            return
+        try:
+            await self.redis_client.hdel(self.key, *image_ids)
+        except Exception as e:
+            logger.error(f"Failed to forget shard placements: {str(e)}")
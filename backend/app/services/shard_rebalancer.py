@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List
+
+from qdrant_client.http import models
+
+from app.services.hash_ring import ConsistentHashRing
+from app.services.sharding_service import ShardingService
+
+logger = logging.getLogger(__name__)
+
+
+class ShardRebalancer:
+    # Streams only the points whose owner changed between the previous and
+    # current ring. Each moved batch is upserted on the new owner before it is
+    # deleted from the old one, so a point is always readable somewhere.
+    # Draining starts only after every worker dual-writes to both owners.
+    def __init__(self, sharding_service: ShardingService, batch_size: int = 256,
+                 max_points_per_sec: float = 2000.0):
+        self.sharding_service = sharding_service
+        self.batch_size = batch_size
+        self.max_points_per_sec = max_points_per_sec
+        self.stats = {
+            'scanned': 0,
+            'moved': 0,
+            'skipped': 0,
+            'by_target': {}
+        }
+        self._started_at = 0.0
+    
+    async def run(self, target_ring: ConsistentHashRing) -> Dict[str, Any]:
+        service = self.sharding_service
+        
+        if service.sharding_mode != "hash":
+            raise RuntimeError("Ring rebalancing only applies to hash sharding")
+        
+        if service.previous_ring is None:
+            if target_ring.nodes == service.ring.nodes:
+                logger.info(f"Shard ring v{service.ring.version} already uses nodes {target_ring.nodes}")
+                return self.stats
+            await service.begin_migration(target_ring)
+        elif target_ring.nodes != service.ring.nodes:
+            raise RuntimeError(
+                f"Unfinished migration to nodes {service.ring.nodes}; resume it before changing the ring again"
+            )
+        else:
+            logger.info(f"Resuming shard ring migration to v{service.ring.version}")
+            await service.wait_for_ring_acks()
+        
+        await self._ensure_collections()
+        
+        self._started_at = time.time()
+        for source in service.previous_ring.nodes:
+            await self._drain_shard(source)
+        
+        await service.finish_migration()
+        
+        elapsed = time.time() - self._started_at
+        logger.info(
+            f"Rebalance to ring v{service.ring.version} finished in {elapsed:.1f}s: "
+            f"{self.stats['moved']} moved, {self.stats['skipped']} superseded, "
+            f"{self.stats['scanned']} scanned"
+        )
+        return {**self.stats, 'elapsed_seconds': elapsed}
+    
+    async def _ensure_collections(self):
+        service = self.sharding_service
+        source = service.previous_ring.nodes[0]
+        info = await asyncio.get_event_loop().run_in_executor(
+            None, service.shards[source].get_collection, service._collection_name(source)
+        )
+        await service.create_collections(
+            service.shard_configs[0]['collection'], info.config.params.vectors.size
+        )
+    
+    async def _drain_shard(self, source: int):
+        service = self.sharding_service
+        client = service.shards[source]
+        collection_name = service._collection_name(source)
+        offset = None
+        
+        while True:
+            points, offset = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: client.scroll(
+                    collection_name=collection_name,
+                    limit=self.batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True
+                )
+            )
+            
+            moving: Dict[int, List[models.Record]] = {}
+            for point in points:
+                target = service.ring.get_node(point.payload.get('image_id'))
+                if target != source:
+                    moving.setdefault(target, []).append(point)
+            
+            for target, batch in moving.items():
+                await self._move(source, target, batch)
+            
+            self.stats['scanned'] += len(points)
+            await self._throttle()
+            
+            if offset is None:
+                break
+        
+        logger.info(f"Shard {source} drained ({self.stats['moved']} points moved so far)")
+    
+    async def _retrieve(self, shard_idx: int, point_ids: List[Any], with_vectors: bool) -> Dict[str, models.Record]:
+        service = self.sharding_service
+        client = service.shards[shard_idx]
+        collection_name = service._collection_name(shard_idx)
+        points = await asyncio.get_event_loop().run_in_executor(
+            None,
+            lambda: client.retrieve(
+                collection_name=collection_name,
+                ids=point_ids,
+                with_payload=True,
+                with_vectors=with_vectors
+            )
+        )
+        return {str(point.id): point for point in points}
+    
+    async def _move(self, source: int, target: int, points: List[models.Record]):
+        service = self.sharding_service
+        pending = {str(point.id): point for point in points}
+        moved = 0
+        
+        # Workers write both owners while the migration runs, so the source
+        # copy is never older than the target's. A target copy with the same
+        # stamp came from a dual write and needs no copy. A write or delete
+        # racing the copy shows up when the source is read back, and is
+        # replayed before the source copy is dropped.
+        while pending:
+            existing = await self._retrieve(target, list(pending), with_vectors=False)
+            to_copy = [
+                point for point_id, point in pending.items()
+                if point_id not in existing
+                or existing[point_id].payload.get('written_at', 0.0) < point.payload.get('written_at', 0.0)
+            ]
+            
+            if to_copy:
+                await service._upsert_points_on_shard(
+                    target,
+                    [
+                        models.PointStruct(
+                            id=point.id,
+                            vector=point.vector,
+                            payload={**point.payload, 'shard': target}
+                        )
+                        for point in to_copy
+                    ],
+                    wait=True
+                )
+                moved += len(to_copy)
+            
+            current = await self._retrieve(source, list(pending), with_vectors=True)
+            deleted = [point_id for point_id in pending if point_id not in current]
+            if deleted:
+                await service._delete_points_on_shard(target, deleted)
+            
+            changed = {
+                point_id: point for point_id, point in current.items()
+                if point.payload.get('written_at', 0.0) != pending[point_id].payload.get('written_at', 0.0)
+            }
+            settled = [point_id for point_id in current if point_id not in changed]
+            if settled:
+                await service._delete_points_on_shard(source, settled)
+            pending = changed
+        
+        self.stats['moved'] += moved
+        self.stats['skipped'] += max(len(points) - moved, 0)
+        self.stats['by_target'][target] = self.stats['by_target'].get(target, 0) + moved
+    
+    async def _throttle(self):
+        if self.max_points_per_sec <= 0:
+            return
+        expected = self.stats['scanned'] / self.max_points_per_sec
+        elapsed = time.time() - self._started_at
+        if expected > elapsed:
+            await asyncio.sleep(expected - elapsed)
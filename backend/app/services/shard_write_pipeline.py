@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from qdrant_client.http import models
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+
+from app.core.metrics import shard_write_queue_depth, shard_replication_lag_seconds, shard_write_retries_total
+from app.services.replica_group import CircuitOpenError, ReplicaWriteError
+
+logger = logging.getLogger(__name__)
+
+WriteFn = Callable[[List[models.PointStruct]], Awaitable[None]]
+
+_TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+
+
+class ShardQueueFullError(Exception):
+    pass
+
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, ReplicaWriteError):
+        return all(is_transient(e) for e in error.errors)
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code in _TRANSIENT_STATUS
+    return isinstance(error, (
+        ConnectionError, TimeoutError, asyncio.TimeoutError, ResponseHandlingException, CircuitOpenError
+    ))
+
+
+@dataclass
+class QueuedWrite:
+    points: List[models.PointStruct]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.time)
+
+
+class ShardWritePipeline:
+    # Bounded, ordered upsert queue for one shard. Points count against the
+    # bound from submit until the shard acknowledges them, so a slow shard
+    # pushes back on ingest instead of accumulating work.
+    def __init__(self, shard_idx: int, write_fn: WriteFn, max_queue_points: int = 10000,
+                 max_batch: int = 512, max_in_flight: int = 4, max_retries: int = 5,
+                 base_backoff: float = 0.05, linger: float = 0.005, enqueue_timeout: float = 5.0):
+        self.shard_idx = shard_idx
+        self.write_fn = write_fn
+        self.max_queue_points = max_queue_points
+        self.max_batch = max_batch
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.linger = linger
+        self.enqueue_timeout = enqueue_timeout
+        
+        self.queue: Deque[QueuedWrite] = deque()
+        self.queued_points = 0
+        self.in_flight: Dict[asyncio.Task, float] = {}
+        self.pending_by_point: Dict[str, asyncio.Future] = {}
+        self._sending: Dict[str, asyncio.Task] = {}
+        self._space = asyncio.Condition()
+        self._has_items = asyncio.Event()
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._worker: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {
+            'batches': 0,
+            'points': 0,
+            'coalesced': 0,
+            'retries': 0,
+            'failed': 0
+        }
+    
+    def _ensure_started(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+    
+    async def submit(self, points: List[models.PointStruct]) -> asyncio.Future:
+        self._ensure_started()
+        
+        async with self._space:
+            try:
+                await asyncio.wait_for(
+                    self._space.wait_for(
+                        lambda: self.queued_points == 0
+                        or self.queued_points + len(points) <= self.max_queue_points
+                    ),
+                    timeout=self.enqueue_timeout
+                )
+            except asyncio.TimeoutError:
+                raise ShardQueueFullError(
+                    f"Shard {self.shard_idx} write queue full ({self.queued_points} points unacknowledged)"
+                )
+            self.queued_points += len(points)
+        
+        write = QueuedWrite(points, asyncio.get_event_loop().create_future())
+        self.queue.append(write)
+        for point in points:
+            self.pending_by_point[str(point.id)] = write.future
+        self._has_items.set()
+        self._update_metrics()
+        return write.future
+    
+    async def wait_for_points(self, point_ids: List[str]):
+        futures = {self.pending_by_point[str(pid)] for pid in point_ids if str(pid) in self.pending_by_point}
+        if futures:
+            await asyncio.gather(*futures, return_exceptions=True)
+    
+    async def _run(self):
+        while True:
+            await self._has_items.wait()
+            if self.linger:
+                # Give concurrent submitters a moment to land in the same batch.
+                await asyncio.sleep(self.linger)
+            
+            await self._slots.acquire()
+            batch = self._take_batch()
+            if not batch:
+                self._slots.release()
+                self._has_items.clear()
+                continue
+            
+            # A point already in an in-flight batch must land before its
+            # newer version, so this batch waits for those sends first.
+            point_ids = {str(point.id) for write in batch for point in write.points}
+            earlier = {self._sending[pid] for pid in point_ids if pid in self._sending}
+            task = asyncio.create_task(self._send(batch, earlier))
+            for pid in point_ids:
+                self._sending[pid] = task
+            self.in_flight[task] = batch[0].enqueued_at
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    def _take_batch(self) -> List[QueuedWrite]:
+        batch = []
+        size = 0
+        while self.queue and (not batch or size + len(self.queue[0].points) <= self.max_batch):
+            write = self.queue.popleft()
+            batch.append(write)
+            size += len(write.points)
+        if not self.queue:
+            self._has_items.clear()
+        return batch
+    
+    async def _send(self, batch: List[QueuedWrite], earlier: Set[asyncio.Task]):
+        if earlier:
+            await asyncio.wait(earlier)
+        
+        latest: Dict[str, models.PointStruct] = {}
+        for write in batch:
+            for point in write.points:
+                latest[str(point.id)] = point
+        points = list(latest.values())
+        submitted = sum(len(write.points) for write in batch)
+        
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    await self.write_fn(points)
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries or not is_transient(e):
+                        raise
+                    self.stats['retries'] += 1
+                    shard_write_retries_total.labels(shard=str(self.shard_idx)).inc()
+                    delay = random.uniform(0, self.base_backoff * 2 ** attempt)
+                    logger.warning(
+                        f"Shard {self.shard_idx} write failed ({str(e)}), retry {attempt + 1} in {delay:.2f}s"
+                    )
+                    await asyncio.sleep(delay)
+            
+            self.stats['batches'] += 1
+            self.stats['points'] += len(points)
+            self.stats['coalesced'] += submitted - len(points)
+            for write in batch:
+                if not write.future.done():
+                    write.future.set_result(None)
+        
+        except Exception as e:
+            self.stats['failed'] += submitted
+            logger.error(f"Shard {self.shard_idx} write of {len(points)} points failed: {str(e)}")
+            for write in batch:
+                if not write.future.done():
+                    write.future.set_exception(e)
+        
+        finally:
+            task = asyncio.current_task()
+            for write in batch:
+                for point in write.points:
+                    if self.pending_by_point.get(str(point.id)) is write.future:
+                        del self.pending_by_point[str(point.id)]
+                    if self._sending.get(str(point.id)) is task:
+                        del self._sending[str(point.id)]
+            self.in_flight.pop(task, None)
+            self._slots.release()
+            
+            async with self._space:
+                self.queued_points -= submitted
+                self._space.notify_all()
+            self._update_metrics()
+    
+    def replication_lag(self) -> float:
+        oldest = [self.queue[0].enqueued_at] if self.queue else []
+        oldest.extend(self.in_flight.values())
+        return time.time() - min(oldest) if oldest else 0.0
+    
+    def _update_metrics(self):
+        shard = str(self.shard_idx)
+        shard_write_queue_depth.labels(shard=shard).set(self.queued_points)
+        shard_replication_lag_seconds.labels(shard=shard).set(self.replication_lag())
+    
+    async def stop(self, timeout: float = 30.0):
+        deadline = time.time() + timeout
+        while (self.queue or self._tasks) and time.time() < deadline:
+            await asyncio.sleep(0.05)
+        
+        if self.queue or self._tasks:
+            logger.warning(f"Shard {self.shard_idx} write pipeline stopped with {self.queued_points} points unacknowledged")
+        
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+    
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            **self.stats,
+            'queued_points': self.queued_points,
+            'in_flight': len(self.in_flight),
+            'replication_lag_seconds': self.replication_lag()
+        }
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+from app.config import get_settings
+from app.models.schemas import SimilarImage
+from app.services.delta_index import DeltaIndex
+from app.services.ring_coordinator import get_ring_coordinator
+from app.services.search_budget import SearchEffort
+from app.services.sharding_service import ShardingService
+from app.services.vector_service import search_params_for
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class PartialResults(list):
+    # Search results missing the shards that timed out or failed; `partial`
+    # holds the shard counts reported back to the caller.
+    def __init__(self, results: List[SimilarImage], partial: Dict[str, int]):
+        super().__init__(results)
+        self.partial = partial
+
+
+class ShardedVectorService:
+    # Same surface as VectorService so the API, batch endpoints and the write
+    # buffer can run on the sharded backend unchanged.
+    def __init__(self, sharding_service: ShardingService):
+        self.sharding_service = sharding_service
+        self.collection_name = settings.qdrant_collection_name
+        self.vector_size = 512
+        self._connected = False
+        logger.info(
+            f"Sharded vector service initialized ({sharding_service.shard_count} shards, "
+            f"{sharding_service.sharding_mode} placement)"
+        )
+    
+    @property
+    def delta_index(self) -> Optional[DeltaIndex]:
+        return self.sharding_service.delta_index
+    
+    async def connect(self):
+        if self._connected:
+            return
+        
+        try:
+            await self.sharding_service.create_collections(self.collection_name, self.vector_size)
+            if self.sharding_service.sharding_mode == "hash":
+                await self.sharding_service.watch_ring(get_ring_coordinator())
+            self._connected = True
+            logger.info(f"Connected to {self.sharding_service.shard_count} Qdrant shards")
+        except Exception as e:
+            logger.error(f"Failed to connect to Qdrant shards: {str(e)}")
+            raise
+    
+    async def insert_vectors(
+        self,
+        vectors: List[np.ndarray],
+        image_ids: List[str],
+        metadata: List[Dict[str, Any]] = None,
+        point_ids: Optional[List[str]] = None
+    ) -> List[str]:
+        # Shard point ids are derived from image_id, so pre-assigned ids are
+        # not needed to keep writes idempotent.
+        if metadata is None:
+            metadata = [{}] * len(vectors)
+        
+        try:
+            await self.sharding_service.insert_vectors(vectors, image_ids, metadata)
+            return [self.sharding_service._point_id(image_id) for image_id in image_ids]
+        except Exception as e:
+            logger.error(f"Failed to insert vectors: {str(e)}")
+            raise
+    
+    async def search_similar(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 10,
+        threshold: float = 0.0,
+        include_metadata: bool = True,
+        effort: Optional[SearchEffort] = None,
+        timeout: Optional[int] = None
+    ) -> List[SimilarImage]:
+        response = await self.sharding_service.search_similar(
+            query_vector,
+            top_k=top_k,
+            threshold=threshold,
+            timeout=timeout,
+            search_params=search_params_for(effort)
+        )
+        
+        if not response.shards_answered and not response.results:
+            raise RuntimeError(
+                f"No shard answered (timed out {response.shards_timed_out}, "
+                f"failed {list(response.shards_failed)})"
+            )
+        
+        results = [
+            SimilarImage(
+                image_id=result['image_id'],
+                score=result['score'],
+                metadata=result['metadata'] if include_metadata else None
+            )
+            for result in response.results
+        ]
+        if not response.partial:
+            return results
+        return PartialResults(results, {
+            'answered': len(response.shards_answered),
+            'timed_out': len(response.shards_timed_out),
+            'failed': len(response.shards_failed)
+        })
+    
+    async def search_batch(
+        self,
+        queries: List[Tuple[np.ndarray, int, float]],
+        include_metadata: bool = True,
+        effort: Optional[SearchEffort] = None,
+        timeout: Optional[int] = None
+    ) -> List[List[SimilarImage]]:
+        # Every query already fans out to all shards; run them side by side.
+        return list(await asyncio.gather(*[
+            self.search_similar(query_vector, top_k, threshold, include_metadata, effort, timeout)
+            for query_vector, top_k, threshold in queries
+        ]))
+    
+    async def delete_by_image_id(self, image_id: str) -> bool:
+        try:
+            deleted = await self.sharding_service.delete_vectors([image_id])
+            if deleted:
+                logger.info(f"Deleted image_id {image_id} from its owning shard")
+            return bool(deleted)
+        except Exception as e:
+            logger.error(f"Failed to delete image {image_id}: {str(e)}")
+            raise
+    
+    async def get_image(self, image_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            found = await self.sharding_service.retrieve_vectors([image_id])
+        except Exception as e:
+            logger.error(f"Failed to get image {image_id}: {str(e)}")
+            raise
+        
+        if image_id not in found:
+            return None
+        return {
+            "image_id": image_id,
+            "vector": found[image_id]['vector'],
+            "metadata": found[image_id]['metadata']
+        }
+    
+    async def close(self):
+        await self.sharding_service.close()
+        if self.delta_index is not None:
+            await self.delta_index.stop()
+    
+    async def get_collection_info(self) -> Dict[str, Any]:
+        try:
+            stats = await self.sharding_service.get_stats(max_age=settings.shard_stats_cache_ttl)
+        except Exception as e:
+            logger.error(f"Failed to get collection info: {str(e)}")
+            raise
+        
+        return {
+            "name": self.collection_name,
+            "vector_size": self.vector_size,
+            "distance": "Cosine",
+            "points_count": stats['points_count'],
+            "segments_count": stats['segments_count'],
+            "sharding": stats
+        }
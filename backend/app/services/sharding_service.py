@@ -1,4 +1,8 @@
+import functools
 import hashlib
+import time
+import uuid
+from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 from qdrant_client import QdrantClient
@@ -7,39 +11,252 @@ import asyncio
 from functools import lru_cache
 import logging
 
+from app.services.delta_index import DeltaIndex, confirm_indexed_points
+from app.services.hash_ring import ConsistentHashRing, RingLayout, ring_state
+from app.services.shard_merge import shard_candidate_limit, merge_shard_results, shards_to_refetch
+from app.services.hedged_requests import LatencyWindow, hedged_call
+from app.services.replica_group import ReplicaGroup
+from app.services.ring_coordinator import RingCoordinator
+from app.services.semantic_router import SemanticShardRouter
+from app.services.shard_placement import ShardPlacement
+from app.services.shard_write_pipeline import ShardWritePipeline
+from app.core.metrics import shard_merge_refetches_total, shard_requests_total
+
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class ShardedSearchResult:
+    results: List[Dict[str, Any]]
+    shards_answered: List[int] = field(default_factory=list)
+    shards_failed: Dict[int, str] = field(default_factory=dict)
+    shards_timed_out: List[int] = field(default_factory=list)
+    shards_hedged: List[int] = field(default_factory=list)
+    
+    @property
+    def partial(self) -> bool:
+        return bool(self.shards_failed or self.shards_timed_out)
+
+
 class ShardingService:
-    def __init__(self, shard_configs: List[Dict[str, Any]]):
+    def __init__(self, shard_configs: List[Dict[str, Any]], delta_index: Optional[DeltaIndex] = None,
+                 delta_reconcile_interval: float = 1.0, ring_layout: Optional[RingLayout] = None,
+                 virtual_nodes: int = 128, limit_overflow_probability: float = 0.01,
+                 request_timeout: float = 2.0, hedge_percentile: float = 95.0,
+                 hedge_min_delay: float = 0.005, load_balancer: str = "round_robin",
+                 circuit_breaker_threshold: int = 50, circuit_breaker_timeout: float = 60.0,
+                 consistency_level: str = "eventual", router: Optional[SemanticShardRouter] = None,
+                 n_probe_shards: int = 2, write_pipeline_config: Optional[Dict[str, Any]] = None,
+                 ring_ack_timeout: float = 120.0, placement: Optional[ShardPlacement] = None):
         self.shards: List[QdrantClient] = []
+        self.groups: List[ReplicaGroup] = []
         self.shard_count = len(shard_configs)
         self.shard_configs = shard_configs
+        self.delta_index = delta_index
+        self.delta_reconcile_interval = delta_reconcile_interval
+        self.ring_layout = ring_layout
+        self.ring_ack_timeout = ring_ack_timeout
+        self.ring_coordinator: Optional[RingCoordinator] = None
+        self._ring_watch_task: Optional[asyncio.Task] = None
+        self.virtual_nodes = virtual_nodes
+        self.limit_overflow_probability = limit_overflow_probability
+        self.request_timeout = request_timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.load_balancer = load_balancer
+        self.circuit_breaker_threshold = circuit_breaker_threshold
+        self.circuit_breaker_timeout = circuit_breaker_timeout
+        self.consistency_level = consistency_level
+        self.router = router
+        self.placement = placement
+        self.n_probe_shards = n_probe_shards
+        self.sharding_mode = "semantic" if router is not None else "hash"
+        self._stats_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+        self.shard_latency = [LatencyWindow() for _ in shard_configs]
         self._initialize_shards()
+        self.ring, self.previous_ring = self._load_ring()
+        # With the delta index serving fresh writes, a shard only has to
+        # accept an upsert, not finish applying it.
+        self.pipelines = [
+            ShardWritePipeline(
+                i,
+                functools.partial(self._upsert_points_on_shard, i, wait=delta_index is None),
+                **(write_pipeline_config or {})
+            )
+            for i in range(self.shard_count)
+        ]
+    
+    def _create_client(self, config: Dict[str, Any]) -> QdrantClient:
+        return QdrantClient(
+            host=config['host'],
+            port=config['port'],
+            timeout=30,
+            grpc_port=config.get('grpc_port', 6334),
+            prefer_grpc=True
+        )
     
     def _initialize_shards(self):
-        for config in self.shard_configs:
-            client = QdrantClient(
-                host=config['host'],
-                port=config['port'],
-                timeout=30,
-                grpc_port=config.get('grpc_port', 6334),
-                prefer_grpc=True
+        for i, config in enumerate(self.shard_configs):
+            members = [config] + config.get('replicas', [])
+            group = ReplicaGroup(
+                [self._create_client(member) for member in members],
+                [f"shard{i}-{member['host']}:{member['port']}" for member in members],
+                algorithm=self.load_balancer,
+                failure_threshold=self.circuit_breaker_threshold,
+                reset_timeout=self.circuit_breaker_timeout
+            )
+            self.groups.append(group)
+            self.shards.append(group.primary)
+            logger.info(
+                f"Initialized shard: {config['host']}:{config['port']} "
+                f"({len(members) - 1} replicas, {self.load_balancer})"
+            )
+    
+    def _load_ring(self) -> Tuple[ConsistentHashRing, Optional[ConsistentHashRing]]:
+        state = self.ring_layout.load() if self.ring_layout else None
+        
+        if state is None:
+            ring = ConsistentHashRing(range(self.shard_count), self.virtual_nodes)
+            if self.ring_layout:
+                self.ring_layout.save(ring)
+            return ring, None
+        
+        ring, previous = state['current'], state['previous']
+        self._check_ring(ring, previous)
+        
+        if previous is not None:
+            logger.warning(
+                f"Shard ring migration v{previous.version} -> v{ring.version} not finished; "
+                f"serving dual reads until the rebalance completes"
+            )
+        elif ring.nodes != list(range(self.shard_count)):
+            logger.warning(
+                f"Shard ring v{ring.version} uses shards {ring.nodes} but {self.shard_count} are configured; "
+                f"run scripts/rebalance_shards.py to move data onto the new layout"
             )
-            self.shards.append(client)
-            logger.info(f"Initialized shard: {config['host']}:{config['port']}")
+        
+        return ring, previous
+    
+    def _check_ring(self, ring: ConsistentHashRing, previous: Optional[ConsistentHashRing]):
+        referenced = set(ring.nodes) | set(previous.nodes if previous else [])
+        unknown = sorted(node for node in referenced if node >= self.shard_count)
+        if unknown:
+            raise ValueError(f"Shard ring v{ring.version} references unconfigured shards {unknown}")
+    
+    async def watch_ring(self, coordinator: RingCoordinator):
+        # Pick up the shared layout before serving, then keep following it
+        # so a rebalance started elsewhere reaches this worker.
+        self.ring_coordinator = coordinator
+        await self.refresh_ring()
+        await coordinator.ack(ring_state(self.ring, self.previous_ring))
+        if self._ring_watch_task is None:
+            self._ring_watch_task = asyncio.create_task(self._ring_watch_loop())
+    
+    async def _ring_watch_loop(self):
+        while True:
+            await asyncio.sleep(self.ring_coordinator.poll_interval)
+            try:
+                await self.refresh_ring()
+                await self.ring_coordinator.ack(ring_state(self.ring, self.previous_ring))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to refresh shard ring: {str(e)}")
+    
+    async def refresh_ring(self):
+        state = await self.ring_coordinator.fetch()
+        if state is None:
+            # First worker up seeds the shared layout from its local file.
+            if not await self.ring_coordinator.publish(self.ring, self.previous_ring, only_if_missing=True):
+                state = await self.ring_coordinator.fetch()
+            if state is None:
+                return
+        
+        ring, previous = state['current'], state['previous']
+        if ring_state(ring, previous) == ring_state(self.ring, self.previous_ring):
+            return
+        
+        self._check_ring(ring, previous)
+        logger.info(
+            f"Switching shard ring {ring_state(self.ring, self.previous_ring)} -> {ring_state(ring, previous)}"
+        )
+        self.ring, self.previous_ring = ring, previous
+        self._stats_cache = None
+        if self.ring_layout:
+            self.ring_layout.save(ring, previous)
+    
+    async def wait_for_ring_acks(self):
+        if self.ring_coordinator is not None:
+            await self.ring_coordinator.wait_for_acks(
+                ring_state(self.ring, self.previous_ring), self.ring_ack_timeout
+            )
+    
+    async def _publish_ring(self):
+        if self.ring_layout:
+            self.ring_layout.save(self.ring, self.previous_ring)
+        if self.ring_coordinator is not None:
+            await self.ring_coordinator.publish(self.ring, self.previous_ring)
+        await self.wait_for_ring_acks()
     
     def _get_shard_index(self, image_id: str) -> int:
-        hash_value = int(hashlib.md5(image_id.encode()).hexdigest(), 16)
-        return hash_value % self.shard_count
+        return self.ring.get_node(image_id)
+    
+    def _owner_shards(self, image_id: str) -> List[int]:
+        if self.router is not None:
+            # Placement follows the vector, so an id alone can be anywhere.
+            return list(range(self.shard_count))
+        owners = [self.ring.get_node(image_id)]
+        if self.previous_ring is not None:
+            previous = self.previous_ring.get_node(image_id)
+            if previous != owners[0]:
+                owners.append(previous)
+        return owners
+    
+    async def _semantic_owners(self, image_ids: List[str]) -> Dict[str, List[int]]:
+        # The recorded shard when there is one; every shard for images
+        # indexed before placements were recorded, or when the record cannot
+        # be read.
+        known = await self.placement.lookup(image_ids) if self.placement is not None else None
+        return {
+            image_id: [known[image_id]] if known and image_id in known else list(range(self.shard_count))
+            for image_id in image_ids
+        }
+    
+    def _ring_shards(self) -> List[int]:
+        nodes = set(self.ring.nodes)
+        if self.previous_ring is not None:
+            nodes |= set(self.previous_ring.nodes)
+        return sorted(nodes)
+    
+    async def begin_migration(self, target_ring: ConsistentHashRing):
+        # Returns once every worker dual-writes to both owners; only then can
+        # the old owners be drained without missing a write.
+        if self.previous_ring is not None:
+            raise RuntimeError(
+                f"Shard ring migration to v{self.ring.version} is already in progress"
+            )
+        self.previous_ring, self.ring = self.ring, target_ring
+        await self._publish_ring()
+    
+    async def finish_migration(self):
+        # Returns once no worker reads from or writes to the previous owners.
+        self.previous_ring = None
+        await self._publish_ring()
+    
+    def _collection_name(self, shard_idx: int) -> str:
+        return f"{self.shard_configs[0]['collection']}_shard_{shard_idx}"
+    
+    def _point_id(self, image_id: str) -> str:
+        return str(uuid.UUID(hashlib.md5(image_id.encode()).hexdigest()))
     
     async def create_collections(self, collection_name: str, vector_size: int):
         tasks = []
-        for i, shard in enumerate(self.shards):
-            task = asyncio.create_task(self._create_collection_on_shard(
-                shard, f"{collection_name}_shard_{i}", vector_size
-            ))
-            tasks.append(task)
+        for i, group in enumerate(self.groups):
+            for replica in group.replicas:
+                task = asyncio.create_task(self._create_collection_on_shard(
+                    replica.client, f"{collection_name}_shard_{i}", vector_size
+                ))
+                tasks.append(task)
         await asyncio.gather(*tasks)
     
     async def _create_collection_on_shard(self, shard: QdrantClient, collection_name: str, vector_size: int):
@@ -84,144 +301,505 @@ class ShardingService:
     
     async def insert_vectors(self, vectors: List[np.ndarray], image_ids: List[str], metadata: List[Dict[str, Any]]):
         shard_batches = {}
+        mirror_batches = {}
+        placement = {}
+        # Both copies of a dual write carry the same stamp, which is how the
+        # rebalancer tells a copy it still has to move from one already there.
+        written_at = time.time()
+        
+        if self.router is not None:
+            assigned = self.router.assign(np.stack(vectors))
+            # Read before the write, so the lookup sees where the image was.
+            previous = await self.placement.lookup(image_ids) if self.placement is not None else None
         
         for i, (vector, image_id, meta) in enumerate(zip(vectors, image_ids, metadata)):
-            shard_idx = self._get_shard_index(image_id)
-            if shard_idx not in shard_batches:
-                shard_batches[shard_idx] = {
-                    'vectors': [],
-                    'image_ids': [],
-                    'metadata': []
-                }
-            shard_batches[shard_idx]['vectors'].append(vector)
-            shard_batches[shard_idx]['image_ids'].append(image_id)
-            shard_batches[shard_idx]['metadata'].append(meta)
+            if self.router is not None:
+                owners = [int(assigned[i])]
+            else:
+                owners = self._owner_shards(image_id)
+            placement[image_id] = owners[0]
+            # While a rebalance runs, the previous owner keeps a current copy
+            # until the rebalancer drops it.
+            for rank, shard_idx in enumerate(owners):
+                batches = shard_batches if rank == 0 else mirror_batches
+                if shard_idx not in batches:
+                    batches[shard_idx] = {
+                        'vectors': [],
+                        'image_ids': [],
+                        'metadata': []
+                    }
+                batches[shard_idx]['vectors'].append(vector)
+                batches[shard_idx]['image_ids'].append(image_id)
+                batches[shard_idx]['metadata'].append(meta)
         
         tasks = []
-        for shard_idx, batch in shard_batches.items():
-            task = asyncio.create_task(self._insert_batch_to_shard(
-                shard_idx, batch['vectors'], batch['image_ids'], batch['metadata']
-            ))
-            tasks.append(task)
+        for batches, track_delta in [(shard_batches, True), (mirror_batches, False)]:
+            for shard_idx, batch in batches.items():
+                task = asyncio.create_task(self._insert_batch_to_shard(
+                    shard_idx, batch['vectors'], batch['image_ids'], batch['metadata'],
+                    written_at=written_at, track_delta=track_delta
+                ))
+                tasks.append(task)
         
         await asyncio.gather(*tasks)
+        
+        if self.router is not None:
+            # Drop the copy on the shard the image was recorded on when a
+            # re-indexed image's vector moved to a different centroid. Without
+            # a readable record, every other shard is cleaned as before.
+            stale = {}
+            for image_id in image_ids:
+                if previous is None:
+                    old_shards = self._owner_shards(image_id)
+                else:
+                    old_shards = [previous[image_id]] if image_id in previous else []
+                for shard_idx in old_shards:
+                    if shard_idx != placement[image_id]:
+                        stale.setdefault(shard_idx, []).append(self._point_id(image_id))
+            await asyncio.gather(*[
+                self._delete_points_on_shard(shard_idx, point_ids)
+                for shard_idx, point_ids in stale.items()
+            ])
+            if self.placement is not None:
+                await self.placement.record(placement)
+    
+    async def _delete_points_on_shard(self, shard_idx: int, point_ids: List[str]):
+        # A queued upsert landing after the delete would resurrect the point.
+        await self.pipelines[shard_idx].wait_for_points(point_ids)
+        collection_name = self._collection_name(shard_idx)
+        await self.groups[shard_idx].write(
+            lambda client: client.delete(
+                collection_name=collection_name,
+                points_selector=models.PointIdsList(points=point_ids),
+                wait=True
+            ),
+            self.consistency_level,
+            keys=point_ids
+        )
+    
+    async def _upsert_points_on_shard(self, shard_idx: int, points: List[models.PointStruct], wait: bool):
+        collection_name = self._collection_name(shard_idx)
+        await self.groups[shard_idx].write(
+            lambda client: client.upsert(
+                collection_name=collection_name,
+                points=points,
+                wait=wait
+            ),
+            self.consistency_level,
+            keys=[point.id for point in points]
+        )
+    
+    async def delete_vectors(self, image_ids: List[str]) -> List[str]:
+        found = await self.retrieve_vectors(image_ids, with_vectors=False)
+        existing = set(found)
+        
+        if self.delta_index is not None:
+            for image_id in image_ids:
+                if self.delta_index.point_ids_for_image(image_id):
+                    existing.add(image_id)
+                self.delta_index.remove_image(image_id)
+        
+        # Only the shards that can own each id are touched.
+        if self.router is not None:
+            owners = await self._semantic_owners(list(existing))
+            for image_id, info in found.items():
+                if info['shard'] is not None and info['shard'] not in owners[image_id]:
+                    owners[image_id].append(info['shard'])
+        else:
+            owners = {image_id: self._owner_shards(image_id) for image_id in existing}
+        
+        by_shard = {}
+        for image_id, shards in owners.items():
+            for shard_idx in shards:
+                by_shard.setdefault(shard_idx, []).append(self._point_id(image_id))
+        
+        await asyncio.gather(*[
+            self._delete_points_on_shard(shard_idx, point_ids)
+            for shard_idx, point_ids in by_shard.items()
+        ])
+        if self.placement is not None:
+            await self.placement.forget(list(existing))
+        
+        return [image_id for image_id in image_ids if image_id in existing]
+    
+    async def retrieve_vectors(self, image_ids: List[str], with_vectors: bool = True) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        remaining = list(image_ids)
+        
+        # Current owner first, then the previous owner for ids it did not have
+        # yet (dual-read window while a rebalance is running). Semantic mode
+        # asks the recorded shard (or every shard) in a single round.
+        semantic_owners = await self._semantic_owners(remaining) if self.router is not None else None
+        for attempt in range(2):
+            by_shard = {}
+            for image_id in remaining:
+                if semantic_owners is not None:
+                    targets = semantic_owners[image_id] if attempt == 0 else []
+                else:
+                    targets = self._owner_shards(image_id)[attempt:attempt + 1]
+                for shard_idx in targets:
+                    by_shard.setdefault(shard_idx, []).append(image_id)
+            
+            if not by_shard:
+                break
+            
+            shard_results = await asyncio.gather(*[
+                self._retrieve_from_shard(shard_idx, ids, with_vectors)
+                for shard_idx, ids in by_shard.items()
+            ])
+            for results in shard_results:
+                found.update(results)
+            remaining = [image_id for image_id in remaining if image_id not in found]
+        
+        return found
+    
+    async def _retrieve_from_shard(self, shard_idx: int, image_ids: List[str],
+                                   with_vectors: bool = True) -> Dict[str, Dict[str, Any]]:
+        collection_name = self._collection_name(shard_idx)
+        points = await self.groups[shard_idx].read(
+            lambda client: client.retrieve(
+                collection_name=collection_name,
+                ids=[self._point_id(image_id) for image_id in image_ids],
+                with_payload=True,
+                with_vectors=with_vectors
+            )
+        )
+        return {
+            point.payload.get('image_id'): {
+                'vector': np.array(point.vector, dtype=np.float32) if with_vectors else None,
+                'metadata': point.payload.get('metadata', {}),
+                'shard': shard_idx
+            }
+            for point in points
+        }
     
     async def _insert_batch_to_shard(self, shard_idx: int, vectors: List[np.ndarray], 
-                                     image_ids: List[str], metadata: List[Dict[str, Any]]):
+                                     image_ids: List[str], metadata: List[Dict[str, Any]],
+                                     written_at: Optional[float] = None, track_delta: bool = True):
+        written_at = written_at or time.time()
         points = []
         for vector, image_id, meta in zip(vectors, image_ids, metadata):
             points.append(
                 models.PointStruct(
-                    id=hashlib.md5(image_id.encode()).hexdigest()[:16],
+                    id=self._point_id(image_id),
                     vector=vector.tolist(),
                     payload={
                         "image_id": image_id,
                         "metadata": meta,
-                        "shard": shard_idx
+                        "shard": shard_idx,
+                        "written_at": written_at
                     }
                 )
             )
         
-        collection_name = f"{self.shard_configs[0]['collection']}_shard_{shard_idx}"
-        await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: self.shards[shard_idx].upsert(
-                collection_name=collection_name,
-                points=points,
-                wait=False
+        # Searchable through the delta index from submission on, so reads
+        # do not wait for the write to reach the shard.
+        point_ids = [point.id for point in points]
+        track_delta = track_delta and self.delta_index is not None
+        if track_delta:
+            self.delta_index.add(vectors, image_ids, point_ids, metadata, location=shard_idx)
+            self.delta_index.ensure_reconciler(self._confirm_delta, self.delta_reconcile_interval)
+        
+        # Resolves once the shard has accepted the write; a full queue
+        # blocks here, which is what slows ingest down to the shard's pace.
+        try:
+            ack = await self.pipelines[shard_idx].submit(points)
+            await ack
+        except Exception:
+            if track_delta:
+                self.delta_index.remove_points(point_ids)
+            raise
+    
+    async def _confirm_delta(self, shard_idx: int, point_ids: List[str], vectors: np.ndarray) -> List[str]:
+        # Reads may land on any replica, so a point leaves the delta index
+        # only once every replica that can serve reads has indexed it.
+        if shard_idx is None:
+            # Registered by the write buffer; replaced once the write lands.
+            return []
+        group = self.groups[shard_idx]
+        collection_name = self._collection_name(shard_idx)
+        replicas = [replica for replica in group.replicas if replica.breaker.available()]
+        confirmed = await asyncio.gather(*[
+            group.call(
+                replica,
+                lambda client: confirm_indexed_points(client, collection_name, point_ids, vectors)
             )
-        )
+            for replica in replicas
+        ])
+        return list(set.intersection(*map(set, confirmed))) if confirmed else []
     
     async def search_similar(self, query_vector: np.ndarray, top_k: int = 10, 
-                           threshold: float = 0.0) -> List[Dict[str, Any]]:
-        tasks = []
-        for i, shard in enumerate(self.shards):
-            collection_name = f"{self.shard_configs[0]['collection']}_shard_{i}"
-            task = asyncio.create_task(self._search_shard(
-                shard, collection_name, query_vector, top_k * 2, threshold
-            ))
-            tasks.append(task)
+                           threshold: float = 0.0, timeout: Optional[float] = None,
+                           search_params: Optional[models.SearchParams] = None) -> ShardedSearchResult:
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + min(timeout or self.request_timeout, self.request_timeout)
+        if self.router is not None:
+            # Neighbours cluster on the probed shards, so the uniform-spread
+            # assumption behind the adaptive limit does not hold.
+            shard_ids = [int(i) for i in self.router.probe(query_vector, self.n_probe_shards)]
+            limit = top_k
+        else:
+            shard_ids = self._ring_shards()
+            limit = shard_candidate_limit(top_k, len(self.ring.nodes), self.limit_overflow_probability)
         
-        shard_results = await asyncio.gather(*tasks)
+        outcomes = await asyncio.gather(*[
+            self._query_shard(i, query_vector, limit, threshold, deadline, search_params)
+            for i in shard_ids
+        ])
         
-        all_results = []
-        for results in shard_results:
-            all_results.extend(results)
+        response = ShardedSearchResult(results=[])
+        shard_results = []
+        for shard_idx, (outcome, results, hedged) in zip(shard_ids, outcomes):
+            shard_results.append(results)
+            if outcome == 'answered':
+                response.shards_answered.append(shard_idx)
+            elif outcome == 'timed_out':
+                response.shards_timed_out.append(shard_idx)
+            else:
+                response.shards_failed[shard_idx] = outcome
+            if hedged:
+                response.shards_hedged.append(shard_idx)
         
-        all_results.sort(key=lambda x: x['score'], reverse=True)
+        if self.delta_index is not None:
+            shard_results.append([
+                {
+                    'image_id': fresh.image_id,
+                    'score': fresh.score,
+                    'metadata': fresh.metadata,
+                    'shard': None if self.router is not None else self._get_shard_index(fresh.image_id)
+                }
+                for fresh in self.delta_index.search(query_vector, top_k, threshold)
+            ])
         
-        return all_results[:top_k]
+        merged = merge_shard_results(shard_results, top_k)
+        
+        refetch = [
+            pos for pos in shards_to_refetch(shard_results, limit, merged, top_k)
+            if pos < len(shard_ids)
+        ]
+        if refetch and deadline > loop.time():
+            shard_merge_refetches_total.inc(len(refetch))
+            refetched = await asyncio.gather(*[
+                self._query_shard(shard_ids[pos], query_vector, top_k, threshold, deadline, search_params)
+                for pos in refetch
+            ])
+            for pos, (outcome, results, _) in zip(refetch, refetched):
+                # Keep the first answer if the refetch did not make it back.
+                if outcome == 'answered':
+                    shard_results[pos] = results
+            merged = merge_shard_results(shard_results, top_k)
+        
+        response.results = merged
+        if response.partial:
+            logger.warning(
+                f"Partial sharded search: {len(response.shards_answered)}/{len(shard_ids)} shards answered "
+                f"(timed out {response.shards_timed_out}, failed {list(response.shards_failed)})"
+            )
+        return response
     
-    async def _search_shard(self, shard: QdrantClient, collection_name: str, 
-                          query_vector: np.ndarray, limit: int, threshold: float) -> List[Dict[str, Any]]:
+    async def _query_shard(self, shard_idx: int, query_vector: np.ndarray, limit: int,
+                           threshold: float, deadline: float,
+                           search_params: Optional[models.SearchParams] = None
+                           ) -> Tuple[str, List[Dict[str, Any]], bool]:
+        collection_name = self._collection_name(shard_idx)
+        latency = self.shard_latency[shard_idx]
+        hedge_delay = max(self.hedge_min_delay, latency.percentile(self.hedge_percentile))
+        attempts = self.groups[shard_idx].read_attempts(
+            functools.partial(self._search_client, collection_name=collection_name,
+                              query_vector=query_vector, limit=limit, threshold=threshold,
+                              search_params=search_params)
+        )
+        if not attempts:
+            shard_requests_total.labels(outcome='failed').inc()
+            return "all replica circuits open", [], False
+        
+        start_time = time.time()
         try:
-            results = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: shard.search(
-                    collection_name=collection_name,
-                    query_vector=query_vector.tolist(),
-                    limit=limit,
-                    score_threshold=threshold,
-                    with_payload=True
-                )
+            results, attempt = await hedged_call(
+                attempts, hedge_delay, deadline - asyncio.get_event_loop().time()
             )
-            
-            return [
-                {
-                    'image_id': point.payload.get('image_id'),
-                    'score': point.score,
-                    'metadata': point.payload.get('metadata', {}),
-                    'shard': point.payload.get('shard')
-                }
-                for point in results
-            ]
+        except asyncio.TimeoutError:
+            shard_requests_total.labels(outcome='timed_out').inc()
+            logger.warning(f"Search on shard {shard_idx} missed its deadline")
+            return 'timed_out', [], False
         except Exception as e:
+            shard_requests_total.labels(outcome='failed').inc()
             logger.error(f"Search failed on shard {collection_name}: {str(e)}")
-            return []
+            return f"{type(e).__name__}: {str(e)}", [], False
+        
+        latency.record(time.time() - start_time)
+        shard_requests_total.labels(outcome='hedged' if attempt else 'answered').inc()
+        return 'answered', results, attempt > 0
     
-    async def get_stats(self) -> Dict[str, Any]:
+    def _search_client(self, shard: QdrantClient, collection_name: str, 
+                       query_vector: np.ndarray, limit: int, threshold: float,
+                       search_params: Optional[models.SearchParams] = None) -> List[Dict[str, Any]]:
+        results = shard.search(
+            collection_name=collection_name,
+            query_vector=query_vector.tolist(),
+            limit=limit,
+            score_threshold=threshold,
+            search_params=search_params,
+            with_payload=True
+        )
+        
+        return [
+            {
+                'image_id': point.payload.get('image_id'),
+                'score': point.score,
+                'metadata': point.payload.get('metadata', {}),
+                'shard': point.payload.get('shard')
+            }
+            for point in results
+        ]
+    
+    async def get_stats(self, max_age: float = 0.0) -> Dict[str, Any]:
+        if self._stats_cache is not None and time.time() - self._stats_cache[0] < max_age:
+            return self._stats_cache[1]
+        
+        shard_stats = await asyncio.gather(*[
+            self._shard_stats(i) for i in range(self.shard_count)
+        ])
+        
         stats = {
             'total_shards': self.shard_count,
-            'shards': []
+            'mode': self.sharding_mode,
+            'router': self.router.get_info() if self.router is not None else None,
+            'n_probe_shards': self.n_probe_shards if self.router is not None else self.shard_count,
+            'ring': {
+                'version': self.ring.version,
+                'nodes': self.ring.nodes,
+                'virtual_nodes': self.ring.vnodes,
+                'migrating_from': self.previous_ring.version if self.previous_ring else None,
+                'ownership': self.ring.load_distribution()
+            },
+            'points_count': sum(shard.get('points_count', 0) for shard in shard_stats),
+            'segments_count': sum(shard.get('segments_count', 0) for shard in shard_stats),
+            'healthy_shards': sum(shard['status'] == 'healthy' for shard in shard_stats),
+            'shards': shard_stats
         }
         
-        for i, shard in enumerate(self.shards):
-            collection_name = f"{self.shard_configs[0]['collection']}_shard_{i}"
+        self._stats_cache = (time.time(), stats)
+        return stats
+    
+    async def _shard_stats(self, shard_idx: int) -> Dict[str, Any]:
+        collection_name = self._collection_name(shard_idx)
+        try:
+            info = await self.groups[shard_idx].read(
+                lambda client: client.get_collection(collection_name)
+            )
+            return {
+                'shard_id': shard_idx,
+                'host': self.shard_configs[shard_idx]['host'],
+                'points_count': info.points_count,
+                'segments_count': info.segments_count,
+                'vector_size': info.config.params.vectors.size,
+                'status': 'healthy',
+                'replicas': self.groups[shard_idx].get_stats(),
+                'writes': self.pipelines[shard_idx].get_stats()
+            }
+        except Exception as e:
+            return {
+                'shard_id': shard_idx,
+                'host': self.shard_configs[shard_idx]['host'],
+                'status': 'unhealthy',
+                'error': str(e),
+                'replicas': self.groups[shard_idx].get_stats(),
+                'writes': self.pipelines[shard_idx].get_stats()
+            }
+    
+    async def close(self):
+        if self._ring_watch_task is not None:
+            self._ring_watch_task.cancel()
+            self._ring_watch_task = None
             try:
-                info = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: shard.get_collection(collection_name)
-                )
-                stats['shards'].append({
-                    'shard_id': i,
-                    'host': self.shard_configs[i]['host'],
-                    'points_count': info.points_count,
-                    'segments_count': info.segments_count,
-                    'status': 'healthy'
-                })
+                await self.ring_coordinator.withdraw()
             except Exception as e:
-                stats['shards'].append({
-                    'shard_id': i,
-                    'host': self.shard_configs[i]['host'],
-                    'status': 'unhealthy',
-                    'error': str(e)
-                })
-        
-        return stats
+                logger.error(f"Failed to withdraw shard ring ack: {str(e)}")
+        await asyncio.gather(*[pipeline.stop() for pipeline in self.pipelines])
 
 
 @lru_cache()
 def get_sharding_service() -> ShardingService:
+    import redis.asyncio as redis
     from app.config import get_settings
+    from app.config_scale import get_scale_settings
     settings = get_settings()
+    scale_settings = get_scale_settings()
     
+    delta_index = None
+    if settings.delta_index_enabled:
+        delta_index = DeltaIndex(
+            capacity=settings.delta_index_capacity,
+            max_age=settings.delta_index_max_age
+        )
+    
+    router = None
+    placement = None
+    if scale_settings.sharding_mode == "semantic":
+        router = SemanticShardRouter.load(scale_settings.semantic_router_path)
+        if router is None:
+            raise ValueError(
+                f"sharding_mode=semantic but no router at {scale_settings.semantic_router_path}; "
+                f"train one with scripts/train_semantic_router.py"
+            )
+        if router.shard_count != scale_settings.shard_count:
+            raise ValueError(
+                f"Semantic router has {router.shard_count} centroids but shard_count is {scale_settings.shard_count}"
+            )
+        placement = ShardPlacement(redis.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=settings.redis_db,
+            password=settings.redis_password,
+            decode_responses=False
+        ))
+    elif scale_settings.sharding_mode != "hash":
+        raise ValueError(f"Unknown sharding mode: {scale_settings.sharding_mode}")
+    
+    # Replica r of shard i listens on base port + i + r * shard_count.
     shard_configs = []
-    for i in range(settings.shard_count):
+    for i in range(scale_settings.shard_count):
+        replicas = []
+        for r in range(1, scale_settings.shard_replicas):
+            offset = i + r * scale_settings.shard_count
+            replicas.append({
+                'host': f"{settings.qdrant_host}",
+                'port': settings.qdrant_port + offset,
+                'grpc_port': settings.qdrant_grpc_port + offset
+            })
         shard_configs.append({
             'host': f"{settings.qdrant_host}",
             'port': settings.qdrant_port + i,
             'grpc_port': settings.qdrant_grpc_port + i,
-            'collection': settings.qdrant_collection_name
+            'collection': settings.qdrant_collection_name,
+            'replicas': replicas
         })
     
-    return ShardingService(shard_configs)
+    return ShardingService(
+        shard_configs,
+        delta_index,
+        settings.delta_index_reconcile_interval,
+        ring_layout=RingLayout(scale_settings.shard_ring_path),
+        ring_ack_timeout=scale_settings.shard_ring_ack_timeout,
+        placement=placement,
+        virtual_nodes=scale_settings.shard_virtual_nodes,
+        limit_overflow_probability=scale_settings.shard_limit_overflow_probability,
+        request_timeout=scale_settings.shard_request_timeout,
+        hedge_percentile=scale_settings.shard_hedge_percentile,
+        hedge_min_delay=scale_settings.shard_hedge_min_delay,
+        load_balancer=scale_settings.load_balancer_algorithm,
+        circuit_breaker_threshold=scale_settings.circuit_breaker_threshold,
+        circuit_breaker_timeout=scale_settings.circuit_breaker_timeout,
+        consistency_level=scale_settings.consistency_level,
+        router=router,
+        n_probe_shards=scale_settings.n_probe_shards,
+        write_pipeline_config={
+            'max_queue_points': scale_settings.shard_write_queue_size,
+            'max_batch': scale_settings.shard_write_batch_size,
+            'max_in_flight': scale_settings.shard_write_max_in_flight,
+            'max_retries': scale_settings.shard_write_max_retries,
+            'linger': scale_settings.shard_write_linger,
+            'enqueue_timeout': scale_settings.shard_write_enqueue_timeout
+        }
+    )
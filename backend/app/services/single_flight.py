@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import math
+import random
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# SET NX PX, returning -1 when acquired or the holder's remaining ms.
+ACQUIRE_SCRIPT = """
+if redis.call('set', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return -1
+end
+return redis.call('pttl', KEYS[1])
+"""
+
+# Delete only if we still hold it, so an expired lease re-acquired by
+# another worker is never released by the old holder.
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    # Concurrent callers with the same key share one in-flight computation.
+    def __init__(self):
+        self.flights: Dict[str, asyncio.Future] = {}
+    
+    def in_flight(self, key: str) -> bool:
+        return key in self.flights
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self.flights.get(key)
+        if flight is not None:
+            # shield: a cancelled follower must not cancel the leader's work.
+            return await asyncio.shield(flight)
+        
+        flight = asyncio.ensure_future(fn())
+        self.flights[key] = flight
+        flight.add_done_callback(lambda _: self.flights.pop(key, None))
+        return await asyncio.shield(flight)
+
+
+class RedisLease:
+    def __init__(self, lease_ms: int = 5000, prefix: str = "lease"):
+        self.lease_ms = lease_ms
+        self.prefix = prefix
+        self.redis_client = None
+        self._acquire = None
+        self._release = None
+    
+    def bind(self, redis_client):
+        self.redis_client = redis_client
+        if redis_client is not None:
+            self._acquire = redis_client.register_script(ACQUIRE_SCRIPT)
+            self._release = redis_client.register_script(RELEASE_SCRIPT)
+    
+    async def acquire(self, key: str) -> Optional[str]:
+        # Returns a token when acquired, None if another worker holds it.
+        # Without Redis every caller proceeds, as if it held the lease.
+        token = uuid.uuid4().hex
+        if self.redis_client is None:
+            return token
+        
+        try:
+            remaining = await self._acquire(keys=[f"{self.prefix}:{key}"], args=[token, self.lease_ms])
+        except Exception as e:
+            logger.error(f"Failed to acquire lease {key}: {str(e)}")
+            return token
+        return token if remaining == -1 else None
+    
+    async def release(self, key: str, token: str):
+        if self.redis_client is None:
+            return
+        try:
+            await self._release(keys=[f"{self.prefix}:{key}"], args=[token])
+        except Exception as e:
+            logger.error(f"Failed to release lease {key}: {str(e)}")
+
+
+def should_refresh_early(compute_seconds: float, expires_at: float, beta: float = 1.0) -> bool:
+    # XFetch (Vattani et al.): refresh with probability rising towards expiry,
+    # earlier for entries that are slow to recompute.
+    return time.time() - compute_seconds * beta * math.log(1.0 - random.random()) >= expires_at
@@ -0,0 +1,43 @@
+from typing import Any, Dict
+
+from app.services.frequency_sketch import FrequencySketch
+
+TIERS = ("short", "medium", "long")
+
+
+class PopularityTTLPolicy:
+    # Picks a cache TTL from how often a fingerprint has been requested
+    # lately. One-off queries expire in minutes; a query seen `medium_hits`
+    # times is kept for the medium TTL and one seen `long_hits` times for the
+    # long TTL. Counts live in an aging count-min sketch (capped at 15), so
+    # popularity that stops being observed decays and entries fall back to
+    # shorter TTLs on their next refill.
+    def __init__(self, short_ttl: int = 300, medium_ttl: int = 3600, long_ttl: int = 86400,
+                 medium_hits: int = 3, long_hits: int = 10, expected_keys: int = 100000):
+        self.ttls = {"short": short_ttl, "medium": medium_ttl, "long": long_ttl}
+        self.medium_hits = min(medium_hits, 15)
+        self.long_hits = min(long_hits, 15)
+        self.sketch = FrequencySketch(expected_keys)
+        self.promotions = {tier: 0 for tier in TIERS[1:]}
+    
+    def record(self, key: str):
+        self.sketch.increment(key)
+    
+    def tier(self, key: str) -> str:
+        frequency = self.sketch.frequency(key)
+        if frequency >= self.long_hits:
+            return "long"
+        if frequency >= self.medium_hits:
+            return "medium"
+        return "short"
+    
+    def ttl(self, key: str) -> int:
+        return self.ttls[self.tier(key)]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'ttls': dict(self.ttls),
+            'medium_hits': self.medium_hits,
+            'long_hits': self.long_hits,
+            'promotions': dict(self.promotions)
+        }
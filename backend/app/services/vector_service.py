@@ -9,16 +9,44 @@ from qdrant_client.http import models
 
 from app.config import get_settings
 from app.models.schemas import SimilarImage
+from app.services.search_budget import SearchEffort
+from app.services.projection_service import (
+    EmbeddingProjection, ProjectionService, get_projection_service, ensure_reduced_collection
+)
+from app.services.delta_index import DeltaIndex, confirm_indexed_points
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
+def search_params_for(effort: Optional[SearchEffort]) -> Optional[models.SearchParams]:
+    if effort is None:
+        return None
+    return models.SearchParams(
+        hnsw_ef=effort.hnsw_ef,
+        indexed_only=effort.indexed_only,
+        quantization=models.QuantizationSearchParams(
+            rescore=effort.rescore
+        )
+    )
+
+
 class VectorService:
     def __init__(self):
         self.client: Optional[QdrantClient] = None
         self.collection_name = settings.qdrant_collection_name
         self.vector_size = 512
+        self.projection_service: Optional[ProjectionService] = (
+            get_projection_service() if settings.projection_enabled else None
+        )
+        self.delta_index: Optional[DeltaIndex] = (
+            DeltaIndex(
+                self.vector_size,
+                capacity=settings.delta_index_capacity,
+                max_age=settings.delta_index_max_age
+            )
+            if settings.delta_index_enabled else None
+        )
         logger.info("Vector service initialized")
     
     async def connect(self):
@@ -49,6 +77,9 @@ class VectorService:
             
             await self.ensure_collection()
             
+            if self.projection_service is not None:
+                await self.load_projection()
+        
         except Exception as e:
             logger.error(f"Failed to connect to Qdrant: {str(e)}")
             raise
@@ -69,7 +100,9 @@ class VectorService:
                 await self._create_collection()
             else:
                 logger.info(f"Collection {self.collection_name} already exists")
-                
+                if settings.projection_enabled:
+                    await self._move_vectors_on_disk()
+        
         except Exception as e:
             logger.error(f"Failed to ensure collection: {str(e)}")
             raise
@@ -81,17 +114,62 @@ class VectorService:
                 collection_name=self.collection_name,
                 vectors_config=models.VectorParams(
                     size=self.vector_size,
-                    distance=models.Distance.COSINE
+                    distance=models.Distance.COSINE,
+                    on_disk=settings.projection_enabled
                 )
             )
         )
         logger.info(f"Collection {self.collection_name} created successfully")
     
+    async def _move_vectors_on_disk(self):
+        # on_disk only takes effect at creation, so a collection created
+        # before projection mode still holds its full vectors in RAM.
+        try:
+            await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.client.update_collection(
+                    collection_name=self.collection_name,
+                    vectors_config={"": models.VectorParamsDiff(on_disk=True)}
+                )
+            )
+        except Exception as e:
+            logger.warning(f"Could not move {self.collection_name} vectors on disk: {str(e)}")
+    
+    async def load_projection(self):
+        projection = await asyncio.get_event_loop().run_in_executor(
+            None, self.projection_service.load_latest
+        )
+        if projection is None:
+            logger.warning("Projection mode enabled but no trained projection found - using full vectors")
+            return
+        
+        await asyncio.get_event_loop().run_in_executor(
+            None,
+            ensure_reduced_collection,
+            self.client,
+            projection.collection_name(self.collection_name),
+            projection
+        )
+    
+    def _active_projection(self) -> Optional[EmbeddingProjection]:
+        if self.projection_service is None:
+            return None
+        self.projection_service.refresh()
+        return self.projection_service.projection
+    
+    def _write_projections(self) -> List[EmbeddingProjection]:
+        # The published projection plus one still being backfilled.
+        if self.projection_service is None:
+            return []
+        self.projection_service.refresh()
+        return self.projection_service.write_targets()
+    
     async def insert_vectors(
         self,
         vectors: List[np.ndarray],
         image_ids: List[str],
-        metadata: List[Dict[str, Any]] = None
+        metadata: List[Dict[str, Any]] = None,
+        point_ids: Optional[List[str]] = None
     ) -> List[str]:
         if self.client is None:
             await self.connect()
@@ -101,10 +179,11 @@ class VectorService:
         
         try:
             points = []
+            assigned_ids = point_ids
             point_ids = []
             
             for i, (vector, image_id, meta) in enumerate(zip(vectors, image_ids, metadata)):
-                point_id = str(uuid.uuid4())
+                point_id = assigned_ids[i] if assigned_ids else str(uuid.uuid4())
                 point_ids.append(point_id)
                 
                 points.append(
@@ -119,17 +198,46 @@ class VectorService:
                     )
                 )
             
+            # With the delta index serving fresh writes we don't need to block
+            # on Qdrant applying the upsert.
+            wait = self.delta_index is None
             await asyncio.get_event_loop().run_in_executor(
                 None,
                 lambda: self.client.upsert(
                     collection_name=self.collection_name,
-                    points=points
+                    points=points,
+                    wait=wait
                 )
             )
             
+            for projection in self._write_projections():
+                reduced_vectors = projection.transform(np.asarray(vectors, dtype=np.float32))
+                reduced_points = [
+                    models.PointStruct(
+                        id=point.id,
+                        vector={"reduced": reduced.tolist()},
+                        payload=point.payload
+                    )
+                    for point, reduced in zip(points, reduced_vectors)
+                ]
+                await asyncio.get_event_loop().run_in_executor(
+                    None,
+                    lambda: self.client.upsert(
+                        collection_name=projection.collection_name(self.collection_name),
+                        points=reduced_points,
+                        wait=wait
+                    )
+                )
+            
+            if self.delta_index is not None:
+                self.delta_index.add(vectors, image_ids, point_ids, metadata)
+                self.delta_index.ensure_reconciler(
+                    self._confirm_delta, settings.delta_index_reconcile_interval
+                )
+            
             logger.info(f"Inserted {len(points)} vectors successfully")
             return point_ids
-            
+        
         except Exception as e:
             logger.error(f"Failed to insert vectors: {str(e)}")
             raise
@@ -139,11 +247,98 @@ class VectorService:
         query_vector: np.ndarray,
         top_k: int = 10,
         threshold: float = 0.0,
-        include_metadata: bool = True
+        include_metadata: bool = True,
+        effort: Optional[SearchEffort] = None,
+        timeout: Optional[int] = None
     ) -> List[SimilarImage]:
         if self.client is None:
             await self.connect()
         
+        search_params = search_params_for(effort)
+        
+        projection = self._active_projection()
+        if projection is not None:
+            results = await self._search_reduced(
+                projection, query_vector, top_k, threshold,
+                include_metadata, search_params, timeout
+            )
+        else:
+            results = await self._search_full(
+                query_vector, top_k, threshold,
+                include_metadata, search_params, timeout
+            )
+        
+        if self.delta_index is not None:
+            results = self.delta_index.merge(
+                results, query_vector, top_k, threshold, include_metadata
+            )
+        
+        logger.debug(f"Found {len(results)} similar images")
+        return results
+    
+    async def search_batch(
+        self,
+        queries: List[Tuple[np.ndarray, int, float]],
+        include_metadata: bool = True,
+        effort: Optional[SearchEffort] = None,
+        timeout: Optional[int] = None
+    ) -> List[List[SimilarImage]]:
+        # One request for many (vector, top_k, threshold) queries. The
+        # reduced-collection path reranks per query, so it searches each.
+        if self.client is None:
+            await self.connect()
+        
+        if self._active_projection() is not None:
+            return list(await asyncio.gather(*[
+                self.search_similar(query_vector, top_k, threshold, include_metadata, effort, timeout)
+                for query_vector, top_k, threshold in queries
+            ]))
+        
+        search_params = search_params_for(effort)
+        requests = [
+            models.SearchRequest(
+                vector=np.asarray(query_vector, dtype=np.float32).tolist(),
+                limit=top_k,
+                score_threshold=threshold,
+                with_payload=True,
+                params=search_params
+            )
+            for query_vector, top_k, threshold in queries
+        ]
+        
+        try:
+            batch_result = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.client.search_batch(
+                    collection_name=self.collection_name,
+                    requests=requests,
+                    timeout=timeout
+                )
+            )
+        except Exception as e:
+            logger.error(f"Batch search failed: {str(e)}")
+            raise
+        
+        all_results = []
+        for (query_vector, top_k, threshold), search_result in zip(queries, batch_result):
+            results = [
+                self._to_similar_image(scored_point.payload, scored_point.score, include_metadata)
+                for scored_point in search_result
+            ]
+            if self.delta_index is not None:
+                results = self.delta_index.merge(results, query_vector, top_k, threshold, include_metadata)
+            all_results.append(results)
+        return all_results
+    
+    async def _search_full(
+        self,
+        query_vector: np.ndarray,
+        top_k: int,
+        threshold: float,
+        include_metadata: bool,
+        search_params: Optional[models.SearchParams],
+        timeout: Optional[int]
+    ) -> List[SimilarImage]:
         try:
             search_result = await asyncio.get_event_loop().run_in_executor(
                 None,
@@ -152,28 +347,117 @@ class VectorService:
                     query_vector=query_vector.tolist(),
                     limit=top_k,
                     score_threshold=threshold,
-                    with_payload=True
+                    with_payload=True,
+                    search_params=search_params,
+                    timeout=timeout
                 )
             )
             
-            results = []
-            for scored_point in search_result:
-                payload = scored_point.payload or {}
-                
-                result = SimilarImage(
-                    image_id=payload.get("image_id", "unknown"),
-                    score=scored_point.score,
-                    metadata=payload.get("metadata", {}) if include_metadata else None
+            return [
+                self._to_similar_image(scored_point.payload, scored_point.score, include_metadata)
+                for scored_point in search_result
+            ]
+        
+        except Exception as e:
+            logger.error(f"Search failed: {str(e)}")
+            raise
+    
+    async def _search_reduced(
+        self,
+        projection: EmbeddingProjection,
+        query_vector: np.ndarray,
+        top_k: int,
+        threshold: float,
+        include_metadata: bool,
+        search_params: Optional[models.SearchParams],
+        timeout: Optional[int]
+    ) -> List[SimilarImage]:
+        rerank = settings.projection_rerank
+        reduced_query = projection.transform(query_vector)[0]
+        
+        try:
+            search_result = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.client.search(
+                    collection_name=projection.collection_name(self.collection_name),
+                    query_vector=models.NamedVector(name="reduced", vector=reduced_query.tolist()),
+                    limit=top_k * settings.projection_rerank_factor if rerank else top_k,
+                    score_threshold=None if rerank else threshold,
+                    with_payload=True,
+                    with_vectors=False,
+                    search_params=search_params,
+                    timeout=timeout
                 )
-                results.append(result)
+            )
             
-            logger.debug(f"Found {len(results)} similar images")
-            return results
+            if not rerank or not search_result:
+                return [
+                    self._to_similar_image(scored_point.payload, scored_point.score, include_metadata)
+                    for scored_point in search_result
+                ]
             
+            # Full vectors are only stored once, in the source collection.
+            full_points = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.client.retrieve(
+                    collection_name=self.collection_name,
+                    ids=[scored_point.id for scored_point in search_result],
+                    with_payload=False,
+                    with_vectors=True
+                )
+            )
+            full_by_id = {str(point.id): point.vector for point in full_points}
+            search_result = [
+                scored_point for scored_point in search_result if str(scored_point.id) in full_by_id
+            ]
+            if not search_result:
+                return []
+            full_vectors = np.asarray(
+                [full_by_id[str(scored_point.id)] for scored_point in search_result], dtype=np.float32
+            )
+            query = query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+            scores = full_vectors @ query / np.maximum(np.linalg.norm(full_vectors, axis=1), 1e-12)
+            order = np.argsort(-scores)[:top_k]
+            
+            return [
+                self._to_similar_image(search_result[i].payload, float(scores[i]), include_metadata)
+                for i in order
+                if scores[i] >= threshold
+            ]
+        
         except Exception as e:
-            logger.error(f"Search failed: {str(e)}")
+            logger.error(f"Reduced search failed: {str(e)}")
             raise
     
+    async def _confirm_delta(self, location, point_ids: List[str], vectors: np.ndarray) -> List[str]:
+        collection_name = self.collection_name
+        vector_name = None
+        
+        projection = self._active_projection()
+        if projection is not None:
+            collection_name = projection.collection_name(self.collection_name)
+            vectors = projection.transform(vectors)
+            vector_name = "reduced"
+        
+        return await asyncio.get_event_loop().run_in_executor(
+            None,
+            confirm_indexed_points,
+            self.client,
+            collection_name,
+            point_ids,
+            vectors,
+            vector_name
+        )
+    
+    def _to_similar_image(self, payload: Optional[Dict[str, Any]], score: float,
+                          include_metadata: bool) -> SimilarImage:
+        payload = payload or {}
+        return SimilarImage(
+            image_id=payload.get("image_id", "unknown"),
+            score=score,
+            metadata=payload.get("metadata", {}) if include_metadata else None
+        )
+    
     async def delete_by_image_id(self, image_id: str) -> bool:
         if self.client is None:
             await self.connect()
@@ -198,6 +482,12 @@ class VectorService:
             
             point_ids = [point.id for point in search_result[0]]
             
+            if self.delta_index is not None:
+                # Writes still in flight are not visible to scroll yet.
+                pending_ids = self.delta_index.point_ids_for_image(image_id)
+                point_ids.extend(pid for pid in pending_ids if pid not in point_ids)
+                self.delta_index.remove_image(image_id)
+            
             if point_ids:
                 await asyncio.get_event_loop().run_in_executor(
                     None,
@@ -206,15 +496,63 @@ class VectorService:
                         points_selector=models.PointIdsList(points=point_ids)
                     )
                 )
+                for projection in self._write_projections():
+                    await asyncio.get_event_loop().run_in_executor(
+                        None,
+                        lambda: self.client.delete(
+                            collection_name=projection.collection_name(self.collection_name),
+                            points_selector=models.PointIdsList(points=point_ids)
+                        )
+                    )
                 logger.info(f"Deleted {len(point_ids)} points for image_id: {image_id}")
                 return True
             
             return False
-            
+        
         except Exception as e:
             logger.error(f"Failed to delete image {image_id}: {str(e)}")
             raise
     
+    async def get_image(self, image_id: str) -> Optional[Dict[str, Any]]:
+        if self.client is None:
+            await self.connect()
+        
+        try:
+            points, _ = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=models.Filter(
+                        must=[
+                            models.FieldCondition(
+                                key="image_id",
+                                match=models.MatchValue(value=image_id)
+                            )
+                        ]
+                    ),
+                    limit=1,
+                    with_payload=True,
+                    with_vectors=True
+                )
+            )
+            
+            if not points:
+                return None
+            
+            return {
+                "image_id": image_id,
+                "vector": np.array(points[0].vector, dtype=np.float32),
+                "metadata": points[0].payload.get("metadata", {})
+            }
+        
+        except Exception as e:
+            logger.error(f"Failed to get image {image_id}: {str(e)}")
+            raise
+    
+    async def close(self):
+        if self.delta_index is not None:
+            await self.delta_index.stop()
+    
     async def get_collection_info(self) -> Dict[str, Any]:
         if self.client is None:
             await self.connect()
@@ -231,8 +569,12 @@ class VectorService:
                 "distance": info.config.params.vectors.distance.value,
                 "points_count": info.points_count,
                 "segments_count": info.segments_count,
+                "projection": (
+                    self.projection_service.get_info()
+                    if self.projection_service is not None else {"enabled": False}
+                ),
             }
-            
+        
         except Exception as e:
             logger.error(f"Failed to get collection info: {str(e)}")
             raise
@@ -240,4 +582,8 @@ class VectorService:
 
 @lru_cache()
 def get_vector_service() -> VectorService:
+    if settings.sharding_enabled:
+        from app.services.sharded_vector_service import ShardedVectorService
+        from app.services.sharding_service import get_sharding_service
+        return ShardedVectorService(get_sharding_service())
     return VectorService()
@@ -0,0 +1,47 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+from dataclasses import dataclass
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Payloads below this size are cheaper to hash inline than to hand to the
+# executor.
+INLINE_LIMIT = 256 * 1024
+
+
+@dataclass(frozen=True)
+class ImageFingerprint:
+    image_bytes: bytes
+    digest: str
+
+
+def _hash(data: bytes) -> str:
+    if xxhash is not None:
+        return xxhash.xxh3_128_hexdigest(data)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def compute_fingerprint(image_data: str) -> ImageFingerprint:
+    # Hash the decoded bytes, not the base64 text, so the same image sent
+    # with or without a data: URL prefix (or re-wrapped) maps to one key.
+    if image_data.startswith('data:'):
+        image_data = image_data.split(',', 1)[1]
+    
+    try:
+        image_bytes = base64.b64decode(image_data)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid image data: {str(e)}")
+    
+    return ImageFingerprint(image_bytes, _hash(image_bytes))
+
+
+async def fingerprint_image(image_data: str) -> ImageFingerprint:
+    if len(image_data) < INLINE_LIMIT:
+        return compute_fingerprint(image_data)
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, compute_fingerprint, image_data)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.binary_index import BinaryQuantizedIndex
+from app.services.query_optimizer import QueryOptimizer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class BinaryIndexBenchmark:
+    def __init__(self, num_vectors: int = 100000, dimension: int = 512,
+                 num_queries: int = 500, top_k: int = 10, num_clusters: int = 100):
+        self.num_vectors = num_vectors
+        self.dimension = dimension
+        self.num_queries = num_queries
+        self.top_k = top_k
+        self.num_clusters = num_clusters
+        self.optimizer = QueryOptimizer(dimension)
+    
+    def generate_embeddings(self):
+        rng = np.random.default_rng(7)
+        centroids = rng.standard_normal((self.num_clusters, self.dimension)).astype(np.float32)
+        
+        def sample(count):
+            assignments = rng.integers(0, self.num_clusters, count)
+            vectors = centroids[assignments] + 0.8 * rng.standard_normal((count, self.dimension))
+            vectors = vectors.astype(np.float32)
+            return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        
+        return sample(self.num_vectors), sample(self.num_queries)
+    
+    def index_bytes(self, index_data) -> int:
+        # Everything the index keeps in RAM, including the re-rank floats
+        # unless they are memory-mapped.
+        index = index_data['index']
+        if index_data['type'] == 'binary':
+            return index.memory_usage()['resident_bytes']
+        return index.ntotal * self.dimension * 4
+    
+    def measure(self, index_data, queries: np.ndarray, ground_truth, **search_kwargs):
+        index = index_data['index']
+        start_time = time.time()
+        _, labels = index.search(queries, self.top_k, **search_kwargs)
+        latency = (time.time() - start_time) * 1000 / len(queries)
+        
+        hits = sum(
+            len(set(row) & set(truth))
+            for row, truth in zip(labels, ground_truth)
+        )
+        return latency, hits / ground_truth.size
+    
+    def run(self):
+        vectors, queries = self.generate_embeddings()
+        ids = [f"img_{i:07d}" for i in range(self.num_vectors)]
+        
+        flat = self.optimizer._build_index_sync(vectors, ids, "flat")
+        _, ground_truth = flat['index'].search(queries, self.top_k)
+        
+        ivf = self.optimizer._build_index_sync(vectors, ids, "ivf")
+        ivf['index'].nprobe = 10
+        
+        binary = self.optimizer._build_index_sync(vectors, ids, "binary")
+        
+        storage = tempfile.NamedTemporaryFile(suffix=".f32")
+        on_disk = BinaryQuantizedIndex(self.dimension, storage_path=storage.name)
+        on_disk.add(vectors)
+        binary_on_disk = {'index': on_disk, 'ids': ids, 'type': 'binary'}
+        
+        rows = []
+        for name, index_data, kwargs in (
+            ("flat", flat, {}),
+            ("ivf nprobe=10", ivf, {}),
+            ("binary x10 rerank", binary, {"shortlist_size": self.top_k * 10}),
+            ("binary x50 rerank", binary, {"shortlist_size": self.top_k * 50}),
+            ("binary x100 rerank", binary, {"shortlist_size": self.top_k * 100}),
+            ("binary x50 mmap", binary_on_disk, {"shortlist_size": self.top_k * 50}),
+        ):
+            latency, recall = self.measure(index_data, queries, ground_truth, **kwargs)
+            rows.append({
+                "index": name,
+                "ram_mb": self.index_bytes(index_data) / 1024**2,
+                "latency_ms": latency,
+                "recall": recall
+            })
+        
+        logger.info(f"=== Binary Index Benchmark ({self.num_vectors} vectors, top_k={self.top_k}) ===")
+        logger.info(f"{'index':<20} {'RAM MB':>13} {'ms/query':>9} {'recall':>7}")
+        for row in rows:
+            logger.info(
+                f"{row['index']:<20} {row['ram_mb']:>13.1f} "
+                f"{row['latency_ms']:>9.3f} {row['recall']:>7.3f}"
+            )
+        
+        return rows
+
+
+def main():
+    benchmark = BinaryIndexBenchmark()
+    benchmark.run()
+
+
+if __name__ == "__main__":
+    main()
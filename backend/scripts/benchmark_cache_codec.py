@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.cache_codec import CacheCodec, zstandard
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CacheCodecBenchmark:
+    def __init__(self, iterations: int = 2000):
+        self.iterations = iterations
+        self.rng = np.random.default_rng(5)
+        self.codecs = {
+            'msgpack': CacheCodec(compression=None),
+            'msgpack+zlib': CacheCodec(compression="zlib")
+        }
+        if zstandard is not None:
+            self.codecs['msgpack+zstd'] = CacheCodec(compression="zstd")
+        else:
+            logger.warning("zstandard not installed, skipping zstd")
+    
+    def results(self, top_k: int):
+        return [
+            {
+                'image_id': f"img_{self.rng.integers(10 ** 8):08d}",
+                'score': float(score),
+                'metadata': {
+                    'category': str(self.rng.choice(["nature", "city", "people", "animals"])),
+                    'source': "upload",
+                    'width': 1024,
+                    'height': 768
+                }
+            }
+            for score in np.sort(self.rng.uniform(0.5, 1.0, top_k))[::-1]
+        ]
+    
+    def time_codec(self, encode, decode, value):
+        start = time.perf_counter()
+        for _ in range(self.iterations):
+            data = encode(value)
+        encode_us = (time.perf_counter() - start) / self.iterations * 1e6
+        
+        start = time.perf_counter()
+        for _ in range(self.iterations):
+            decode(data)
+        decode_us = (time.perf_counter() - start) / self.iterations * 1e6
+        
+        return len(data), encode_us, decode_us
+    
+    def report(self, name: str, size: int, encode_us: float, decode_us: float, baseline: int):
+        logger.info(
+            f"  {name:<14} {size:>7} bytes ({size / baseline:5.1%})  "
+            f"encode {encode_us:7.1f}us  decode {decode_us:7.1f}us"
+        )
+    
+    def run(self):
+        for top_k in (10, 50, 100):
+            value = self.results(top_k)
+            logger.info(f"top_k={top_k} result list")
+            
+            baseline = self.time_codec(
+                lambda v: json.dumps(v, default=str).encode(), json.loads, value
+            )
+            self.report("json", *baseline, baseline[0])
+            for name, codec in self.codecs.items():
+                self.report(name, *self.time_codec(codec.encode, codec.decode, value), baseline[0])
+        
+        vector = self.rng.standard_normal(512).astype(np.float32)
+        vector /= np.linalg.norm(vector)
+        logger.info("512-d feature vector")
+        
+        baseline = self.time_codec(
+            lambda v: json.dumps(v.tolist()).encode(), json.loads, vector
+        )
+        self.report("json", *baseline, baseline[0])
+        codec = self.codecs['msgpack+zlib']
+        self.report("float16", *self.time_codec(codec.encode_vector, codec.decode, vector), baseline[0])
+        
+        decoded = codec.decode(codec.encode_vector(vector))
+        logger.info(f"  float16 max abs error {np.abs(decoded - vector).max():.2e}, cosine {float(decoded @ vector):.6f}")
+
+
+def main():
+    CacheCodecBenchmark().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.query_optimizer import QueryOptimizer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class PartitionedSearchBenchmark:
+    def __init__(self, num_vectors: int = 200000, dimension: int = 512,
+                 num_queries: int = 1000, partitions: int = 8, top_k: int = 10):
+        self.num_vectors = num_vectors
+        self.dimension = dimension
+        self.num_queries = num_queries
+        self.partitions = partitions
+        self.top_k = top_k
+        self.optimizer = QueryOptimizer(dimension)
+    
+    def generate_vectors(self):
+        rng = np.random.default_rng(42)
+        vectors = rng.standard_normal((self.num_vectors, self.dimension)).astype(np.float32)
+        queries = rng.standard_normal((self.num_queries, self.dimension)).astype(np.float32)
+        ids = [f"vec_{i:08d}" for i in range(self.num_vectors)]
+        return vectors, queries, ids
+    
+    def core_counts(self):
+        max_cores = os.cpu_count() or 1
+        counts = []
+        cores = 1
+        while cores < max_cores:
+            counts.append(cores)
+            cores *= 2
+        counts.append(max_cores)
+        return counts
+    
+    async def run(self):
+        vectors, queries, ids = self.generate_vectors()
+        logger.info(
+            f"Benchmarking {self.num_queries} queries over {self.num_vectors} vectors, "
+            f"{self.partitions} partitions, top_k={self.top_k}"
+        )
+        
+        results = []
+        baseline_qps = None
+        
+        for cores in self.core_counts():
+            engine = await self.optimizer.create_partitioned_index(
+                vectors, ids, partitions=self.partitions, max_workers=cores
+            )
+            
+            await self.optimizer.search_partitioned_batch(engine, queries[:10], self.top_k)
+            
+            start_time = time.time()
+            await self.optimizer.search_partitioned_batch(engine, queries, self.top_k)
+            batched_time = time.time() - start_time
+            
+            start_time = time.time()
+            for query in queries[:100]:
+                await self.optimizer.search_partitioned(engine, query, self.top_k)
+            single_time = (time.time() - start_time) * self.num_queries / 100
+            
+            engine.close()
+            
+            qps = self.num_queries / batched_time
+            baseline_qps = baseline_qps or qps
+            results.append({
+                "cores": cores,
+                "batched_qps": qps,
+                "single_query_qps": self.num_queries / single_time,
+                "speedup": qps / baseline_qps
+            })
+        
+        logger.info("=== Partitioned Search Scaling ===")
+        logger.info(f"{'cores':>6} {'batched qps':>12} {'single qps':>12} {'speedup':>8}")
+        for row in results:
+            logger.info(
+                f"{row['cores']:>6} {row['batched_qps']:>12.1f} "
+                f"{row['single_query_qps']:>12.1f} {row['speedup']:>7.2f}x"
+            )
+        
+        return results
+
+
+async def main():
+    benchmark = PartitionedSearchBenchmark()
+    await benchmark.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import sys
+import time
+import numpy as np
+import faiss
+from sklearn.decomposition import IncrementalPCA
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.projection_service import EmbeddingProjection
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ProjectionBenchmark:
+    def __init__(self, num_vectors: int = 100000, dimension: int = 512,
+                 num_queries: int = 1000, top_k: int = 10, rerank_factor: int = 4):
+        self.num_vectors = num_vectors
+        self.dimension = dimension
+        self.num_queries = num_queries
+        self.top_k = top_k
+        self.rerank_factor = rerank_factor
+    
+    def generate_embeddings(self):
+        # CLIP embeddings concentrate most variance in a few hundred directions;
+        # a decaying spectrum approximates that.
+        rng = np.random.default_rng(42)
+        spectrum = 1.0 / np.sqrt(np.arange(1, self.dimension + 1))
+        basis = np.linalg.qr(rng.standard_normal((self.dimension, self.dimension)))[0]
+        
+        def sample(count):
+            latent = rng.standard_normal((count, self.dimension)) * spectrum
+            vectors = (latent @ basis.T).astype(np.float32)
+            return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        
+        return sample(self.num_vectors), sample(self.num_queries)
+    
+    def train_projection(self, vectors: np.ndarray, output_dimension: int) -> EmbeddingProjection:
+        model = IncrementalPCA(n_components=output_dimension, batch_size=max(2000, output_dimension))
+        for start in range(0, len(vectors), 2000):
+            batch = vectors[start:start + 2000]
+            if len(batch) >= output_dimension:
+                model.partial_fit(batch)
+        
+        return EmbeddingProjection(
+            version=0,
+            model=model,
+            input_dimension=self.dimension,
+            output_dimension=output_dimension,
+            trained_on=len(vectors),
+            created_at=time.time()
+        )
+    
+    def timed_search(self, index: faiss.Index, queries: np.ndarray, k: int):
+        start_time = time.time()
+        scores, labels = index.search(queries, k)
+        return labels, (time.time() - start_time) * 1000 / len(queries)
+    
+    def recall(self, labels: np.ndarray, ground_truth: np.ndarray) -> float:
+        hits = sum(
+            len(set(row[:self.top_k]) & set(truth))
+            for row, truth in zip(labels, ground_truth)
+        )
+        return hits / ground_truth.size
+    
+    def run(self):
+        vectors, queries = self.generate_embeddings()
+        
+        full_index = faiss.IndexFlatIP(self.dimension)
+        full_index.add(vectors)
+        ground_truth, full_latency = self.timed_search(full_index, queries, self.top_k)
+        full_bytes = vectors.nbytes
+        
+        rows = [{
+            "mode": f"full {self.dimension}d",
+            "memory_mb": full_bytes / 1024**2,
+            "latency_ms": full_latency,
+            "recall": 1.0,
+            "memory_saving": 0.0
+        }]
+        
+        for output_dimension in (256, 128):
+            projection = self.train_projection(vectors, output_dimension)
+            reduced_vectors = projection.transform(vectors)
+            reduced_queries = projection.transform(queries)
+            
+            reduced_index = faiss.IndexFlatIP(output_dimension)
+            reduced_index.add(reduced_vectors)
+            
+            labels, latency = self.timed_search(reduced_index, reduced_queries, self.top_k)
+            rows.append({
+                "mode": f"pca {output_dimension}d",
+                "memory_mb": reduced_vectors.nbytes / 1024**2,
+                "latency_ms": latency,
+                "recall": self.recall(labels, ground_truth),
+                "memory_saving": 1 - reduced_vectors.nbytes / full_bytes
+            })
+            
+            start_time = time.time()
+            _, candidates = reduced_index.search(reduced_queries, self.top_k * self.rerank_factor)
+            candidate_scores = np.einsum("qkd,qd->qk", vectors[candidates], queries)
+            order = np.argsort(-candidate_scores, axis=1)[:, :self.top_k]
+            reranked = np.take_along_axis(candidates, order, axis=1)
+            rerank_latency = (time.time() - start_time) * 1000 / len(queries)
+            
+            rows.append({
+                "mode": f"pca {output_dimension}d + rerank",
+                "memory_mb": reduced_vectors.nbytes / 1024**2,
+                "latency_ms": rerank_latency,
+                "recall": self.recall(reranked, ground_truth),
+                "memory_saving": 1 - reduced_vectors.nbytes / full_bytes
+            })
+            
+            logger.info(
+                f"{output_dimension}d projection explains "
+                f"{projection.explained_variance() * 100:.1f}% of variance"
+            )
+        
+        logger.info(f"=== Projection Benchmark ({self.num_vectors} vectors, top_k={self.top_k}) ===")
+        logger.info(f"{'mode':<22} {'RAM MB':>9} {'saving':>8} {'ms/query':>9} {'recall':>7}")
+        for row in rows:
+            logger.info(
+                f"{row['mode']:<22} {row['memory_mb']:>9.1f} {row['memory_saving'] * 100:>7.1f}% "
+                f"{row['latency_ms']:>9.3f} {row['recall']:>7.3f}"
+            )
+        
+        return rows
+
+
+def main():
+    benchmark = ProjectionBenchmark()
+    benchmark.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.semantic_router import SemanticShardRouter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SemanticShardingBenchmark:
+    def __init__(self, num_vectors: int = 100000, dimension: int = 512,
+                 num_queries: int = 500, top_k: int = 10, sample_fraction: float = 0.2):
+        self.num_vectors = num_vectors
+        self.dimension = dimension
+        self.num_queries = num_queries
+        self.top_k = top_k
+        self.sample_fraction = sample_fraction
+        self.rng = np.random.default_rng(5)
+    
+    def clustered(self, num_clusters: int, spread: float):
+        # Same shape as the other benchmarks' synthetic CLIP-like data: gaussian
+        # blobs around random centroids. 10 clusters mirrors the categories of
+        # scripts/generate_test_data.py.
+        centroids = self.rng.standard_normal((num_clusters, self.dimension)).astype(np.float32)
+        
+        def sample(count):
+            assignments = self.rng.integers(0, num_clusters, count)
+            vectors = centroids[assignments] + spread * self.rng.standard_normal((count, self.dimension))
+            vectors = vectors.astype(np.float32)
+            return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        
+        return sample(self.num_vectors), sample(self.num_queries)
+    
+    def datasets(self):
+        return {
+            "10 categories": self.clustered(10, 1.0),
+            "100 clusters": self.clustered(100, 0.8),
+            "isotropic": self.clustered(1, 10.0)
+        }
+    
+    def evaluate(self, vectors: np.ndarray, queries: np.ndarray, shard_count: int):
+        sample_size = int(len(vectors) * self.sample_fraction)
+        sample = vectors[self.rng.choice(len(vectors), sample_size, replace=False)]
+        router = SemanticShardRouter.train(
+            [sample[start:start + 4096] for start in range(0, len(sample), 4096)], shard_count
+        )
+        
+        assignment = router.assign(vectors)
+        largest_shard = np.bincount(assignment, minlength=shard_count).max() / len(vectors)
+        
+        scores = queries @ vectors.T
+        truth = np.argpartition(-scores, self.top_k - 1, axis=1)[:, :self.top_k]
+        truth_shards = assignment[truth]
+        
+        rows = []
+        for n_probe in sorted({1, 2, 4, shard_count // 2, shard_count}):
+            hits = 0
+            for query, shards in zip(queries, truth_shards):
+                probed = set(router.probe(query, n_probe).tolist())
+                hits += sum(shard in probed for shard in shards)
+            rows.append({
+                "shards": shard_count,
+                "n_probe": n_probe,
+                "fan_out": n_probe / shard_count,
+                "recall": hits / truth.size,
+                "largest_shard": largest_shard
+            })
+        return rows
+    
+    def run(self):
+        results = {}
+        for name, (vectors, queries) in self.datasets().items():
+            for shard_count in (8, 16):
+                results.setdefault(name, []).extend(self.evaluate(vectors, queries, shard_count))
+        
+        logger.info(f"=== Semantic Sharding Benchmark ({self.num_vectors} vectors, top_k={self.top_k}) ===")
+        logger.info(f"{'dataset':<14} {'shards':>6} {'n_probe':>7} {'fan-out':>8} {'recall':>7} {'max shard':>10}")
+        for name, rows in results.items():
+            for row in rows:
+                logger.info(
+                    f"{name:<14} {row['shards']:>6} {row['n_probe']:>7} {row['fan_out'] * 100:>7.1f}% "
+                    f"{row['recall']:>7.3f} {row['largest_shard'] * 100:>9.1f}%"
+                )
+        logger.info("Hash sharding: fan-out 100% at every shard count, recall 1.000")
+        
+        return results
+
+
+def main():
+    benchmark = SemanticShardingBenchmark()
+    benchmark.run()
+
+
+if __name__ == "__main__":
+    main()
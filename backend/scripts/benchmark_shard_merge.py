@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.shard_merge import shard_candidate_limit, merge_shard_results, shards_to_refetch
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ShardMergeBenchmark:
+    def __init__(self, num_images: int = 200000, num_queries: int = 200, top_k: int = 10):
+        self.num_images = num_images
+        self.num_queries = num_queries
+        self.top_k = top_k
+        self.rng = np.random.default_rng(11)
+    
+    def shard_lists(self, scores: np.ndarray, assignment: np.ndarray, shard_count: int, limit: int):
+        # What each shard would answer: its own top `limit` images by score.
+        lists = []
+        for shard in range(shard_count):
+            members = np.flatnonzero(assignment == shard)
+            top = members[np.argsort(-scores[members])[:limit]]
+            lists.append([
+                {'image_id': f"img_{idx}", 'score': float(scores[idx]), 'metadata': {}, 'shard': shard}
+                for idx in top
+            ])
+        return lists
+    
+    def legacy_merge(self, shard_results):
+        all_results = []
+        for results in shard_results:
+            all_results.extend(results)
+        all_results.sort(key=lambda x: x['score'], reverse=True)
+        
+        merged = []
+        seen = set()
+        for result in all_results:
+            if result['image_id'] in seen:
+                continue
+            seen.add(result['image_id'])
+            merged.append(result)
+            if len(merged) == self.top_k:
+                break
+        return merged
+    
+    def run_shard_count(self, shard_count: int):
+        limit = shard_candidate_limit(self.top_k, shard_count)
+        legacy_time = merge_time = 0.0
+        legacy_candidates = candidates = refetches = hits = 0
+        
+        for _ in range(self.num_queries):
+            scores = self.rng.standard_normal(self.num_images).astype(np.float32)
+            assignment = self.rng.integers(0, shard_count, self.num_images)
+            truth = {f"img_{idx}" for idx in np.argsort(-scores)[:self.top_k]}
+            
+            legacy_lists = self.shard_lists(scores, assignment, shard_count, self.top_k * 2)
+            start_time = time.perf_counter()
+            self.legacy_merge(legacy_lists)
+            legacy_time += time.perf_counter() - start_time
+            legacy_candidates += sum(len(results) for results in legacy_lists)
+            
+            lists = self.shard_lists(scores, assignment, shard_count, limit)
+            start_time = time.perf_counter()
+            merged = merge_shard_results(lists, self.top_k)
+            refetch = shards_to_refetch(lists, limit, merged, self.top_k)
+            merge_time += time.perf_counter() - start_time
+            candidates += sum(len(results) for results in lists)
+            
+            if refetch:
+                refetches += len(refetch)
+                full = self.shard_lists(scores, assignment, shard_count, self.top_k)
+                for shard in refetch:
+                    lists[shard] = full[shard]
+                    candidates += len(full[shard])
+                merged = merge_shard_results(lists, self.top_k)
+            
+            hits += len(truth & {result['image_id'] for result in merged})
+        
+        return {
+            "shards": shard_count,
+            "limit": limit,
+            "legacy_candidates": legacy_candidates / self.num_queries,
+            "candidates": candidates / self.num_queries,
+            "legacy_merge_us": legacy_time * 1e6 / self.num_queries,
+            "merge_us": merge_time * 1e6 / self.num_queries,
+            "refetch_rate": refetches / self.num_queries,
+            "recall": hits / (self.num_queries * self.top_k)
+        }
+    
+    def run(self):
+        rows = [self.run_shard_count(shard_count) for shard_count in (8, 16, 32, 64)]
+        
+        logger.info(f"=== Shard Merge Benchmark (top_k={self.top_k}, {self.num_queries} queries) ===")
+        logger.info(
+            f"{'shards':>6} {'limit':>6} {'cand old':>9} {'cand new':>9} "
+            f"{'merge old us':>13} {'merge new us':>13} {'refetch/q':>10} {'recall':>7}"
+        )
+        for row in rows:
+            logger.info(
+                f"{row['shards']:>6} {row['limit']:>6} {row['legacy_candidates']:>9.0f} "
+                f"{row['candidates']:>9.1f} {row['legacy_merge_us']:>13.1f} {row['merge_us']:>13.1f} "
+                f"{row['refetch_rate']:>10.3f} {row['recall']:>7.3f}"
+            )
+        
+        return rows
+
+
+def main():
+    benchmark = ShardMergeBenchmark()
+    benchmark.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.sharding_service import get_sharding_service
+from app.services.shard_rebalancer import ShardRebalancer
+from app.services.ring_coordinator import get_ring_coordinator
+from app.config_scale import get_scale_settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def rebalance_shards():
+    scale_settings = get_scale_settings()
+    
+    try:
+        sharding_service = get_sharding_service()
+        # Start from the layout the serving workers share, not this host's file.
+        sharding_service.ring_coordinator = get_ring_coordinator()
+        await sharding_service.refresh_ring()
+        
+        target_ring = sharding_service.ring.with_nodes(range(scale_settings.shard_count))
+        if sharding_service.previous_ring is not None:
+            target_ring = sharding_service.ring
+        
+        logger.info(
+            f"Rebalancing shard ring {sharding_service.ring.nodes} -> {target_ring.nodes} "
+            f"(batch={scale_settings.rebalance_batch_size}, "
+            f"limit={scale_settings.rebalance_max_points_per_sec} points/s)"
+        )
+        
+        rebalancer = ShardRebalancer(
+            sharding_service,
+            batch_size=scale_settings.rebalance_batch_size,
+            max_points_per_sec=scale_settings.rebalance_max_points_per_sec
+        )
+        stats = await rebalancer.run(target_ring)
+        
+        logger.info(f"Rebalance stats: {stats}")
+    
+    except Exception as e:
+        logger.error(f"Failed to rebalance shards: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    asyncio.run(rebalance_shards())
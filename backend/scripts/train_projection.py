@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.vector_service import get_vector_service
+from app.services.projection_service import get_projection_service
+from app.config import get_settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def train_projection():
+    settings = get_settings()
+    logger.info(
+        f"Training {settings.projection_dimension}d projection from {settings.qdrant_collection_name}"
+    )
+    
+    try:
+        vector_service = get_vector_service()
+        await vector_service.connect()
+        
+        projection_service = get_projection_service()
+        projection = await projection_service.train_from_collection(
+            vector_service.client,
+            settings.qdrant_collection_name,
+            settings.projection_dimension
+        )
+        
+        # Serving workers start dual-writing on their next refresh; points
+        # written before that are covered by the backfill scan.
+        logger.info(f"Projection v{projection.version} staged; waiting for workers to dual-write")
+        await asyncio.sleep(projection_service.refresh_interval * 2)
+        
+        copied = await projection_service.backfill_collection(
+            vector_service.client,
+            settings.qdrant_collection_name,
+            projection
+        )
+        projection_service.publish(projection)
+        projection_service.activate(projection)
+        
+        logger.info(
+            f"Projection v{projection.version} published: {copied} points in "
+            f"{projection.collection_name(settings.qdrant_collection_name)}"
+        )
+        logger.info("Workers with PROJECTION_ENABLED=true switch to it on their next refresh")
+    
+    except Exception as e:
+        logger.error(f"Failed to train projection: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    asyncio.run(train_projection())
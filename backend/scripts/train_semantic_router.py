@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+import sys
+import os
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.semantic_router import SemanticShardRouter
+from app.config import get_settings
+from app.config_scale import get_scale_settings
+from qdrant_client import QdrantClient
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_SIZE = 200000
+BATCH_SIZE = 4096
+
+async def sample_vectors(client: QdrantClient, collection_name: str, limit: int):
+    offset = None
+    batch = []
+    sampled = 0
+    
+    while sampled < limit:
+        points, offset = await asyncio.get_event_loop().run_in_executor(
+            None,
+            lambda: client.scroll(
+                collection_name=collection_name,
+                limit=min(1000, limit - sampled),
+                offset=offset,
+                with_payload=False,
+                with_vectors=True
+            )
+        )
+        batch.extend(point.vector for point in points)
+        sampled += len(points)
+        
+        if len(batch) >= BATCH_SIZE or (offset is None and batch):
+            yield np.array(batch, dtype=np.float32)
+            batch = []
+        
+        if offset is None:
+            break
+    
+    if batch:
+        yield np.array(batch, dtype=np.float32)
+
+async def train_semantic_router():
+    settings = get_settings()
+    scale_settings = get_scale_settings()
+    logger.info(
+        f"Training semantic router for {scale_settings.shard_count} shards "
+        f"from up to {SAMPLE_SIZE} vectors of {settings.qdrant_collection_name}"
+    )
+    
+    try:
+        client = QdrantClient(host=settings.qdrant_host, port=settings.qdrant_port)
+        batches = [
+            batch async for batch in sample_vectors(client, settings.qdrant_collection_name, SAMPLE_SIZE)
+        ]
+        
+        previous = SemanticShardRouter.load(scale_settings.semantic_router_path)
+        router = SemanticShardRouter.train(
+            batches,
+            scale_settings.shard_count,
+            version=previous.version + 1 if previous else 0,
+            batch_size=BATCH_SIZE
+        )
+        router.save(scale_settings.semantic_router_path)
+        
+        balance = router.balance(np.concatenate(batches))
+        logger.info(
+            f"Router v{router.version} trained on {router.trained_on} vectors; "
+            f"largest shard would hold {max(balance.values()) * 100:.1f}% of the sample"
+        )
+        logger.info(
+            "Set SHARDING_MODE=semantic and re-index into the shards so existing "
+            "points are placed by centroid"
+        )
+    
+    except Exception as e:
+        logger.error(f"Failed to train semantic router: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    asyncio.run(train_semantic_router())
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.cache_warmer import get_cache_warmer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def warm_cache():
+    # Replays the hot-query log now, regardless of the warmed marker.
+    warmer = get_cache_warmer()
+    
+    try:
+        await warmer.search_cache.connect()
+        warmer.lease.bind(warmer.search_cache.redis_client)
+        await warmer.vector_service.connect()
+        
+        stats = await warmer.warm()
+        logger.info(f"Cache warming stats: {stats}")
+    
+    except Exception as e:
+        logger.error(f"Failed to warm cache: {str(e)}")
+        raise
+    finally:
+        await warmer.search_cache.disconnect()
+        await warmer.vector_service.close()
+
+if __name__ == "__main__":
+    asyncio.run(warm_cache())
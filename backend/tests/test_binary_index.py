@@ -0,0 +1,64 @@
+import numpy as np
+
+from app.services.binary_index import BinaryQuantizedIndex, hamming_distances, normalize_rows, pack_sign_codes
+
+
+def _clustered(n, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((16, dim))
+    return (centers[rng.integers(0, 16, n)] + 0.3 * rng.standard_normal((n, dim))).astype(np.float32)
+
+
+def test_hamming_distance_counts_differing_bits():
+    codes = pack_sign_codes(np.array([[1, 1, 1, 1], [-1, -1, 1, 1], [-1, -1, -1, -1]], dtype=np.float32))
+    
+    assert hamming_distances(codes[0], codes).tolist() == [0, 2, 4]
+
+
+def test_normalize_rows_leaves_zero_vectors_at_zero():
+    normalized = normalize_rows(np.array([[3.0, 4.0], [0.0, 0.0]]))
+    
+    assert np.allclose(normalized, [[0.6, 0.8], [0.0, 0.0]])
+
+
+def test_search_matches_exact_neighbours():
+    vectors = _clustered(2000)
+    index = BinaryQuantizedIndex(dimension=64, shortlist_factor=50)
+    index.add(vectors[:1000])
+    index.add(vectors[1000:])
+    queries = _clustered(20, seed=1)
+    
+    _, labels = index.search(queries, k=10)
+    exact = np.argsort(-(normalize_rows(queries) @ normalize_rows(vectors).T), axis=1)[:, :10]
+    
+    recall = np.mean([len(set(found) & set(expected)) / 10 for found, expected in zip(labels, exact)])
+    assert index.ntotal == 2000
+    assert recall >= 0.9
+
+
+def test_zero_query_returns_finite_scores():
+    index = BinaryQuantizedIndex(dimension=8)
+    index.add(np.eye(8, dtype=np.float32))
+    
+    scores, labels = index.search(np.zeros((1, 8)), k=3)
+    
+    assert np.all(np.isfinite(scores))
+    assert len(set(labels[0])) == 3
+
+
+def test_memory_mapped_vectors_survive_growth(tmp_path):
+    vectors = _clustered(3000)
+    index = BinaryQuantizedIndex(dimension=64, storage_path=str(tmp_path / "vectors.f32"))
+    for start in range(0, 3000, 700):
+        index.add(vectors[start:start + 700])
+    
+    assert np.allclose(index.vectors, normalize_rows(vectors))
+    _, labels = index.search(vectors[:1], k=1)
+    assert labels[0, 0] == 0
+
+
+def test_empty_index_returns_no_results():
+    scores, labels = BinaryQuantizedIndex(dimension=8).search(np.ones((2, 8)), k=5)
+    
+    assert scores.shape == (2, 0)
+    assert labels.shape == (2, 0)
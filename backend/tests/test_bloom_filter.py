@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from app.services.bloom_filter import BloomFilter, ScalableBloomFilter, SharedBloomFilter
+
+
+def _fill(bloom, keys):
+    for key in keys:
+        bloom.add_positions(bloom.positions(key))
+
+
+def test_no_false_negatives_and_rate_near_target():
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    _fill(bloom, [f"key-{i}" for i in range(10000)])
+    
+    assert all(f"key-{i}" in bloom for i in range(10000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(20000)) / 20000
+    assert false_positives < 0.02
+    assert abs(bloom.false_positive_rate() - 0.01) < 0.005
+
+
+def test_merge_ors_in_redis_bitmaps():
+    bloom = BloomFilter(capacity=1000)
+    other = BloomFilter(capacity=1000)
+    _fill(other, ["shared"])
+    
+    bloom.merge(other.bits.tobytes())
+    
+    assert "shared" in bloom
+
+
+def test_scalable_filter_grows_and_keeps_the_rate():
+    bloom = ScalableBloomFilter(capacity=1000, error_rate=0.01, max_slices=4)
+    for i in range(6000):
+        slice_ = bloom.slices[bloom.active]
+        slice_.add_positions(slice_.positions(f"key-{i}"))
+        if i % 100 == 0:
+            bloom.maybe_grow()
+    
+    assert len(bloom.slices) > 1
+    assert all(f"key-{i}" in bloom for i in range(6000))
+    assert bloom.false_positive_rate() < 0.01
+
+
+def test_growth_stops_at_the_byte_cap():
+    bloom = ScalableBloomFilter(capacity=1000000, error_rate=0.01, max_slices=8, max_bytes=8 * 1024 * 1024)
+    
+    assert bloom.max_slices == 2
+    assert bloom.worst_case_bytes() <= 8 * 1024 * 1024
+
+
+class FakePipeline:
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.commands = []
+    
+    def __len__(self):
+        return len(self.commands)
+    
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+    
+    async def execute(self):
+        return [getattr(self.redis_client, name)(*args) for name, args in self.commands]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.bitmaps = {}
+        self.lists = {}
+    
+    def pipeline(self):
+        return FakePipeline(self)
+    
+    def setbit(self, key, offset, value):
+        bitmap = self.bitmaps.setdefault(key, bytearray())
+        if len(bitmap) <= offset >> 3:
+            bitmap.extend(bytes((offset >> 3) + 1 - len(bitmap)))
+        bitmap[offset >> 3] |= 0x80 >> (offset & 7)
+    
+    def get(self, key):
+        return bytes(self.bitmaps[key]) if key in self.bitmaps else None
+    
+    def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value)
+    
+    def lrange(self, key, start, stop):
+        return self.lists.get(key, [])[start:]
+    
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+    
+    def expire(self, key, ttl):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_workers_learn_each_others_keys():
+    redis_client = FakeRedis()
+    first, second = SharedBloomFilter(capacity=1000), SharedBloomFilter(capacity=1000)
+    first.bind(redis_client)
+    second.bind(redis_client)
+    assert second.might_contain("anything")
+    
+    first.add("before")
+    await first.sync()
+    await second.sync()
+    first.add("after")
+    await first.sync()
+    await second.sync()
+    
+    assert second.might_contain("before")
+    assert second.might_contain("after")
+    assert not second.might_contain("never-written")
+    assert second.get_stats()['log_cursor'] == 2
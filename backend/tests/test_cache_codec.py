@@ -0,0 +1,55 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.services.cache_codec import CacheCodec, HEADER, VERSION, MARKER, FORMAT_MSGPACK, COMPRESSION_NONE
+
+
+def test_round_trips_values_with_numpy_scalars():
+    codec = CacheCodec(compression="zlib")
+    value = {'results': [{'image_id': "a", 'score': np.float32(0.5)}], 'top_k': 10}
+    
+    assert codec.decode(codec.encode(value)) == {'results': [{'image_id': "a", 'score': 0.5}], 'top_k': 10}
+
+
+def test_compresses_only_above_threshold():
+    codec = CacheCodec(compression="zlib", min_compress_bytes=1024)
+    small = codec.encode({'a': 1})
+    large = codec.encode({'results': ["x" * 100] * 100})
+    
+    assert HEADER.unpack_from(small)[3] == COMPRESSION_NONE
+    assert len(large) < 10000
+    assert codec.decode(large) == {'results': ["x" * 100] * 100}
+
+
+def test_vectors_round_trip_as_float16():
+    codec = CacheCodec(compression=None)
+    vector = np.random.default_rng(0).standard_normal(512).astype(np.float32)
+    
+    data = codec.encode_vector(vector)
+    decoded = codec.decode(data)
+    
+    assert len(data) == HEADER.size + 512 * 2
+    assert decoded.dtype == np.float32
+    np.testing.assert_allclose(decoded, vector, rtol=1e-3, atol=1e-3)
+
+
+def test_reads_json_written_before_the_codec():
+    codec = CacheCodec()
+    
+    assert codec.decode(json.dumps({'a': [1, 2]}).encode()) == {'a': [1, 2]}
+    assert codec.decode(b"") is None
+
+
+def test_rejects_newer_versions():
+    codec = CacheCodec()
+    data = HEADER.pack(MARKER, VERSION + 1, FORMAT_MSGPACK, COMPRESSION_NONE) + b"\x80"
+    
+    with pytest.raises(ValueError):
+        codec.decode(data)
+
+
+def test_rejects_unknown_compression():
+    with pytest.raises(ValueError):
+        CacheCodec(compression="lz4")
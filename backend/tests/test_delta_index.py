@@ -0,0 +1,82 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.models.schemas import SimilarImage
+from app.services.delta_index import DeltaIndex
+
+
+def _add(index, *image_ids, dim=4):
+    vectors = [np.eye(dim, dtype=np.float32)[i % dim] for i in range(len(image_ids))]
+    index.add(vectors, list(image_ids), [f"point-{image_id}" for image_id in image_ids], [{} for _ in image_ids])
+
+
+def test_search_finds_fresh_writes():
+    index = DeltaIndex(dimension=4)
+    _add(index, "a", "b")
+    
+    results = index.search(np.array([1.0, 0.1, 0.0, 0.0]), top_k=1)
+    
+    assert [result.image_id for result in results] == ["a"]
+
+
+def test_rewrite_replaces_the_image_entry():
+    index = DeltaIndex(dimension=4)
+    _add(index, "a")
+    index.add([np.array([0.0, 1.0, 0.0, 0.0])], ["a"], ["point-a2"], [{}])
+    
+    assert len(index) == 1
+    assert index.point_ids_for_image("a") == ["point-a2"]
+
+
+def test_oldest_entry_is_evicted_at_capacity():
+    index = DeltaIndex(dimension=4, capacity=2)
+    _add(index, "a", "b", "c")
+    
+    assert index.point_ids_for_image("a") == []
+    assert len(index) == 2
+
+
+def test_removed_and_expired_entries_stop_matching():
+    index = DeltaIndex(dimension=4, max_age=0.01)
+    _add(index, "a", "b")
+    index.remove_points(["point-a"])
+    
+    assert index.search(np.array([1.0, 0.0, 0.0, 0.0]), top_k=2, threshold=0.5) == []
+    time.sleep(0.02)
+    assert index.expire() == 1
+    assert len(index) == 0
+
+
+def test_zero_vectors_never_match():
+    index = DeltaIndex(dimension=4)
+    index.add([np.zeros(4)], ["zero"], ["point-zero"], [{}])
+    _add(index, "a")
+    
+    assert index.search(np.zeros(4), top_k=5) == []
+    assert [result.image_id for result in index.search(np.ones(4), top_k=5, threshold=0.1)] == ["a"]
+
+
+def test_merge_keeps_the_best_score_per_image():
+    index = DeltaIndex(dimension=4)
+    _add(index, "a")
+    backend = [SimilarImage(image_id="a", score=0.5), SimilarImage(image_id="b", score=0.7)]
+    
+    merged = index.merge(backend, np.array([1.0, 0.0, 0.0, 0.0]), top_k=2)
+    
+    assert [(result.image_id, round(result.score, 3)) for result in merged] == [("a", 1.0), ("b", 0.7)]
+
+
+@pytest.mark.asyncio
+async def test_reconcile_drops_confirmed_points():
+    index = DeltaIndex(dimension=4)
+    _add(index, "a", "b")
+    
+    async def confirm(location, point_ids, vectors):
+        return [point_id for point_id in point_ids if point_id == "point-a"]
+    
+    await index.reconcile(confirm)
+    
+    assert index.point_ids_for_image("a") == []
+    assert index.point_ids_for_image("b") == ["point-b"]
@@ -0,0 +1,39 @@
+from app.services.hash_ring import ConsistentHashRing, RingLayout, ring_state
+
+
+def test_keys_are_spread_over_all_nodes():
+    ring = ConsistentHashRing(range(4))
+    
+    owners = {ring.get_node(f"image-{i}") for i in range(1000)}
+    distribution = ring.load_distribution()
+    
+    assert owners == {0, 1, 2, 3}
+    assert abs(sum(distribution.values()) - 1.0) < 1e-9
+    assert all(0.15 < share < 0.35 for share in distribution.values())
+
+
+def test_adding_a_node_only_moves_keys_to_it():
+    ring = ConsistentHashRing(range(4))
+    grown = ring.with_nodes(range(5))
+    keys = [f"image-{i}" for i in range(5000)]
+    
+    moved = [key for key in keys if ring.get_node(key) != grown.get_node(key)]
+    
+    assert grown.version == ring.version + 1
+    assert all(grown.get_node(key) == 4 for key in moved)
+    assert 0.1 < len(moved) / len(keys) < 0.3
+
+
+def test_layout_round_trips_migration_state(tmp_path):
+    layout = RingLayout(str(tmp_path / "ring.json"))
+    current = ConsistentHashRing(range(3), vnodes=16, version=2)
+    previous = ConsistentHashRing(range(2), vnodes=16, version=1)
+    
+    assert layout.load() is None
+    layout.save(current, previous)
+    loaded = layout.load()
+    
+    assert loaded['current'].to_dict() == current.to_dict()
+    assert loaded['previous'].to_dict() == previous.to_dict()
+    assert ring_state(loaded['current'], loaded['previous']) == "2:1"
+    assert ring_state(current) == "2:-"
@@ -0,0 +1,84 @@
+import pytest
+
+from app.services.heavy_hitters import CountMinTopK, HeavyHitterTracker
+
+
+def test_tracks_the_most_frequent_keys():
+    sketch = CountMinTopK(k=3)
+    for i in range(50):
+        sketch.add(f"rare-{i}")
+    for key, count in [("a", 30), ("b", 20), ("c", 10)]:
+        sketch.add(key, count)
+    
+    assert [key for key, _ in sketch.top_k()] == ["a", "b", "c"]
+    assert sketch.estimate("a") >= 30
+
+
+def test_reset_forgets_everything():
+    sketch = CountMinTopK(k=3)
+    sketch.add("a", 5)
+    
+    sketch.reset()
+    
+    assert sketch.top_k() == []
+    assert sketch.estimate("a") == 0
+
+
+class FakePipeline:
+    def __init__(self, store):
+        self.store = store
+        self.reads = []
+    
+    def zincrby(self, key, delta, member):
+        scores = self.store.setdefault(key, {})
+        scores[member] = scores.get(member, 0) + delta
+    
+    def expire(self, key, ttl):
+        pass
+    
+    def zrevrange(self, key, start, stop, withscores=False):
+        self.reads.append((key, stop))
+    
+    async def execute(self):
+        return [
+            sorted(self.store.get(key, {}).items(), key=lambda item: item[1], reverse=True)[:stop + 1]
+            for key, stop in self.reads
+        ]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+    
+    def pipeline(self):
+        return FakePipeline(self.store)
+
+
+@pytest.mark.asyncio
+async def test_workers_merge_counts_through_redis():
+    redis_client = FakeRedis()
+    workers = [HeavyHitterTracker(k=2, window=3600), HeavyHitterTracker(k=2, window=3600)]
+    for worker in workers:
+        worker.bind(redis_client)
+    
+    for _ in range(3):
+        workers[0].record("a")
+        workers[1].record("a")
+    workers[0].record("b")
+    workers[0].record("b")
+    for worker in workers:
+        await worker.sync()
+    # Syncing again only publishes growth since the last sync.
+    hot = await workers[0].sync()
+    
+    assert hot == [("a", 6), ("b", 2)]
+
+
+@pytest.mark.asyncio
+async def test_sync_without_redis_reports_local_top_k():
+    tracker = HeavyHitterTracker(k=1)
+    tracker.record("a")
+    tracker.record("a")
+    tracker.record("b")
+    
+    assert await tracker.sync() == [("a", 2)]
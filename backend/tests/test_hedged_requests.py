@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from app.services.hedged_requests import LatencyWindow, hedged_call
+
+
+def _attempt(result, delay, calls, fail=False):
+    async def run():
+        calls.append(result)
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError(result)
+        return result
+    return run
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged():
+    calls = []
+    
+    result = await hedged_call([_attempt("a", 0.0, calls), _attempt("b", 0.0, calls)], hedge_delay=0.05, timeout=1.0)
+    
+    assert result == ("a", 0)
+    assert calls == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_loses():
+    calls = []
+    
+    result = await hedged_call([_attempt("a", 0.5, calls), _attempt("b", 0.0, calls)], hedge_delay=0.02, timeout=1.0)
+    
+    assert result == ("b", 1)
+    assert calls == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_failure_hedges_at_once():
+    calls = []
+    
+    result = await hedged_call(
+        [_attempt("a", 0.0, calls, fail=True), _attempt("b", 0.0, calls)], hedge_delay=10.0, timeout=1.0
+    )
+    
+    assert result == ("b", 1)
+
+
+@pytest.mark.asyncio
+async def test_raises_last_error_when_every_attempt_fails():
+    calls = []
+    
+    with pytest.raises(RuntimeError, match="b"):
+        await hedged_call(
+            [_attempt("a", 0.0, calls, fail=True), _attempt("b", 0.0, calls, fail=True)],
+            hedge_delay=0.01, timeout=1.0
+        )
+
+
+@pytest.mark.asyncio
+async def test_times_out():
+    calls = []
+    
+    with pytest.raises(asyncio.TimeoutError):
+        await hedged_call([_attempt("a", 1.0, calls)], hedge_delay=0.01, timeout=0.05)
+
+
+def test_latency_window_uses_default_until_sampled():
+    window = LatencyWindow(default=0.05)
+    for _ in range(19):
+        window.record(1.0)
+    assert window.percentile(95) == 0.05
+    
+    window.record(1.0)
+    assert window.percentile(95) == 1.0
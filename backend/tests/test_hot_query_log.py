@@ -0,0 +1,85 @@
+import time
+
+import msgpack
+import numpy as np
+import pytest
+
+from app.services.hot_query_log import HotQueryLog
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+    
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field.encode()] = value
+    
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+    
+    async def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+
+def _log(tmp_path, worker_id):
+    log = HotQueryLog(path=str(tmp_path / f"{worker_id}.msgpack"), half_life=60.0, worker_id=worker_id)
+    return log
+
+
+@pytest.mark.asyncio
+async def test_workers_contribute_the_embeddings_they_computed(tmp_path):
+    redis_client = FakeRedis()
+    first, second = _log(tmp_path, "first"), _log(tmp_path, "second")
+    first.observe("a", np.ones(4), 10, 0.5)
+    second.observe("b", np.ones(4), 20, 0.7)
+    hot = [("a", 100), ("b", 50)]
+    
+    await first.persist(redis_client, hot)
+    await second.persist(redis_client, hot)
+    entries = await first.load(redis_client)
+    
+    assert [(entry['fingerprint'], round(entry['count'])) for entry in entries] == [("a", 100), ("b", 50)]
+    assert entries[1]['top_k'] == 20
+    np.testing.assert_array_equal(HotQueryLog.features(entries[0]), np.ones(4))
+
+
+@pytest.mark.asyncio
+async def test_counts_halve_once_per_half_life(tmp_path):
+    redis_client = FakeRedis()
+    log = _log(tmp_path, "worker")
+    log.observe("a", np.ones(4), 10, 0.5)
+    await log.persist(redis_client, [("a", 100)])
+    field = redis_client.hashes[log.key][b"worker"]
+    stored = msgpack.unpackb(field, raw=False)
+    redis_client.hashes[log.key][b"worker"] = msgpack.packb(
+        {'at': stored['at'] - 60.0, 'entries': stored['entries']}, use_bin_type=True
+    )
+    
+    entries = await log.load(redis_client)
+    
+    assert round(entries[0]['count']) == 50
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_the_local_file(tmp_path):
+    log = _log(tmp_path, "worker")
+    log.observe("a", np.ones(4), 10, 0.5)
+    await log.persist(FakeRedis(), [("a", 100)])
+    
+    entries = await log.load(FakeRedis())
+    
+    assert [entry['fingerprint'] for entry in entries] == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_prunes_fields_of_stopped_workers(tmp_path):
+    redis_client = FakeRedis()
+    log = _log(tmp_path, "worker")
+    redis_client.hashes[log.key] = {
+        b"gone": msgpack.packb({'at': time.time() - log.retention - 1, 'entries': []}, use_bin_type=True)
+    }
+    
+    await log.persist(redis_client, [])
+    
+    assert list(redis_client.hashes[log.key]) == [b"worker"]
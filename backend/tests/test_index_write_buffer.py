@@ -0,0 +1,126 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from app.services.index_write_buffer import IndexBufferFullError, IndexWriteBuffer
+
+
+class RecordingVectorService:
+    delta_index = None
+    
+    def __init__(self):
+        self.inserted = []
+    
+    async def insert_vectors(self, vectors, image_ids, metadata, point_ids):
+        self.inserted.extend(zip(image_ids, point_ids, vectors, metadata))
+
+
+@pytest.mark.asyncio
+async def test_replays_unflushed_writes_after_a_crash(tmp_path):
+    journal_dir = str(tmp_path / "journal")
+    crashed = IndexWriteBuffer(RecordingVectorService(), journal_dir=journal_dir)
+    crashed._rotate_segment()
+    vectors = np.random.default_rng(0).standard_normal((2, 8)).astype(np.float32)
+    point_ids = [
+        await crashed.enqueue(vectors[0], "a", {'tag': 1}),
+        await crashed.enqueue(vectors[1], "b")
+    ]
+    # A torn final line from a crash mid-append is skipped.
+    with open(crashed.active_segment, "a") as f:
+        f.write('{"image_id": "c", "poin')
+    crashed._close_journal()
+    
+    vector_service = RecordingVectorService()
+    restarted = IndexWriteBuffer(vector_service, journal_dir=journal_dir)
+    restarted._replay_journal()
+    
+    assert [write.image_id for write in restarted.pending] == ["a", "b"]
+    assert [write.point_id for write in restarted.pending] == point_ids
+    np.testing.assert_array_equal(restarted.pending[0].vector, vectors[0])
+    assert restarted.pending[0].metadata == {'tag': 1}
+    
+    restarted._rotate_segment()
+    assert await restarted._flush_once()
+    restarted._close_journal()
+    
+    assert [image_id for image_id, *_ in vector_service.inserted] == ["a", "b"]
+    assert not restarted.pending
+    assert len(os.listdir(journal_dir)) == 1
+
+
+@pytest.mark.asyncio
+async def test_flush_coalesces_writes_to_the_same_image(tmp_path):
+    vector_service = RecordingVectorService()
+    buffer = IndexWriteBuffer(vector_service, durability="memory", journal_dir=str(tmp_path))
+    await buffer.enqueue(np.zeros(4), "a")
+    latest = await buffer.enqueue(np.ones(4), "a")
+    
+    assert await buffer._flush_once()
+    
+    assert [point_id for _, point_id, *_ in vector_service.inserted] == [latest]
+    assert buffer.get_stats()['coalesced'] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_writes_stay_deleted_after_a_crash(tmp_path):
+    journal_dir = str(tmp_path / "journal")
+    crashed = IndexWriteBuffer(RecordingVectorService(), journal_dir=journal_dir)
+    crashed._rotate_segment()
+    await crashed.enqueue(np.zeros(4), "a")
+    await crashed.enqueue(np.ones(4), "b")
+    
+    assert await crashed.cancel("a") == 1
+    assert [write.image_id for write in crashed.pending] == ["b"]
+    crashed._close_journal()
+    
+    vector_service = RecordingVectorService()
+    restarted = IndexWriteBuffer(vector_service, journal_dir=journal_dir)
+    restarted._replay_journal()
+    assert [write.image_id for write in restarted.pending] == ["b"]
+    
+    restarted._rotate_segment()
+    assert await restarted._flush_once()
+    restarted._close_journal()
+    
+    assert [image_id for image_id, *_ in vector_service.inserted] == ["b"]
+    assert len(os.listdir(journal_dir)) == 1
+
+
+@pytest.mark.asyncio
+async def test_waiters_never_overfill_the_buffer(tmp_path):
+    buffer = IndexWriteBuffer(
+        RecordingVectorService(), durability="memory", journal_dir=str(tmp_path),
+        max_pending=4, max_batch=2, enqueue_timeout=5.0
+    )
+    for i in range(4):
+        await buffer.enqueue(np.zeros(4), f"full-{i}")
+    waiters = [asyncio.create_task(buffer.enqueue(np.zeros(4), f"wait-{i}")) for i in range(6)]
+    await asyncio.sleep(0)
+    
+    peak = 0
+    while not all(waiter.done() for waiter in waiters):
+        assert await buffer._flush_once()
+        await asyncio.sleep(0)
+        peak = max(peak, len(buffer.pending))
+    
+    assert peak <= 4
+    assert buffer.get_stats()['enqueued'] == 10
+
+
+@pytest.mark.asyncio
+async def test_rejects_writes_once_the_timeout_passes(tmp_path):
+    buffer = IndexWriteBuffer(
+        RecordingVectorService(), durability="memory", journal_dir=str(tmp_path),
+        max_pending=1, enqueue_timeout=0.01
+    )
+    await buffer.enqueue(np.zeros(4), "a")
+    
+    with pytest.raises(IndexBufferFullError):
+        await buffer.enqueue(np.zeros(4), "b")
+
+
+def test_rejects_unknown_durability():
+    with pytest.raises(ValueError):
+        IndexWriteBuffer(RecordingVectorService(), durability="sometimes")
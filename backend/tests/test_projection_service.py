@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from app.services.projection_service import ProjectionService
+
+
+@pytest.fixture
+def client():
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        "images", vectors_config=models.VectorParams(size=16, distance=models.Distance.COSINE)
+    )
+    vectors = np.random.default_rng(0).standard_normal((60, 16)).astype(np.float32)
+    client.upsert(
+        "images",
+        [models.PointStruct(id=i, vector=vectors[i].tolist(), payload={'image_id': str(i)}) for i in range(60)],
+        wait=True
+    )
+    return client
+
+
+@pytest.fixture
+def service(tmp_path):
+    return ProjectionService(model_dir=str(tmp_path), refresh_interval=0.0)
+
+
+@pytest.mark.asyncio
+async def test_trained_projection_is_staged_not_published(client, service):
+    projection = await service.train_from_collection(client, "images", output_dimension=4)
+    
+    reduced = projection.transform(np.ones(16))
+    assert reduced.shape == (1, 4)
+    assert np.isclose(np.linalg.norm(reduced), 1.0)
+    assert service.load_latest() is None
+    
+    worker = ProjectionService(model_dir=service.model_dir, refresh_interval=0.0)
+    worker.refresh()
+    assert [target.version for target in worker.write_targets()] == [projection.version]
+    assert worker.projection is None
+
+
+@pytest.mark.asyncio
+async def test_publish_switches_workers_and_ends_dual_writes(client, service):
+    projection = await service.train_from_collection(client, "images", output_dimension=4)
+    worker = ProjectionService(model_dir=service.model_dir, refresh_interval=0.0)
+    worker.refresh()
+    
+    service.publish(projection)
+    worker.refresh()
+    
+    assert worker.projection.version == projection.version
+    assert worker.staged is None
+    assert [target.version for target in worker.write_targets()] == [projection.version]
+
+
+@pytest.mark.asyncio
+async def test_backfill_copies_every_point(client, service):
+    projection = await service.train_from_collection(client, "images", output_dimension=4)
+    
+    copied = await service.backfill_collection(client, "images", projection, batch_size=25)
+    
+    assert copied == 60
+    assert client.count(projection.collection_name("images"), exact=True).count == 60
+
+
+@pytest.mark.asyncio
+async def test_backfill_drops_points_deleted_during_the_copy(client, service):
+    projection = await service.train_from_collection(client, "images", output_dimension=4)
+    copy_points = service._copy_points
+    
+    def copy_then_delete(client_, target, projection_, points):
+        copy_points(client_, target, projection_, points)
+        client.delete("images", points_selector=models.PointIdsList(points=[points[0].id]), wait=True)
+    
+    service._copy_points = copy_then_delete
+    await service.backfill_collection(client, "images", projection, batch_size=25)
+    
+    assert client.count(projection.collection_name("images"), exact=True).count == client.count("images", exact=True).count
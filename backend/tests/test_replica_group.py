@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.replica_group import (
+    CircuitBreaker, CircuitOpenError, ReplicaGroup, ReplicaWriteError
+)
+
+
+class FakeClient:
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.applied = []
+
+
+def _apply(value):
+    def fn(client):
+        time.sleep(client.delay)
+        if client.fail:
+            raise RuntimeError(f"{client.name} down")
+        client.applied.append(value)
+        return client.name
+    return fn
+
+
+def _group(*clients, **kwargs):
+    return ReplicaGroup(list(clients), [client.name for client in clients], **kwargs)
+
+
+def test_breaker_opens_then_lets_one_probe_through():
+    breaker = CircuitBreaker("r", failure_threshold=2, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+    
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_round_robin_rotates_reads():
+    group = _group(FakeClient("a"), FakeClient("b"), FakeClient("c"))
+    
+    firsts = [group.read_order()[0].name for _ in range(3)]
+    
+    assert firsts == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_read_falls_over_to_next_replica():
+    group = _group(FakeClient("a", fail=True), FakeClient("b"))
+    
+    assert await group.read(_apply("x")) == "b"
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_rejects_calls():
+    group = _group(FakeClient("a", fail=True), failure_threshold=1, reset_timeout=60.0)
+    
+    with pytest.raises(RuntimeError):
+        await group.read(_apply("x"))
+    with pytest.raises(CircuitOpenError):
+        await group.read(_apply("x"))
+
+
+@pytest.mark.asyncio
+async def test_quorum_write_returns_before_slow_replica():
+    slow = FakeClient("c", delay=0.2)
+    group = _group(FakeClient("a"), FakeClient("b"), slow)
+    
+    assert await group.write(_apply(1), "quorum", keys=["p"]) == 2
+    assert slow.applied == []
+    await asyncio.sleep(0.3)
+    assert slow.applied == [1]
+
+
+@pytest.mark.asyncio
+async def test_writes_to_the_same_point_apply_in_order_on_each_replica():
+    slow = FakeClient("c", delay=0.1)
+    group = _group(FakeClient("a"), FakeClient("b"), slow)
+    
+    await group.write(_apply("first"), "quorum", keys=["p"])
+    slow.delay = 0.0
+    await group.write(_apply("second"), "quorum", keys=["p"])
+    await asyncio.sleep(0.2)
+    
+    assert slow.applied == ["first", "second"]
+
+
+@pytest.mark.asyncio
+async def test_write_below_consistency_level_raises():
+    group = _group(FakeClient("a"), FakeClient("b", fail=True), FakeClient("c", fail=True))
+    
+    with pytest.raises(ReplicaWriteError) as error:
+        await group.write(_apply(1), "quorum")
+    assert len(error.value.errors) == 2
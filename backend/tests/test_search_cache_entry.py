@@ -0,0 +1,64 @@
+from app.services.search_cache_entry import lookup, make_entry, partial_coverage, serve_from_entry
+
+
+def _results(*scores):
+    return [{'image_id': f"img-{i}", 'score': score} for i, score in enumerate(scores)]
+
+
+def test_serves_smaller_top_k_from_prefix():
+    entry = make_entry(_results(0.9, 0.8, 0.7, 0.6), top_k=4, threshold=0.5)
+    
+    served = serve_from_entry(entry, top_k=2, threshold=0.5)
+    
+    assert [result['score'] for result in served] == [0.9, 0.8]
+
+
+def test_serves_higher_threshold_from_prefix():
+    entry = make_entry(_results(0.9, 0.8, 0.7, 0.6), top_k=4, threshold=0.5)
+    
+    served = serve_from_entry(entry, top_k=4, threshold=0.75)
+    
+    assert [result['score'] for result in served] == [0.9, 0.8]
+
+
+def test_lower_threshold_is_a_miss():
+    entry = make_entry(_results(0.9, 0.8), top_k=2, threshold=0.7)
+    
+    assert serve_from_entry(entry, top_k=2, threshold=0.5) is None
+
+
+def test_larger_top_k_is_a_miss_unless_exhausted():
+    full = make_entry(_results(0.9, 0.8), top_k=2, threshold=0.5)
+    exhausted = make_entry(_results(0.9, 0.8), top_k=5, threshold=0.5)
+    
+    assert serve_from_entry(full, top_k=3, threshold=0.5) is None
+    assert len(serve_from_entry(exhausted, top_k=3, threshold=0.5)) == 2
+
+
+def test_bare_result_lists_are_not_served():
+    assert serve_from_entry(_results(0.9), top_k=1, threshold=0.5) is None
+
+
+def test_miss_widens_fetch_to_cover_old_entry():
+    entry = make_entry(_results(0.9, 0.8), top_k=10, threshold=0.7)
+    
+    result = lookup(entry, top_k=5, threshold=0.5, generation=3)
+    
+    assert result.results is None
+    assert (result.fetch_top_k, result.fetch_threshold, result.generation) == (10, 0.5, 3)
+
+
+def test_degraded_entry_is_a_miss_when_request_can_afford_more():
+    entry = {**make_entry(_results(0.9, 0.8), top_k=2, threshold=0.5), 'effort': 'low'}
+    
+    assert lookup(entry, top_k=2, threshold=0.5, effort='high').results is None
+    assert lookup(entry, top_k=2, threshold=0.5, effort='low').results is not None
+
+
+def test_partial_coverage_comes_from_results():
+    class Results(list):
+        partial = {'answered': 3, 'timed_out': 1, 'failed': 0}
+    
+    assert partial_coverage(Results()) == {'answered': 3, 'timed_out': 1, 'failed': 0}
+    assert partial_coverage([]) is None
+    assert 'partial' not in make_entry([], top_k=1, threshold=0.5)
@@ -0,0 +1,70 @@
+import time
+
+import numpy as np
+
+from app.services.semantic_cache import SemanticResultCache
+
+
+def _vector(seed, dim=64):
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+
+
+def _near(vector, scale=0.01, seed=99):
+    return vector + scale * np.random.default_rng(seed).standard_normal(vector.shape).astype(np.float32)
+
+
+def test_near_duplicate_query_hits():
+    cache = SemanticResultCache(dim=64, similarity_threshold=0.99)
+    query = _vector(0)
+    cache.put(query, "results")
+    
+    value, similarity = cache.get(_near(query))
+    
+    assert value == "results"
+    assert similarity >= 0.99
+
+
+def test_unrelated_query_misses():
+    cache = SemanticResultCache(dim=64, similarity_threshold=0.99)
+    cache.put(_vector(0), "results")
+    
+    value, _ = cache.get(_vector(1))
+    
+    assert value is None
+
+
+def test_near_duplicate_put_supersedes_the_older_entry():
+    cache = SemanticResultCache(dim=64, similarity_threshold=0.99)
+    query = _vector(0)
+    cache.put(query, "old")
+    cache.put(_near(query), "new")
+    
+    assert len(cache) == 1
+    assert cache.get(query)[0] == "new"
+
+
+def test_expired_entries_are_dropped():
+    cache = SemanticResultCache(dim=64)
+    cache.put(_vector(0), "results", ttl=0.01)
+    
+    time.sleep(0.02)
+    
+    assert cache.get(_vector(0))[0] is None
+    assert len(cache) == 0
+
+
+def test_evicts_oldest_beyond_max_entries():
+    cache = SemanticResultCache(dim=64, max_entries=2)
+    for seed in range(3):
+        cache.put(_vector(seed), seed)
+    
+    assert len(cache) == 2
+    assert cache.get(_vector(0))[0] is None
+    assert cache.get(_vector(2))[0] == 2
+
+
+def test_zero_vector_does_not_break_lookups():
+    cache = SemanticResultCache(dim=64)
+    cache.put(np.zeros(64), "zero")
+    
+    assert cache.get(_vector(0))[0] is None
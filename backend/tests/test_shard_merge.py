@@ -0,0 +1,43 @@
+from app.services.shard_merge import merge_shard_results, shard_candidate_limit, shards_to_refetch
+
+
+def _shard(prefix, *scores):
+    return [{'image_id': f"{prefix}-{i}", 'score': score} for i, score in enumerate(scores)]
+
+
+def test_merges_sorted_shards_into_global_top_k():
+    shards = [_shard("a", 0.9, 0.5), _shard("b", 0.8, 0.7), _shard("c", 0.95)]
+    
+    merged = merge_shard_results(shards, top_k=3)
+    
+    assert [result['score'] for result in merged] == [0.95, 0.9, 0.8]
+
+
+def test_drops_duplicate_images_across_shards():
+    shards = [
+        [{'image_id': "same", 'score': 0.9}, {'image_id': "a", 'score': 0.5}],
+        [{'image_id': "same", 'score': 0.9}, {'image_id': "b", 'score': 0.6}]
+    ]
+    
+    merged = merge_shard_results(shards, top_k=3)
+    
+    assert [result['image_id'] for result in merged] == ["same", "b", "a"]
+
+
+def test_handles_empty_shards_and_short_answers():
+    assert merge_shard_results([[], _shard("a", 0.4)], top_k=5) == _shard("a", 0.4)
+    assert merge_shard_results([[], []], top_k=5) == []
+
+
+def test_candidate_limit_is_below_top_k_for_many_shards():
+    assert shard_candidate_limit(10, 1) == 10
+    assert shard_candidate_limit(100, 16) < 100
+    assert shard_candidate_limit(100, 16) >= 100 // 16
+
+
+def test_refetches_shards_whose_whole_answer_made_the_cut():
+    shards = [_shard("a", 0.9, 0.85), _shard("b", 0.5, 0.4)]
+    merged = merge_shard_results(shards, top_k=3)
+    
+    assert shards_to_refetch(shards, limit=2, merged=merged, top_k=3) == [0]
+    assert shards_to_refetch(shards, limit=3, merged=merged, top_k=3) == []
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+from qdrant_client.http import models
+
+from app.services.shard_write_pipeline import ShardQueueFullError, ShardWritePipeline, is_transient
+from app.services.replica_group import ReplicaWriteError
+
+
+def _points(*ids, version=0):
+    return [models.PointStruct(id=point_id, vector=[float(version)], payload={'version': version}) for point_id in ids]
+
+
+class RecordingWriter:
+    def __init__(self, delay=0.0, failures=0, error=ConnectionError("down")):
+        self.delay = delay
+        self.failures = failures
+        self.error = error
+        self.batches = []
+    
+    async def __call__(self, points):
+        await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        self.batches.append([(point.id, point.payload['version']) for point in points])
+
+
+@pytest.mark.asyncio
+async def test_coalesces_queued_writes_to_the_same_point():
+    writer = RecordingWriter()
+    pipeline = ShardWritePipeline(0, writer, linger=0.01)
+    
+    first = await pipeline.submit(_points(1, 2, version=0))
+    second = await pipeline.submit(_points(1, version=1))
+    await asyncio.gather(first, second)
+    await pipeline.stop()
+    
+    assert writer.batches == [[(1, 1), (2, 0)]]
+    assert pipeline.get_stats()['coalesced'] == 1
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_errors():
+    writer = RecordingWriter(failures=2)
+    pipeline = ShardWritePipeline(0, writer, base_backoff=0.001, linger=0)
+    
+    await (await pipeline.submit(_points(1)))
+    await pipeline.stop()
+    
+    assert writer.batches == [[(1, 0)]]
+    assert pipeline.get_stats()['retries'] == 2
+
+
+@pytest.mark.asyncio
+async def test_permanent_errors_fail_the_write():
+    writer = RecordingWriter(failures=1, error=ValueError("bad point"))
+    pipeline = ShardWritePipeline(0, writer, linger=0)
+    
+    future = await pipeline.submit(_points(1))
+    with pytest.raises(ValueError):
+        await future
+    await pipeline.stop()
+    
+    assert pipeline.get_stats()['failed'] == 1
+
+
+@pytest.mark.asyncio
+async def test_full_queue_pushes_back_until_acknowledged():
+    writer = RecordingWriter(delay=0.2)
+    pipeline = ShardWritePipeline(0, writer, max_queue_points=2, linger=0, enqueue_timeout=0.05)
+    
+    await pipeline.submit(_points(1, 2))
+    with pytest.raises(ShardQueueFullError):
+        await pipeline.submit(_points(3))
+    
+    await pipeline.wait_for_points(["1", "2"])
+    await pipeline.submit(_points(3))
+    await pipeline.stop()
+
+
+@pytest.mark.asyncio
+async def test_writes_to_the_same_point_land_in_order():
+    writer = RecordingWriter(delay=0.02)
+    pipeline = ShardWritePipeline(0, writer, max_batch=1, max_in_flight=4, linger=0)
+    
+    futures = [await pipeline.submit(_points(1, version=version)) for version in range(3)]
+    await asyncio.gather(*futures)
+    await pipeline.stop()
+    
+    assert [batch[0][1] for batch in writer.batches] == sorted(batch[0][1] for batch in writer.batches)
+
+
+def test_transient_errors():
+    assert is_transient(ConnectionError())
+    assert not is_transient(ValueError())
+    assert is_transient(ReplicaWriteError("", [TimeoutError(), ConnectionError()]))
+    assert not is_transient(ReplicaWriteError("", [TimeoutError(), ValueError()]))
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import RedisLease, SingleFlight, should_refresh_early
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight()
+    calls = 0
+    
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+    
+    results = await asyncio.gather(*[flight.do("key", compute) for _ in range(10)])
+    
+    assert results == ["result"] * 10
+    assert calls == 1
+    assert not flight.in_flight("key")
+
+
+@pytest.mark.asyncio
+async def test_cancelled_follower_does_not_cancel_leader():
+    flight = SingleFlight()
+    
+    async def compute():
+        await asyncio.sleep(0.02)
+        return "result"
+    
+    leader = asyncio.ensure_future(flight.do("key", compute))
+    follower = asyncio.ensure_future(flight.do("key", compute))
+    await asyncio.sleep(0)
+    follower.cancel()
+    
+    assert await leader == "result"
+
+
+@pytest.mark.asyncio
+async def test_lease_without_redis_lets_every_caller_proceed():
+    lease = RedisLease()
+    
+    assert await lease.acquire("key") is not None
+    assert await lease.acquire("key") is not None
+
+
+def test_refreshes_early_only_near_expiry():
+    assert should_refresh_early(compute_seconds=0.1, expires_at=0.0)
+    assert not should_refresh_early(compute_seconds=0.0, expires_at=float("inf"))
@@ -0,0 +1,71 @@
+import time
+
+from app.services.cache_strategy import TinyLFUCache
+
+
+def test_stays_within_byte_budget():
+    cache = TinyLFUCache(max_bytes=10_000, expected_entry_bytes=100)
+    
+    for i in range(500):
+        cache.put(f"key-{i}", i, weight=100)
+    
+    assert cache.bytes_used <= cache.max_bytes
+    assert cache.get_stats()['evictions'] > 0
+
+
+def test_one_off_keys_do_not_flush_hot_ones():
+    # A sketch wider than the cache keeps one-off keys from sharing every
+    # counter with a hot key.
+    cache = TinyLFUCache(max_bytes=10_000, expected_entry_bytes=10)
+    hot = [f"hot-{i}" for i in range(20)]
+    for key in hot:
+        cache.put(key, key, weight=100)
+    for _ in range(5):
+        for key in hot:
+            cache.get(key)
+    
+    for i in range(1000):
+        cache.put(f"scan-{i}", i, weight=100)
+    
+    assert all(key in cache for key in hot)
+    assert cache.get_stats()['rejections'] > 0
+
+
+def test_expired_entries_are_misses():
+    cache = TinyLFUCache(max_bytes=10_000)
+    cache.put("key", "value", weight=10, ttl=0.01)
+    
+    time.sleep(0.02)
+    
+    assert cache.get("key") is None
+    assert "key" not in cache
+
+
+def test_entries_larger_than_main_space_are_not_cached():
+    cache = TinyLFUCache(max_bytes=1000)
+    
+    assert cache.put("big", "value", weight=2000) == 0
+    assert "big" not in cache
+
+
+def test_oversized_update_drops_the_cached_value():
+    cache = TinyLFUCache(max_bytes=1000)
+    for i in range(20):
+        cache.put(f"key-{i}", i, weight=10)
+    
+    assert cache.put("key-19", "value", weight=5000) == 0
+    assert "key-19" not in cache
+
+
+def test_pinned_keys_survive_eviction():
+    cache = TinyLFUCache(max_bytes=10_000, expected_entry_bytes=100, pinned_ratio=0.1)
+    cache.put("pinned", "value", weight=100)
+    cache.pin(["pinned"])
+    
+    for i in range(1000):
+        key = f"key-{i}"
+        cache.put(key, i, weight=100)
+        cache.get(key)
+    
+    assert cache.get("pinned") == "value"
+    assert cache.get_stats()['pinned_hits'] == 1
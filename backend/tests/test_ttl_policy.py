@@ -0,0 +1,21 @@
+from app.services.ttl_policy import PopularityTTLPolicy
+
+
+def test_ttl_grows_with_popularity():
+    policy = PopularityTTLPolicy(short_ttl=300, medium_ttl=3600, long_ttl=86400, medium_hits=3, long_hits=10)
+    
+    ttls = []
+    for _ in range(10):
+        policy.record("query")
+        ttls.append(policy.ttl("query"))
+    
+    assert ttls[0] == 300
+    assert ttls[2] == 3600
+    assert ttls[9] == 86400
+    assert policy.ttl("unseen") == 300
+
+
+def test_thresholds_are_capped_by_the_sketch_counters():
+    policy = PopularityTTLPolicy(medium_hits=20, long_hits=50)
+    
+    assert (policy.medium_hits, policy.long_hits) == (15, 15)